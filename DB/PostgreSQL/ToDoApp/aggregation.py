@@ -1,10 +1,15 @@
+import math
 import os
 import random
 import time
 from contextlib import contextmanager
+from dataclasses import dataclass, field
 
 import psycopg2
 from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+
+import tracing
 
 load_dotenv()
 
@@ -42,12 +47,22 @@ def get_postgres_conn_cursor():
 # TIMER
 # =========================================================
 
-def timed_postgres_execute(cur, query, params=None, label="Postgres SQL"):
-    start = time.time()
-    cur.execute(query, params or ())
-    end = time.time()
-    elapsed_ms = (end - start) * 1000
-    print(f"⏱ {label} executed in {elapsed_ms:.2f} ms")
+def timed_postgres_execute(cur, query, params=None, label="Postgres SQL", detail=None):
+    start = time.perf_counter()
+    try:
+        cur.execute(query, params or ())
+    except Exception as e:
+        if tracing.ENABLED:
+            tracing.record(label, None, (time.perf_counter() - start) * 1000,
+                           error=e, detail=detail)
+        raise
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if tracing.ENABLED:
+        tracing.record(label, None, elapsed_ms, cur.rowcount, detail=detail)
+
+    suffix = f" ({detail})" if detail else ""
+    print(f"⏱ {label}{suffix} executed in {elapsed_ms:.2f} ms")
     return elapsed_ms
 
 
@@ -70,6 +85,7 @@ def create_task_table():
             cur,
             """
             DROP TABLE IF EXISTS task;
+            DROP TABLE IF EXISTS task_title_hll;
 
             CREATE TABLE IF NOT EXISTS task (
                 id SERIAL PRIMARY KEY,
@@ -82,6 +98,8 @@ def create_task_table():
             label="Create task table"
         )
 
+    create_title_sketch()
+
 
 def drop_task_table():
     with get_postgres_conn_cursor() as (_, cur):
@@ -89,6 +107,7 @@ def drop_task_table():
             cur,
             """
             DROP TABLE IF EXISTS task;
+            DROP TABLE IF EXISTS task_title_hll;
             """,
             label="Drop task table"
         )
@@ -127,15 +146,22 @@ def build_random_task_rows(n=10000):
     return rows
 
 
+INSERT_PAGE_SIZE = 1000
+
+
 def insert_tasks(rows):
     with get_postgres_conn_cursor() as (_, cur):
         start = time.time()
-        cur.executemany(
+        # One INSERT per INSERT_PAGE_SIZE rows, not per row, so the
+        # title sketch trigger also runs once per page.
+        execute_values(
+            cur,
             """
             INSERT INTO task (title, status, priority, estimated_hours)
-            VALUES (%s, %s, %s, %s);
+            VALUES %s;
             """,
-            rows
+            rows,
+            page_size=INSERT_PAGE_SIZE
         )
         end = time.time()
         elapsed_ms = (end - start) * 1000
@@ -288,6 +314,512 @@ def get_count_tasks_per_priority():
         return rows, elapsed_ms
 
 
+# =========================================================
+# SINGLE-SCAN DASHBOARD
+# =========================================================
+# The seven functions above each open their own connection and
+# scan task once. get_task_dashboard computes every aggregate in
+# ONE statement: FILTER clauses handle the "completed only"
+# aggregates and GROUPING SETS produce the overall row, the
+# per-status rows and the per-priority rows from the same scan.
+
+@dataclass
+class TaskDashboard:
+    total_tasks: int = 0
+    max_completed_hours: int = None
+    min_priority: int = None
+    avg_estimated_hours: float = None
+    count_completed: int = 0
+    sum_completed_hours: int = None
+    avg_hours_per_status: dict = field(default_factory=dict)
+    count_per_priority: dict = field(default_factory=dict)
+    elapsed_ms: float = 0.0
+
+
+DASHBOARD_SQL = """
+    SELECT
+        GROUPING(status, priority) AS grouping_id,
+        status,
+        priority,
+        COUNT(*),
+        MAX(estimated_hours) FILTER (WHERE status = 'completed'),
+        MIN(priority),
+        AVG(estimated_hours),
+        COUNT(*) FILTER (WHERE status = 'completed'),
+        SUM(estimated_hours) FILTER (WHERE status = 'completed')
+    FROM task
+    GROUP BY GROUPING SETS ((), (status), (priority));
+"""
+
+# GROUPING(status, priority) is a bitmask of the columns that are
+# NOT part of the current grouping set.
+GROUPING_OVERALL = 3
+GROUPING_BY_STATUS = 1
+GROUPING_BY_PRIORITY = 2
+
+
+def _float_or_none(value):
+    return float(value) if value is not None else None
+
+
+def get_task_dashboard(approx=False, sample_percent=1.0):
+    if approx:
+        return get_approx_task_dashboard(sample_percent)
+
+    with get_postgres_conn_cursor() as (_, cur):
+        elapsed_ms = timed_postgres_execute(
+            cur,
+            DASHBOARD_SQL,
+            label="Postgres task dashboard"
+        )
+        rows = cur.fetchall()
+
+    dashboard = TaskDashboard(elapsed_ms=elapsed_ms)
+
+    for grouping_id, status, priority, count, max_completed, \
+            min_priority, avg_hours, count_completed, sum_completed in rows:
+        if grouping_id == GROUPING_OVERALL:
+            dashboard.total_tasks = count
+            dashboard.max_completed_hours = max_completed
+            dashboard.min_priority = min_priority
+            dashboard.avg_estimated_hours = _float_or_none(avg_hours)
+            dashboard.count_completed = count_completed
+            dashboard.sum_completed_hours = sum_completed
+        elif grouping_id == GROUPING_BY_STATUS:
+            dashboard.avg_hours_per_status[status] = _float_or_none(avg_hours)
+        elif grouping_id == GROUPING_BY_PRIORITY:
+            dashboard.count_per_priority[priority] = count
+
+    print("Postgres dashboard:")
+    print(dashboard)
+    return dashboard
+
+
+# =========================================================
+# DASHBOARD BENCHMARK
+# =========================================================
+# Reference SQL for the seven individual aggregates. The student
+# functions above may still contain description text, so the
+# benchmark uses its own copies of the finished queries.
+
+INDIVIDUAL_AGGREGATE_SQL = [
+    ("MAX completed hours",
+     "SELECT MAX(estimated_hours) FROM task WHERE status = 'completed';"),
+    ("MIN priority",
+     "SELECT MIN(priority) FROM task;"),
+    ("AVG estimated_hours",
+     "SELECT AVG(estimated_hours) FROM task;"),
+    ("COUNT completed",
+     "SELECT COUNT(*) FROM task WHERE status = 'completed';"),
+    ("SUM completed hours",
+     "SELECT SUM(estimated_hours) FROM task WHERE status = 'completed';"),
+    ("AVG hours per status",
+     "SELECT status, AVG(estimated_hours) FROM task GROUP BY status;"),
+    ("COUNT per priority",
+     "SELECT priority, COUNT(*) FROM task GROUP BY priority;"),
+]
+
+
+def _run_individual_aggregates():
+    # One connection per aggregate, exactly like the functions above.
+    for label, sql in INDIVIDUAL_AGGREGATE_SQL:
+        with get_postgres_conn_cursor() as (_, cur):
+            timed_postgres_execute(cur, sql, label=f"Postgres {label}")
+            cur.fetchall()
+
+
+def benchmark_dashboard(repeat=5):
+    """
+    Wall-clock comparison (connect + query + fetch) of the single-scan
+    dashboard against the seven separate aggregate calls.
+    """
+    individual_ms = []
+    dashboard_ms = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _run_individual_aggregates()
+        individual_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        get_task_dashboard()
+        dashboard_ms.append((time.perf_counter() - start) * 1000)
+
+    individual_best = min(individual_ms)
+    dashboard_best = min(dashboard_ms)
+
+    print("\nDashboard benchmark (best of", repeat, "runs)")
+    print(f"  7 individual calls: {individual_best:.2f} ms")
+    print(f"  single-scan query:  {dashboard_best:.2f} ms")
+    print(f"  speedup:            {individual_best / dashboard_best:.2f}x")
+    return individual_best, dashboard_best
+
+
+# =========================================================
+# APPROXIMATE DASHBOARD
+# =========================================================
+# get_task_dashboard(approx=True) reads a TABLESAMPLE SYSTEM block
+# sample instead of the whole table and scales the results back up.
+# Every estimate carries a 95% confidence interval.
+#
+#   f = sample fraction, n = sampled rows, S = sum, Q = sum of squares
+#   COUNT  ~ n / f      se = sqrt(n * (1 - f)) / f
+#   SUM    ~ S / f      se = sqrt(Q * (1 - f)) / f
+#   AVG    ~ S / n      se = stddev / sqrt(n)
+#
+# The formulas assume row-level (Bernoulli) sampling. SYSTEM samples
+# whole pages, so if rows are clustered on disk the real error can be
+# wider than reported. MIN / MAX cannot be scaled from a sample; they
+# are reported as the sample extremes with a one-sided bound.
+#
+# Distinct counts cannot be scaled from a sample either, so they use
+# a HyperLogLog sketch of task.title. Its 2^p registers live in
+# task_title_hll and are kept up to date by triggers on task, so the
+# dashboard reads 2^p rows instead of scanning the table.
+
+Z_95 = 1.96
+
+
+@dataclass
+class Estimate:
+    value: float
+    low: float = None
+    high: float = None
+
+    def __str__(self):
+        if self.value is None:
+            return "n/a"
+        low = "-inf" if self.low is None else f"{self.low:.2f}"
+        high = "+inf" if self.high is None else f"{self.high:.2f}"
+        return f"{self.value:.2f} [{low}, {high}]"
+
+
+@dataclass
+class ApproxTaskDashboard:
+    total_tasks: Estimate = None
+    max_completed_hours: Estimate = None
+    min_priority: Estimate = None
+    avg_estimated_hours: Estimate = None
+    count_completed: Estimate = None
+    sum_completed_hours: Estimate = None
+    distinct_titles: Estimate = None
+    avg_hours_per_status: dict = field(default_factory=dict)
+    count_per_priority: dict = field(default_factory=dict)
+    sample_percent: float = 0.0
+    sampled_rows: int = 0
+    elapsed_ms: float = 0.0
+
+
+APPROX_DASHBOARD_SQL = """
+    SELECT
+        GROUPING(status, priority) AS grouping_id,
+        status,
+        priority,
+        COUNT(*),
+        SUM(estimated_hours),
+        SUM(estimated_hours * estimated_hours),
+        MAX(estimated_hours) FILTER (WHERE status = 'completed'),
+        MIN(priority),
+        COUNT(*) FILTER (WHERE status = 'completed'),
+        SUM(estimated_hours) FILTER (WHERE status = 'completed'),
+        SUM(estimated_hours * estimated_hours) FILTER (WHERE status = 'completed')
+    FROM task TABLESAMPLE SYSTEM (%s)
+    GROUP BY GROUPING SETS ((), (status), (priority));
+"""
+
+
+def _estimate_count(n, f):
+    if f >= 1:
+        return Estimate(n, n, n)
+    value = n / f
+    half = Z_95 * math.sqrt(n * (1 - f)) / f
+    return Estimate(value, max(value - half, 0), value + half)
+
+
+def _estimate_sum(total, sum_squares, f):
+    if total is None:
+        return Estimate(None)
+    if f >= 1:
+        return Estimate(total, total, total)
+    value = total / f
+    half = Z_95 * math.sqrt(sum_squares * (1 - f)) / f
+    return Estimate(value, value - half, value + half)
+
+
+def _estimate_avg(n, total, sum_squares):
+    if not n:
+        return Estimate(None)
+    mean = total / n
+    if n < 2:
+        return Estimate(mean)
+    variance = max((sum_squares - total * total / n) / (n - 1), 0)
+    half = Z_95 * math.sqrt(variance / n)
+    return Estimate(mean, mean - half, mean + half)
+
+
+def get_approx_task_dashboard(sample_percent=1.0):
+    if not 0 < sample_percent <= 100:
+        raise ValueError("sample_percent must be greater than 0 and at most 100")
+    f = sample_percent / 100.0
+
+    with get_postgres_conn_cursor() as (_, cur):
+        elapsed_ms = timed_postgres_execute(
+            cur,
+            APPROX_DASHBOARD_SQL,
+            (sample_percent,),
+            label="Postgres approx dashboard",
+            detail=f"{sample_percent}% sample"
+        )
+        rows = cur.fetchall()
+
+        sketch = HyperLogLog(HLL_PRECISION)
+        elapsed_ms += timed_postgres_execute(
+            cur,
+            "SELECT register, rank FROM task_title_hll;",
+            label="Postgres HLL title sketch"
+        )
+        sketch.load_registers(cur.fetchall())
+
+    dashboard = ApproxTaskDashboard(
+        sample_percent=sample_percent,
+        elapsed_ms=elapsed_ms,
+        distinct_titles=sketch.estimate()
+    )
+
+    for grouping_id, status, priority, count, total, sum_squares, \
+            max_completed, min_priority, count_completed, \
+            sum_completed, sum_squares_completed in rows:
+        if grouping_id == GROUPING_OVERALL:
+            dashboard.sampled_rows = count
+            dashboard.total_tasks = _estimate_count(count, f)
+            dashboard.avg_estimated_hours = _estimate_avg(count, total, sum_squares)
+            dashboard.count_completed = _estimate_count(count_completed, f)
+            dashboard.sum_completed_hours = _estimate_sum(
+                sum_completed, sum_squares_completed, f
+            )
+            # The true MAX is at least the sample MAX, the true MIN at most
+            # the sample MIN.
+            dashboard.max_completed_hours = Estimate(max_completed, max_completed, None)
+            dashboard.min_priority = Estimate(min_priority, None, min_priority)
+        elif grouping_id == GROUPING_BY_STATUS:
+            dashboard.avg_hours_per_status[status] = _estimate_avg(
+                count, total, sum_squares
+            )
+        elif grouping_id == GROUPING_BY_PRIORITY:
+            dashboard.count_per_priority[priority] = _estimate_count(count, f)
+
+    print("Postgres approx dashboard:")
+    print_approx_dashboard(dashboard)
+    return dashboard
+
+
+def print_approx_dashboard(dashboard):
+    print(f"  sample:              {dashboard.sample_percent}% "
+          f"({dashboard.sampled_rows} rows)")
+    print(f"  total tasks:         {dashboard.total_tasks}")
+    print(f"  MAX completed hours: {dashboard.max_completed_hours}")
+    print(f"  MIN priority:        {dashboard.min_priority}")
+    print(f"  AVG estimated_hours: {dashboard.avg_estimated_hours}")
+    print(f"  COUNT completed:     {dashboard.count_completed}")
+    print(f"  SUM completed hours: {dashboard.sum_completed_hours}")
+    print(f"  distinct titles:     {dashboard.distinct_titles}")
+    for status, estimate in sorted(dashboard.avg_hours_per_status.items()):
+        print(f"  AVG hours [{status}]: {estimate}")
+    for priority, estimate in sorted(dashboard.count_per_priority.items()):
+        print(f"  COUNT priority {priority}:  {estimate}")
+
+
+# =========================================================
+# HYPERLOGLOG SKETCH
+# =========================================================
+# Each value is hashed to 32 bits. The low p bits pick one of
+# m = 2^p registers; the register keeps the largest "position of the
+# first 1 bit" seen in the remaining 32 - p bits. Postgres builds the
+# registers with a GROUP BY over m buckets, so memory stays fixed no
+# matter how many distinct values exist, and sketches from different
+# tables or nodes can be merged register by register.
+#
+# task_title_hll holds the registers of task.title. Statement-level
+# triggers fold every inserted or updated batch into it, so keeping it
+# current costs one small GROUP BY per statement (insert_tasks sends
+# INSERT_PAGE_SIZE rows per statement). A register only ever
+# grows: deleted titles are still counted until the sketch is rebuilt
+# with create_title_sketch(). TRUNCATE task empties it.
+
+HLL_PRECISION = 10
+
+HLL_REGISTERS_SQL = """
+    SELECT
+        h & ((1 << %(p)s) - 1) AS register,
+        MAX(
+            COALESCE(
+                NULLIF(position('1' IN ((h >> %(p)s)::bit(32) << %(p)s)::text), 0),
+                33 - %(p)s
+            )
+        ) AS rank
+    FROM (
+        SELECT hashtext({column}::text)::bigint & 4294967295 AS h
+        FROM {table}
+        WHERE {column} IS NOT NULL
+    ) hashed
+    GROUP BY 1
+"""
+
+HLL_MERGE_SQL = """
+    INSERT INTO task_title_hll (register, rank)
+    {registers}
+    ON CONFLICT (register) DO UPDATE
+    SET rank = EXCLUDED.rank
+    WHERE task_title_hll.rank < EXCLUDED.rank
+"""
+
+
+def create_title_sketch():
+    """
+    (Re)build task_title_hll from the current task table and install
+    the triggers that keep it up to date. One full scan, at setup only.
+    """
+    merge_new_rows = HLL_MERGE_SQL.format(
+        registers=HLL_REGISTERS_SQL.format(column="title", table="new_rows")
+    )
+    merge_task = HLL_MERGE_SQL.format(
+        registers=HLL_REGISTERS_SQL.format(column="title", table="task")
+    )
+
+    with get_postgres_conn_cursor() as (_, cur):
+        timed_postgres_execute(
+            cur,
+            f"""
+            DROP TABLE IF EXISTS task_title_hll;
+
+            CREATE TABLE task_title_hll (
+                register INTEGER PRIMARY KEY,
+                rank SMALLINT NOT NULL
+            );
+
+            CREATE OR REPLACE FUNCTION task_title_hll_add() RETURNS trigger AS $$
+            BEGIN
+                {merge_new_rows};
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+
+            CREATE OR REPLACE FUNCTION task_title_hll_reset() RETURNS trigger AS $$
+            BEGIN
+                DELETE FROM task_title_hll;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+
+            DROP TRIGGER IF EXISTS trg_task_title_hll_insert ON task;
+            DROP TRIGGER IF EXISTS trg_task_title_hll_update ON task;
+            DROP TRIGGER IF EXISTS trg_task_title_hll_truncate ON task;
+
+            CREATE TRIGGER trg_task_title_hll_insert
+            AFTER INSERT ON task
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION task_title_hll_add();
+
+            CREATE TRIGGER trg_task_title_hll_update
+            AFTER UPDATE ON task
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION task_title_hll_add();
+
+            CREATE TRIGGER trg_task_title_hll_truncate
+            AFTER TRUNCATE ON task
+            FOR EACH STATEMENT EXECUTE FUNCTION task_title_hll_reset();
+
+            {merge_task};
+            """,
+            {"p": HLL_PRECISION},
+            label="Create task title sketch"
+        )
+
+
+class HyperLogLog:
+    def __init__(self, precision=10):
+        if not 4 <= precision <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = [0] * self.m
+
+    def load_registers(self, rows):
+        for register, rank in rows:
+            self.registers[register] = max(self.registers[register], rank)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precision")
+        self.registers = [max(a, b) for a, b in zip(self.registers, other.registers)]
+
+    def estimate(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Small-range correction (linear counting).
+            value = m * math.log(m / zeros)
+        else:
+            value = raw
+
+        half = Z_95 * 1.04 / math.sqrt(m) * value
+        return Estimate(value, max(value - half, 0), value + half)
+
+
+def get_distinct_titles():
+    with get_postgres_conn_cursor() as (_, cur):
+        timed_postgres_execute(
+            cur,
+            "SELECT COUNT(DISTINCT title) FROM task;",
+            label="Postgres COUNT DISTINCT title"
+        )
+        return cur.fetchone()[0]
+
+
+def _format_exact(value):
+    return f"{value:>12.2f}" if value is not None else f"{'n/a':>12}"
+
+
+def benchmark_approx_dashboard(sample_percent=1.0, repeat=3):
+    """
+    Wall-clock comparison of the exact and approximate dashboards. Both
+    sides compute the same aggregates, distinct titles included.
+    """
+    exact_ms = []
+    approx_ms = []
+    exact = approx = None
+    exact_distinct_titles = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        exact = get_task_dashboard()
+        exact_distinct_titles = get_distinct_titles()
+        exact_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        approx = get_task_dashboard(approx=True, sample_percent=sample_percent)
+        approx_ms.append((time.perf_counter() - start) * 1000)
+
+    exact_best = min(exact_ms)
+    approx_best = min(approx_ms)
+
+    print(f"\nApprox benchmark (best of {repeat} runs, {sample_percent}% sample)")
+    print(f"  {'aggregate':<22}{'exact':>12}   approx [95% CI]")
+    for name in ("total_tasks", "avg_estimated_hours",
+                 "count_completed", "sum_completed_hours"):
+        exact_value = getattr(exact, name)
+        print(f"  {name:<22}{_format_exact(exact_value)}   {getattr(approx, name)}")
+    print(f"  {'distinct_titles':<22}{_format_exact(exact_distinct_titles)}"
+          f"   {approx.distinct_titles}")
+    print(f"  exact:   {exact_best:.2f} ms")
+    print(f"  approx:  {approx_best:.2f} ms")
+    print(f"  speedup: {exact_best / approx_best:.2f}x")
+    return exact_best, approx_best
+
+
 # =========================================================
 # MAIN
 # =========================================================
@@ -324,4 +856,12 @@ if __name__ == "__main__":
     # get_avg_hours_per_status()
     # get_count_tasks_per_priority()
 
+    # -----------------------------------------------------
+    # DASHBOARD (ALL AGGREGATES IN ONE SCAN)
+    # -----------------------------------------------------
+    # get_task_dashboard()
+    # benchmark_dashboard()
+    # get_task_dashboard(approx=True, sample_percent=1.0)
+    # benchmark_approx_dashboard(sample_percent=1.0)
+
     print("\nTask table is ready.")
\ No newline at end of file
@@ -1,10 +1,19 @@
 import psycopg2
 import random
 import time
+import base64
+import csv
+import io
+import json
+import re
 from contextlib import contextmanager
+from datetime import date, datetime
 import os
 from dotenv import load_dotenv
 
+import slowlog
+import tracing
+
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 ENC_KEY = os.getenv("ENC_KEY")
@@ -54,16 +63,31 @@ def _is_incomplete_query(query):
     return len(lines) == 0
 
 
-def timed_execute(cur, query, params=None, label="SQL"):
+def timed_execute(cur, query, params=None, label="SQL", node_name=None, dsn=None, detail=None):
+    # node_name / dsn: which database cur is connected to, for tracing
+    # and slow-query EXPLAINs (default: the primary, DATABASE_URL).
+    # label must be a fixed string; counts or names go in detail.
     if _is_incomplete_query(query):
         print(f"⏭ Skipping incomplete query: {label}")
         return False
 
-    start = time.time()
-    cur.execute(query, params or ())
-    end = time.time()
+    start = time.perf_counter()
+    try:
+        cur.execute(query, params or ())
+    except Exception as e:
+        if tracing.ENABLED:
+            tracing.record(label, node_name, (time.perf_counter() - start) * 1000,
+                           error=e, detail=detail)
+        raise
+    elapsed_ms = (time.perf_counter() - start) * 1000
 
-    print(f"⏱ {label} executed in {(end - start) * 1000:.2f} ms")
+    if tracing.ENABLED:
+        tracing.record(label, node_name, elapsed_ms, cur.rowcount, detail=detail)
+    if slowlog.THRESHOLD_MS and elapsed_ms >= slowlog.THRESHOLD_MS:
+        slowlog.submit(label, query, params, elapsed_ms, dsn or DATABASE_URL, node=node_name)
+
+    suffix = f" ({detail})" if detail else ""
+    print(f"⏱ {label}{suffix} executed in {elapsed_ms:.2f} ms")
     return True
 
 
@@ -83,7 +107,7 @@ def print_table(rows, headers=None):
 # INIT + SEED
 # =========================================================
 
-def init_db():
+def init_db(partitioned=False):
 
     with get_conn_cursor() as (_, cur):
         timed_execute(cur, """
@@ -94,6 +118,10 @@ def init_db():
             );
         """, label="Create AppUser")
 
+        if partitioned:
+            _create_partitioned_task_table(cur)
+            return
+
         timed_execute(cur, """
             CREATE TABLE IF NOT EXISTS Task (
                 id SERIAL PRIMARY KEY,
@@ -306,16 +334,47 @@ def delete_task(task_id):
 # TRANSACTION EXAMPLES
 # =========================================================
 
-def create_user_with_tasks(username, tasks):
+# Tasks are passed as (title, status) or (title, status, description)
+# tuples. Both helpers send ALL rows in ONE statement: the task fields
+# travel as three parallel arrays and unnest() turns them back into
+# rows on the server, so the number of round trips does not grow with
+# the number of tasks.
+
+def _task_arrays(tasks):
+    titles, statuses, descriptions = [], [], []
+    for task in tasks:
+        title, status, *rest = task
+        titles.append(title)
+        statuses.append(status)
+        descriptions.append(rest[0] if rest else None)
+    return titles, statuses, descriptions
+
+
+def create_user_with_tasks(name, email, tasks):
+    titles, statuses, descriptions = _task_arrays(tasks)
+
     with get_conn_cursor() as (_, cur):
         timed_execute(cur, """
-            -- INSERT USER
-        """, label="Insert user in transaction")
+            WITH new_user AS (
+                INSERT INTO AppUser (name, email)
+                VALUES (%s, %s)
+                RETURNING id
+            ),
+            new_tasks AS (
+                INSERT INTO Task (user_id, title, status, description)
+                SELECT new_user.id, t.title, t.status, t.description
+                FROM new_user,
+                     unnest(%s::text[], %s::text[], %s::text[])
+                         AS t(title, status, description)
+                RETURNING id
+            )
+            SELECT (SELECT id FROM new_user),
+                   ARRAY(SELECT id FROM new_tasks);
+        """, (name, email, titles, statuses, descriptions),
+            label="Insert user with tasks", detail=f"{len(titles)} tasks")
 
-        for task in tasks:
-            timed_execute(cur, """
-                -- INSERT TASK FOR USER
-            """, label="Insert task in transaction")
+        user_id, task_ids = cur.fetchone()
+        return user_id, task_ids
 
 
 def transfer_task(task_id, new_user_id):
@@ -335,20 +394,76 @@ def transfer_task(task_id, new_user_id):
 
 
 def replace_tasks(user_id, new_tasks):
+    """
+    Makes the user's task list equal to new_tasks, matching tasks by
+    title. Tasks whose status/description changed are updated in place,
+    new titles are inserted and titles that are gone are deleted.
+    Unchanged tasks are not touched, so they keep their id and
+    created_at. Returns (deleted, updated, inserted) counts.
+    """
+    # Last occurrence wins if a title is listed twice.
+    by_title = {}
+    for task in new_tasks:
+        title, status, *rest = task
+        by_title[title] = (title, status, rest[0] if rest else None)
+    titles, statuses, descriptions = _task_arrays(by_title.values())
+
     with get_conn_cursor() as (_, cur):
-        timed_execute(
-            cur,
-            """
-            -- DELETE FROM Task WHERE user_id = %s
-            """,
-            (user_id,),
-            label="Delete old tasks"
-        )
+        # Serialize concurrent replaces for the same user so two of them
+        # cannot both insert the same missing title.
+        timed_execute(cur, """
+            SELECT id FROM AppUser WHERE id = %s FOR UPDATE;
+        """, (user_id,), label="Lock user")
 
-        for task in new_tasks:
-            timed_execute(cur, """
-                -- INSERT NEW TASK
-            """, label="Insert replacement task")
+        if cur.fetchone() is None:
+            raise ValueError(f"Unknown user: {user_id}")
+
+        timed_execute(cur, """
+            WITH new_tasks AS (
+                SELECT *
+                FROM unnest(%(titles)s::text[], %(statuses)s::text[], %(descriptions)s::text[])
+                    AS t(title, status, description)
+            ),
+            deleted AS (
+                DELETE FROM Task t
+                WHERE t.user_id = %(user_id)s
+                  AND NOT EXISTS (SELECT 1 FROM new_tasks n WHERE n.title = t.title)
+                RETURNING t.id
+            ),
+            updated AS (
+                UPDATE Task t
+                SET status = n.status,
+                    description = n.description
+                FROM new_tasks n
+                WHERE t.user_id = %(user_id)s
+                  AND t.title = n.title
+                  AND (t.status, t.description) IS DISTINCT FROM (n.status, n.description)
+                RETURNING t.id
+            ),
+            inserted AS (
+                INSERT INTO Task (user_id, title, status, description)
+                SELECT %(user_id)s, n.title, n.status, n.description
+                FROM new_tasks n
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM Task t
+                    WHERE t.user_id = %(user_id)s AND t.title = n.title
+                )
+                RETURNING id
+            )
+            SELECT (SELECT COUNT(*) FROM deleted),
+                   (SELECT COUNT(*) FROM updated),
+                   (SELECT COUNT(*) FROM inserted);
+        """, {
+            "user_id": user_id,
+            "titles": titles,
+            "statuses": statuses,
+            "descriptions": descriptions,
+        }, label="Replace tasks", detail=f"{len(titles)} tasks")
+
+        deleted, updated, inserted = cur.fetchone()
+        print(f"Replaced tasks for user {user_id}: "
+              f"{deleted} deleted, {updated} updated, {inserted} inserted")
+        return deleted, updated, inserted
 
 
 # =========================================================
@@ -361,6 +476,741 @@ def create_status_index():
             -- CREATE INDEX idx_task_status ON Task(status)
         """, label="Create status index")
 
+# =========================================================
+# KEYSET PAGINATION
+# =========================================================
+# The *_page functions return one page plus an opaque token for the
+# next page (None on the last page). Instead of OFFSET, which reads and
+# throws away every earlier row, each page continues after the last
+# row of the previous one:
+#
+#   WHERE (created_at, id) < (%s, %s)
+#   ORDER BY created_at DESC, id DESC
+#   LIMIT n
+#
+# With an index on the same columns, page 1000 costs the same as page 1.
+# Tasks are listed newest first; id breaks ties between tasks created
+# in the same instant. Tasks with a NULL created_at are not listed.
+
+DEFAULT_PAGE_SIZE = 50
+TASK_PAGE_COLUMNS = ["id", "user_id", "title", "status", "description", "created_at"]
+
+
+def encode_page_token(values):
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_page_token(token):
+    try:
+        return json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid page token")
+
+
+def _task_page_token(row):
+    # row = (id, user_id, title, status, description, created_at)
+    return encode_page_token([row[5].isoformat(), row[0]])
+
+
+def _decode_task_page_token(token):
+    # A token that is valid JSON but of the wrong shape is just as invalid.
+    try:
+        created_at, task_id = decode_page_token(token)
+        return datetime.fromisoformat(created_at), int(task_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid page token")
+
+
+def _decode_user_page_token(token):
+    try:
+        (after_id,) = decode_page_token(token)
+        return int(after_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid page token")
+
+
+def _check_page_size(limit):
+    if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+        raise ValueError("Page size must be a positive integer")
+
+
+def _split_page(rows, limit, token_for_row):
+    # One extra row is fetched to find out whether another page exists.
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, token_for_row(rows[-1])
+    return rows, None
+
+
+def create_pagination_indexes():
+    with get_conn_cursor() as (_, cur):
+        timed_execute(cur, """
+            CREATE INDEX IF NOT EXISTS idx_task_created_id
+            ON Task(created_at, id);
+        """, label="Create task pagination index")
+
+        timed_execute(cur, """
+            CREATE INDEX IF NOT EXISTS idx_task_user_created_id
+            ON Task(user_id, created_at, id);
+        """, label="Create task-by-user pagination index")
+
+
+def get_all_tasks_page(limit=DEFAULT_PAGE_SIZE, page_token=None):
+    _check_page_size(limit)
+    with get_conn_cursor() as (_, cur):
+        if page_token is None:
+            timed_execute(cur, """
+                SELECT id, user_id, title, status, description, created_at
+                FROM Task
+                WHERE created_at IS NOT NULL
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s;
+            """, (limit + 1,), label="Get all tasks page")
+        else:
+            created_at, task_id = _decode_task_page_token(page_token)
+            timed_execute(cur, """
+                SELECT id, user_id, title, status, description, created_at
+                FROM Task
+                WHERE (created_at, id) < (%s, %s)
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s;
+            """, (created_at, task_id, limit + 1), label="Get all tasks page")
+
+        rows, next_token = _split_page(cur.fetchall(), limit, _task_page_token)
+        print_table(rows, TASK_PAGE_COLUMNS)
+        return rows, next_token
+
+
+def get_tasks_by_user_page(user_id, limit=DEFAULT_PAGE_SIZE, page_token=None):
+    _check_page_size(limit)
+    with get_conn_cursor() as (_, cur):
+        if page_token is None:
+            timed_execute(cur, """
+                SELECT id, user_id, title, status, description, created_at
+                FROM Task
+                WHERE user_id = %s
+                  AND created_at IS NOT NULL
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s;
+            """, (user_id, limit + 1), label="Get tasks by user page")
+        else:
+            created_at, task_id = _decode_task_page_token(page_token)
+            timed_execute(cur, """
+                SELECT id, user_id, title, status, description, created_at
+                FROM Task
+                WHERE user_id = %s
+                  AND (created_at, id) < (%s, %s)
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s;
+            """, (user_id, created_at, task_id, limit + 1), label="Get tasks by user page")
+
+        rows, next_token = _split_page(cur.fetchall(), limit, _task_page_token)
+        print_table(rows, TASK_PAGE_COLUMNS)
+        return rows, next_token
+
+
+def get_all_users_page(limit=DEFAULT_PAGE_SIZE, page_token=None):
+    _check_page_size(limit)
+    # AppUser has no created_at, so users are paged by primary key.
+    if page_token is None:
+        after_id = 0
+    else:
+        after_id = _decode_user_page_token(page_token)
+
+    with get_conn_cursor() as (_, cur):
+        timed_execute(cur, """
+            SELECT id, name, email
+            FROM AppUser
+            WHERE id > %s
+            ORDER BY id
+            LIMIT %s;
+        """, (after_id, limit + 1), label="Get all users page")
+
+        rows, next_token = _split_page(
+            cur.fetchall(), limit, lambda row: encode_page_token([row[0]])
+        )
+        print_table(rows, ["id", "name", "email"])
+        return rows, next_token
+
+
+# =========================================================
+# FULL-TEXT SEARCH
+# =========================================================
+# search_vector is a generated column, so Postgres keeps it in sync
+# with title/description on every INSERT and UPDATE. Title words are
+# weighted higher (A) than description words (B) when ranking.
+# A GIN index over it turns word lookups into index scans, where
+# ILIKE '%word%' has to read every row.
+
+SEARCH_CONFIG = "english"
+
+SEARCH_TASKS_SQL = f"""
+    SELECT id, user_id, title, status, description, created_at,
+           ts_rank(search_vector, q) AS rank
+    FROM Task, to_tsquery('{SEARCH_CONFIG}', %s) AS q
+    WHERE user_id = %s
+      AND search_vector @@ q
+    ORDER BY rank DESC, id DESC
+    LIMIT %s;
+"""
+
+
+def init_task_search():
+    with get_conn_cursor() as (_, cur):
+        timed_execute(cur, f"""
+            ALTER TABLE Task
+            ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')
+            ) STORED;
+        """, label="Add task search_vector")
+
+        timed_execute(cur, """
+            CREATE INDEX IF NOT EXISTS idx_task_search
+            ON Task USING GIN (search_vector);
+        """, label="Create task search index")
+
+
+def build_prefix_tsquery(query):
+    # "fin rep" -> "fin:* & rep:*": every word must match, and each word
+    # also matches longer words that start with it ("report", "reports").
+    words = re.findall(r"\w+", query.lower())
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def search_tasks(user_id, query, limit=20):
+    tsquery = build_prefix_tsquery(query)
+    if not tsquery:
+        return []
+
+    with get_conn_cursor() as (_, cur):
+        timed_execute(cur, SEARCH_TASKS_SQL, (tsquery, user_id, limit), label="Search tasks")
+
+        rows = cur.fetchall()
+        print_table(rows, TASK_PAGE_COLUMNS + ["rank"])
+        return rows
+
+
+# =========================================================
+# SEARCH BENCHMARK
+# =========================================================
+
+SEARCH_BENCHMARK_EMAIL = "search-benchmark@email.com"
+
+
+def _seed_search_benchmark(n):
+    with get_conn_cursor() as (_, cur):
+        timed_execute(cur, """
+            INSERT INTO AppUser (name, email)
+            VALUES ('Search Benchmark', %s)
+            ON CONFLICT (email) DO UPDATE SET name = EXCLUDED.name
+            RETURNING id;
+        """, (SEARCH_BENCHMARK_EMAIL,), label="Create search benchmark user")
+        user_id = cur.fetchone()[0]
+
+        timed_execute(cur, """
+            DELETE FROM Task WHERE user_id = %s;
+        """, (user_id,), label="Clear search benchmark tasks")
+
+        # Generated server-side in one statement; sending a million
+        # single-row INSERTs would take far longer than the benchmark.
+        timed_execute(cur, """
+            INSERT INTO Task (user_id, title, status, description)
+            SELECT
+                %s,
+                (ARRAY['Buy groceries', 'Write report', 'Exercise', 'Read book',
+                       'Clean room', 'Pay bills', 'Study SQL', 'Fix bug',
+                       'Email professor', 'Prepare presentation'])[1 + g %% 10],
+                (ARRAY['pending', 'completed'])[1 + g %% 2],
+                'Note ' || g || ': ' ||
+                (ARRAY['remember the quarterly numbers', 'ask about the deadline',
+                       'bring the laptop charger', 'double check the invoices',
+                       'send the weekly summary', 'review the pull request',
+                       'book a meeting room'])[1 + g %% 7]
+            FROM generate_series(1, %s) AS g;
+        """, (user_id, n), label="Insert search benchmark tasks", detail=f"{n} tasks")
+
+        timed_execute(cur, "ANALYZE Task;", label="Analyze Task")
+
+    return user_id
+
+
+def benchmark_task_search(n=1_000_000, query="report", repeat=5, seed=True):
+    init_task_search()
+
+    if seed:
+        user_id = _seed_search_benchmark(n)
+    else:
+        with get_conn_cursor() as (_, cur):
+            timed_execute(cur, "SELECT id FROM AppUser WHERE email = %s;",
+                          (SEARCH_BENCHMARK_EMAIL,), label="Find search benchmark user")
+            user = cur.fetchone()
+        if user is None:
+            raise ValueError("No search benchmark data; run with seed=True first")
+        user_id = user[0]
+
+    # Both sides count every match, so each has to find the full result
+    # set; a LIMIT on one side only would let it stop early.
+    pattern = f"%{query}%"
+    like_ms = []
+    search_ms = []
+    like_rows = search_rows = 0
+
+    for _ in range(repeat):
+        with get_conn_cursor() as (_, cur):
+            start = time.perf_counter()
+            timed_execute(cur, """
+                SELECT COUNT(*)
+                FROM Task
+                WHERE user_id = %s
+                  AND (title ILIKE %s OR description ILIKE %s);
+            """, (user_id, pattern, pattern), label="Naive ILIKE search")
+            like_rows = cur.fetchone()[0]
+            like_ms.append((time.perf_counter() - start) * 1000)
+
+        with get_conn_cursor() as (_, cur):
+            start = time.perf_counter()
+            timed_execute(cur, f"""
+                SELECT COUNT(*)
+                FROM Task, to_tsquery('{SEARCH_CONFIG}', %s) AS q
+                WHERE user_id = %s
+                  AND search_vector @@ q;
+            """, (build_prefix_tsquery(query), user_id), label="Full-text search")
+            search_rows = cur.fetchone()[0]
+            search_ms.append((time.perf_counter() - start) * 1000)
+
+    like_best = min(like_ms)
+    search_best = min(search_ms)
+
+    print(f"\nSearch benchmark for '{query}' (best of {repeat} runs, {n} tasks)")
+    print(f"  ILIKE scan:       {like_best:.2f} ms, {like_rows} rows matched")
+    print(f"  full-text search: {search_best:.2f} ms, {search_rows} rows matched")
+    if like_rows != search_rows:
+        # ILIKE matches substrings, full-text search matches stemmed
+        # word prefixes; the two can disagree on what counts as a hit.
+        print("  note: the two searches matched different rows")
+    print(f"  speedup:          {like_best / search_best:.2f}x")
+    return like_best, search_best
+
+
+# =========================================================
+# PARTITIONING
+# =========================================================
+# init_db(partitioned=True) creates Task as a table partitioned by
+# month of created_at (task_p202601, task_p202602, ...). The table is
+# still called Task, so every function in this file works unchanged.
+#
+# - Queries that filter on created_at only read the matching months
+#   (partition pruning), e.g. get_completed_tasks_between.
+# - Retention drops whole monthly partitions instead of running a
+#   DELETE, which would have to find every old row and leave dead
+#   tuples for VACUUM.
+# - Partitions are created ahead of time by ensure_task_partitions.
+#   Run maintain_task_partitions daily (cron) so the next months always
+#   exist. task_default catches rows outside every monthly range; it
+#   should stay empty, because a new partition cannot be created while
+#   default holds rows for its month.
+#
+# Postgres requires the partition key in the primary key, so the key
+# is (id, created_at) and created_at is NOT NULL. An existing plain
+# Task table is not converted; this only applies to a fresh schema.
+
+PARTITION_MONTHS_AHEAD = 3
+
+
+def _create_partitioned_task_table(cur):
+    timed_execute(cur, """
+        CREATE TABLE IF NOT EXISTS Task (
+            id SERIAL,
+            user_id INTEGER NOT NULL,
+            title VARCHAR(256) NOT NULL,
+            status VARCHAR(50) NOT NULL,
+            description TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            FOREIGN KEY (user_id) REFERENCES AppUser(id) ON DELETE CASCADE,
+            reminder_time TIMESTAMPTZ,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
+    """, label="Create partitioned Task")
+
+    timed_execute(cur, """
+        CREATE TABLE IF NOT EXISTS task_default PARTITION OF Task DEFAULT;
+    """, label="Create Task default partition")
+
+    _ensure_task_partitions(cur, PARTITION_MONTHS_AHEAD)
+
+
+def _add_months(month_start, months):
+    month_index = month_start.year * 12 + month_start.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _partition_name(month_start):
+    return f"task_p{month_start:%Y%m}"
+
+
+def is_task_partitioned(cur):
+    timed_execute(cur, """
+        SELECT relkind = 'p' FROM pg_class WHERE oid = 'task'::regclass;
+    """, label="Check Task partitioning")
+    return cur.fetchone()[0]
+
+
+def _ensure_task_partitions(cur, months_ahead):
+    this_month = date.today().replace(day=1)
+
+    for offset in range(months_ahead + 1):
+        start = _add_months(this_month, offset)
+        end = _add_months(start, 1)
+        # Bounds are UTC midnights so the ranges do not depend on the
+        # session time zone.
+        timed_execute(cur, f"""
+            CREATE TABLE IF NOT EXISTS {_partition_name(start)}
+            PARTITION OF Task
+            FOR VALUES FROM ('{start} 00:00:00+00') TO ('{end} 00:00:00+00');
+        """, label="Create partition", detail=_partition_name(start))
+
+
+def ensure_task_partitions(months_ahead=PARTITION_MONTHS_AHEAD):
+    with get_conn_cursor() as (_, cur):
+        if not is_task_partitioned(cur):
+            print("Task is not partitioned; nothing to do.")
+            return
+        _ensure_task_partitions(cur, months_ahead)
+
+
+def list_task_partitions(cur):
+    timed_execute(cur, """
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = 'task'::regclass
+        ORDER BY child.relname;
+    """, label="List Task partitions")
+    return [row[0] for row in cur.fetchall()]
+
+
+def drop_old_task_partitions(keep_months=12):
+    # Keeps the current month plus the previous keep_months - 1 months.
+    cutoff = _add_months(date.today().replace(day=1), -(keep_months - 1))
+    dropped = []
+
+    with get_conn_cursor() as (_, cur):
+        if not is_task_partitioned(cur):
+            print("Task is not partitioned; use a DELETE for retention instead.")
+            return dropped
+
+        for name in list_task_partitions(cur):
+            match = re.fullmatch(r"task_p(\d{4})(\d{2})", name)
+            if not match:
+                continue
+
+            month_start = date(int(match.group(1)), int(match.group(2)), 1)
+            if month_start >= cutoff:
+                continue
+
+            timed_execute(cur, f"ALTER TABLE Task DETACH PARTITION {name};",
+                          label="Detach partition", detail=name)
+            timed_execute(cur, f"DROP TABLE {name};", label="Drop partition", detail=name)
+            dropped.append(name)
+
+    print(f"Dropped {len(dropped)} partitions older than {cutoff}: {dropped}")
+    return dropped
+
+
+def maintain_task_partitions(months_ahead=PARTITION_MONTHS_AHEAD, keep_months=12):
+    ensure_task_partitions(months_ahead)
+    drop_old_task_partitions(keep_months)
+
+
+def get_completed_tasks_between(start, end):
+    # The created_at range lets the planner skip every partition
+    # outside [start, end).
+    with get_conn_cursor() as (_, cur):
+        timed_execute(cur, """
+            SELECT id, user_id, title, status, created_at
+            FROM Task
+            WHERE status = 'completed'
+              AND created_at >= %s
+              AND created_at < %s;
+        """, (start, end), label="Get completed tasks between")
+
+        rows = cur.fetchall()
+        print_table(rows, ["task_id", "user_id", "title", "status", "created_at"])
+        return rows
+
+
+# =========================================================
+# BULK IMPORT / EXPORT
+# =========================================================
+# Both directions stream, so file size is limited by disk, not by
+# Python memory:
+#
+# - export_tasks(fmt="csv") hands the file to COPY ... TO STDOUT and
+#   psycopg2 writes Postgres' output straight into it.
+# - export_tasks(fmt="ndjson") and iter_export_tasks read through a
+#   named (server-side) cursor, EXPORT_BATCH_SIZE rows at a time.
+#   iter_export_tasks yields text chunks, e.g. for a Flask
+#   Response(iter_export_tasks(...)).
+# - import_tasks(path) reads the file row by row, validates each row
+#   and feeds the valid ones to COPY ... FROM STDIN through a
+#   file-like adapter. Rows land in a temporary staging table first,
+#   then one INSERT ... SELECT moves the rows whose user exists into
+#   Task. Invalid rows, and rows whose user does not exist, are
+#   written to <path>.rejected with the reason.
+
+EXPORT_COLUMNS = ["id", "user_id", "title", "status", "description", "created_at", "reminder_time"]
+IMPORT_COLUMNS = ["user_id", "title", "status", "description", "created_at", "reminder_time"]
+EXPORT_BATCH_SIZE = 10000
+INT4_MAX = 2147483647
+
+
+def _export_query(cur, user_id):
+    query = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM Task"
+    if user_id is not None:
+        query += cur.mogrify(" WHERE user_id = %s", (user_id,)).decode()
+    return query + " ORDER BY id"
+
+
+def _format_from_path(path):
+    return "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+
+
+def iter_export_tasks(user_id=None, fmt="csv"):
+    with get_conn_cursor() as (conn, cur):
+        query = _export_query(cur, user_id)
+
+        named = conn.cursor(name="export_tasks")
+        named.itersize = EXPORT_BATCH_SIZE
+        try:
+            named.execute(query)
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer) if fmt == "csv" else None
+            if writer:
+                writer.writerow(EXPORT_COLUMNS)
+
+            count = 0
+            for row in named:
+                if writer:
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str))
+                    buffer.write("\n")
+
+                count += 1
+                if count % EXPORT_BATCH_SIZE == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+
+            if buffer.tell():
+                yield buffer.getvalue()
+        finally:
+            named.close()
+
+
+def export_tasks(user_id=None, fmt=None, out="tasks.csv"):
+    # out is a path or an open text file.
+    if fmt is None:
+        fmt = _format_from_path(out) if isinstance(out, str) else "csv"
+    if fmt not in ("csv", "ndjson"):
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    f = open(out, "w", newline="") if isinstance(out, str) else out
+    start = time.perf_counter()
+    try:
+        if fmt == "csv":
+            with get_conn_cursor() as (_, cur):
+                cur.copy_expert(
+                    f"COPY ({_export_query(cur, user_id)}) TO STDOUT WITH (FORMAT csv, HEADER)",
+                    f
+                )
+        else:
+            for chunk in iter_export_tasks(user_id, fmt):
+                f.write(chunk)
+    finally:
+        if isinstance(out, str):
+            f.close()
+
+    print(f"⏱ Export tasks ({fmt}) executed in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+def _validate_import_row(row):
+    user_id = row.get("user_id")
+    # int() would accept True and silently truncate 3.7 to 3.
+    if isinstance(user_id, bool) or (isinstance(user_id, float) and not user_id.is_integer()):
+        return None, "user_id must be an integer"
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None, "user_id must be an integer"
+    if not 0 < user_id <= INT4_MAX:
+        return None, f"user_id must be between 1 and {INT4_MAX}"
+
+    for column in ("title", "status", "description"):
+        value = row.get(column)
+        if value is not None and not isinstance(value, str):
+            return None, f"{column} must be a string"
+        if value and "\x00" in value:
+            # Postgres text cannot hold NUL; COPY would fail the whole import.
+            return None, f"{column} must not contain NUL characters"
+
+    title = (row.get("title") or "").strip()
+    if not title or len(title) > 256:
+        return None, "title must be 1-256 characters"
+
+    status = (row.get("status") or "").strip() or "pending"
+    if len(status) > 50:
+        return None, "status must be at most 50 characters"
+
+    timestamps = []
+    for column in ("created_at", "reminder_time"):
+        value = row.get(column) or None
+        if value is not None:
+            try:
+                datetime.fromisoformat(str(value))
+            except ValueError:
+                return None, f"{column} is not an ISO timestamp"
+        timestamps.append(value)
+
+    return [user_id, title, status, row.get("description") or None] + timestamps, None
+
+
+def _read_import_rows(f, fmt):
+    # Yields (line_number, row dict or None if unparseable, what to
+    # write to the .rejected file for that line).
+    if fmt == "csv":
+        for line_number, row in enumerate(csv.DictReader(f), start=2):
+            yield line_number, row, row
+    else:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, (row if isinstance(row, dict) else None), line.strip()
+
+
+class _CopyRowStream:
+    """
+    File-like object for cur.copy_expert: produces CSV text for the
+    valid rows on demand, so only one read() worth of data is in memory.
+    """
+
+    def __init__(self, rows, rejected_file):
+        self.rows = rows
+        self.rejected_file = rejected_file
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, lineterminator="\n")
+        self.accepted = 0
+        self.rejected = 0
+
+    def read(self, size=-1):
+        size = size if size and size > 0 else 65536
+        while self.buffer.tell() < size:
+            try:
+                line_number, row, source = next(self.rows)
+            except StopIteration:
+                break
+
+            values, error = _validate_import_row(row) if row is not None else (None, "invalid JSON")
+            if error:
+                self.rejected += 1
+                self.rejected_file.write(json.dumps(
+                    {"line": line_number, "error": error, "row": source}, default=str
+                ) + "\n")
+                continue
+
+            # None becomes an empty unquoted field, which CSV COPY reads as NULL.
+            self.writer.writerow([line_number] + ["" if v is None else v for v in values])
+            self.accepted += 1
+
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+def _write_unknown_user_rows(conn, rejected_file):
+    # Read through a named cursor: an import for a missing user can be
+    # as large as the file itself.
+    named = conn.cursor(name="import_unknown_users")
+    named.itersize = EXPORT_BATCH_SIZE
+    try:
+        named.execute(f"""
+            SELECT line, {', '.join(IMPORT_COLUMNS)}
+            FROM task_import i
+            WHERE NOT EXISTS (SELECT 1 FROM AppUser u WHERE u.id = i.user_id)
+            ORDER BY line;
+        """)
+        for line_number, *values in named:
+            rejected_file.write(json.dumps({
+                "line": line_number,
+                "error": "user_id does not exist",
+                "row": dict(zip(IMPORT_COLUMNS, values)),
+            }, default=str) + "\n")
+    finally:
+        named.close()
+
+
+def import_tasks(path, fmt=None):
+    fmt = fmt or _format_from_path(path)
+    if fmt not in ("csv", "ndjson"):
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    rejected_path = path + ".rejected"
+    start = time.perf_counter()
+
+    with open(path, newline="") as f, open(rejected_path, "w") as rejected_file:
+        stream = _CopyRowStream(_read_import_rows(f, fmt), rejected_file)
+
+        with get_conn_cursor() as (conn, cur):
+            timed_execute(cur, """
+                CREATE TEMP TABLE task_import (
+                    line INTEGER,
+                    user_id INTEGER,
+                    title VARCHAR(256),
+                    status VARCHAR(50),
+                    description TEXT,
+                    created_at TIMESTAMPTZ,
+                    reminder_time TIMESTAMPTZ
+                ) ON COMMIT DROP;
+            """, label="Create import staging table")
+
+            cur.copy_expert(
+                f"COPY task_import (line, {', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                stream
+            )
+
+            # Rows for users that do not exist would violate the foreign
+            # key and abort the whole import, so they are filtered here.
+            timed_execute(cur, """
+                INSERT INTO Task (user_id, title, status, description, created_at, reminder_time)
+                SELECT i.user_id, i.title, i.status, i.description,
+                       COALESCE(i.created_at, NOW()), i.reminder_time
+                FROM task_import i
+                JOIN AppUser u ON u.id = i.user_id;
+            """, label="Move imported tasks into Task")
+            inserted = cur.rowcount
+
+            unknown_user = stream.accepted - inserted
+            if unknown_user:
+                _write_unknown_user_rows(conn, rejected_file)
+
+    rejected = stream.rejected + unknown_user
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"⏱ Import tasks executed in {elapsed_ms:.2f} ms: {inserted} inserted, "
+          f"{stream.rejected} invalid, {unknown_user} with unknown user_id")
+    if rejected:
+        print(f"Rejected rows written to {rejected_path}")
+    return inserted, rejected
+
+
 # =========================================================
 # ENCRYPT / DECRYPT
 # =========================================================
@@ -402,6 +1252,8 @@ def get_current_user():
 
 if __name__ == "__main__":
     init_db()
+    # init_db(partitioned=True)
+    # maintain_task_partitions(months_ahead=3, keep_months=12)
     # seed_data()
 
     # generate_random_tasks(10000)
@@ -411,6 +1263,15 @@ if __name__ == "__main__":
     # get_all_tasks()
     # get_tasks_by_user(1)
     # get_completed_tasks()
+    # create_pagination_indexes()
+    # rows, token = get_all_tasks_page(limit=20)
+    # rows, token = get_all_tasks_page(limit=20, page_token=token)
+    # init_task_search()
+    # search_tasks(1, "report")
+    # benchmark_task_search(1_000_000, "report")
+    # export_tasks(out="tasks.csv")
+    # export_tasks(user_id=1, out="tasks_user1.ndjson")
+    # import_tasks("tasks.csv")
     # encrypt_user_email(0)
 
     get_all_users()
@@ -6,6 +6,10 @@ from contextlib import contextmanager
 import psycopg2
 from dotenv import load_dotenv
 
+import slowlog
+import tracing
+from reminders import init_reminders
+
 load_dotenv()
 
 ENC_KEY = os.getenv("ENC_KEY")
@@ -95,17 +99,31 @@ def _is_incomplete_query(query):
     return len(lines) == 0
 
 
-def timed_execute(cur, query, params=None, label="SQL", node_name=None):
+def timed_execute(cur, query, params=None, label="SQL", node_name=None, detail=None):
+    # label must be a fixed string; counts or names go in detail.
     if _is_incomplete_query(query):
         print(f"⏭ Skipping incomplete query: {label}")
         return False
 
-    start = time.time()
-    cur.execute(query, params or ())
-    end = time.time()
+    start = time.perf_counter()
+    try:
+        cur.execute(query, params or ())
+    except Exception as e:
+        if tracing.ENABLED:
+            tracing.record(label, node_name, (time.perf_counter() - start) * 1000,
+                           error=e, detail=detail)
+        raise
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if tracing.ENABLED:
+        tracing.record(label, node_name, elapsed_ms, cur.rowcount, detail=detail)
+    if slowlog.THRESHOLD_MS and elapsed_ms >= slowlog.THRESHOLD_MS:
+        slowlog.submit(label, query, params, elapsed_ms,
+                       DATABASE_NODES.get(node_name), node=node_name)
 
     prefix = f"[{node_name}] " if node_name else ""
-    print(f"{prefix}⏱ {label} executed in {(end - start) * 1000:.2f} ms")
+    suffix = f" ({detail})" if detail else ""
+    print(f"{prefix}⏱ {label}{suffix} executed in {elapsed_ms:.2f} ms")
     return True
 
 
@@ -445,6 +463,18 @@ def create_status_index_all():
     )
 
 
+# =========================================================
+# REMINDERS
+# =========================================================
+# Adds the reminder index and NOTIFY trigger on every node. Start one
+# or more dispatchers per node with: python reminders.py --node NODE1
+
+def init_reminders_all():
+    for node_name in get_available_nodes():
+        print(f"[{node_name}] Initializing reminders")
+        init_reminders(DATABASE_NODES[node_name], node=node_name)
+
+
 # =========================================================
 # ENCRYPT / DECRYPT
 # =========================================================
@@ -514,5 +544,7 @@ if __name__ == "__main__":
     seed_data()
     # generate_random_tasks(1000)
     # create_status_index_all()
+    # init_reminders_all()
+    # python maintenance.py once   -> ANALYZE / VACUUM nodes that need it
     get_all_users()
     print("Distributed app ready.")
\ No newline at end of file
@@ -0,0 +1,320 @@
+import argparse
+import json
+import re
+import statistics
+
+import psycopg2
+
+from distributedApp import DATABASE_NODES, get_available_nodes, timed_execute
+
+# =========================================================
+# INDEX ADVISOR
+# =========================================================
+# For every node:
+#   1. Collect the workload: the Task statements in pg_stat_statements
+#      (when the extension is installed) plus the ToDo app's own
+#      lookups in WORKLOAD below.
+#   2. Derive candidate indexes from the WHERE / ORDER BY clauses:
+#        col = %s ... ORDER BY col2   ->  (col, col2)
+#        col = 'literal'              ->  partial index WHERE col = 'literal'
+#      Candidates already covered by an existing index are skipped.
+#   3. Measure the WORKLOAD before and after each candidate:
+#      - with the hypopg extension: the index is only hypothetical and
+#        the report shows planner cost, nothing is built;
+#      - otherwise: Task is copied once into a temporary table
+#        (SCRATCH_TABLE, with the same indexes, then ANALYZEd), each
+#        candidate is built on the copy inside a savepoint, the
+#        workload is rewritten to read the copy and timed with EXPLAIN
+#        ANALYZE, and the savepoint is rolled back. The live Task table
+#        is only read, never locked against writes.
+#   4. Report indexes that have never been scanned (e.g. a B-tree on
+#      the low-cardinality status column) as candidates for removal.
+#
+# The advisor never creates a permanent index. Apply a suggestion with
+# maintenance.create_index_concurrently_all(...).
+
+TIMING_RUNS = 3
+TOP_STATEMENTS = 20
+SCRATCH_TABLE = "task_advisor_scratch"
+
+# (label, SQL, params). {user_id} is replaced with a real user id from
+# the node, so the queries hit actual data.
+WORKLOAD = [
+    ("Tasks by user, newest first", """
+        SELECT id, user_id, title, status, description, created_at
+        FROM Task
+        WHERE user_id = %s
+        ORDER BY created_at DESC
+        LIMIT 50;
+    """, ("{user_id}",)),
+    ("Pending tasks by user", """
+        SELECT id, title, created_at
+        FROM Task
+        WHERE user_id = %s AND status = 'pending'
+        ORDER BY created_at;
+    """, ("{user_id}",)),
+    ("Oldest pending tasks", """
+        SELECT id, user_id, title
+        FROM Task
+        WHERE status = 'pending'
+        ORDER BY created_at
+        LIMIT 50;
+    """, ()),
+    ("Completed task count", """
+        SELECT COUNT(*) FROM Task WHERE status = 'completed';
+    """, ()),
+]
+
+
+# =========================================================
+# WORKLOAD + CANDIDATES
+# =========================================================
+
+def has_extension(cur, name):
+    cur.execute("SELECT 1 FROM pg_extension WHERE extname = %s;", (name,))
+    return cur.fetchone() is not None
+
+
+def read_statement_workload(cur, node_name):
+    if not has_extension(cur, "pg_stat_statements"):
+        print(f"[{node_name}] pg_stat_statements not installed; using built-in workload only")
+        return []
+
+    timed_execute(cur, """
+        SELECT query, calls, mean_exec_time
+        FROM pg_stat_statements
+        WHERE query ILIKE '%%task%%'
+          AND query NOT ILIKE '%%pg_stat%%'
+        ORDER BY total_exec_time DESC
+        LIMIT %s;
+    """, (TOP_STATEMENTS,), label="Read pg_stat_statements", node_name=node_name)
+    return cur.fetchall()
+
+
+def read_index_usage(cur, node_name):
+    timed_execute(cur, """
+        SELECT s.indexrelname, s.idx_scan, pg_relation_size(s.indexrelid),
+               i.indisunique, i.indisprimary,
+               array_agg(a.attname ORDER BY k.ord)
+        FROM pg_stat_user_indexes s
+        JOIN pg_index i ON i.indexrelid = s.indexrelid
+        CROSS JOIN LATERAL unnest(i.indkey) WITH ORDINALITY AS k(attnum, ord)
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+        WHERE s.relname = 'task'
+        GROUP BY s.indexrelname, s.idx_scan, s.indexrelid, i.indisunique, i.indisprimary;
+    """, label="Read index usage", node_name=node_name)
+    return cur.fetchall()
+
+
+EQUALITY_PARAM = re.compile(r"\b(\w+)\s*=\s*(?:%s|\$\d+)", re.IGNORECASE)
+EQUALITY_LITERAL = re.compile(r"\b(\w+)\s*=\s*'([^']*)'", re.IGNORECASE)
+ORDER_BY = re.compile(r"\bORDER\s+BY\s+(\w+)", re.IGNORECASE)
+TASK_COLUMNS = {"id", "user_id", "title", "status", "description", "created_at", "reminder_time"}
+
+
+def candidates_for_query(query):
+    if not re.search(r"\bFROM\s+task\b", query, re.IGNORECASE):
+        return []
+
+    equality = [c.lower() for c in EQUALITY_PARAM.findall(query) if c.lower() in TASK_COLUMNS]
+    literals = [(c.lower(), v) for c, v in EQUALITY_LITERAL.findall(query)
+                if c.lower() in TASK_COLUMNS]
+    order = [c.lower() for c in ORDER_BY.findall(query) if c.lower() in TASK_COLUMNS]
+
+    columns = list(dict.fromkeys(equality + order))
+    candidates = []
+    if literals:
+        # A constant filter becomes the partial-index predicate, which
+        # keeps the index small: only matching rows are stored in it.
+        column, value = literals[0]
+        predicate = f"{column} = '{value}'"
+        partial_columns = [c for c in columns if c != column] or ["id"]
+        candidates.append((tuple(partial_columns), predicate))
+    if columns:
+        candidates.append((tuple(columns), None))
+    return candidates
+
+
+def _covered(columns, predicate, existing):
+    if predicate:
+        return False
+    for _, _, _, _, _, index_columns in existing:
+        if list(index_columns[:len(columns)]) == list(columns):
+            return True
+    return False
+
+
+def collect_candidates(statements, existing):
+    seen = {}
+    queries = [sql for _, sql, _ in WORKLOAD] + [query for query, _, _ in statements]
+    for query in queries:
+        for columns, predicate in candidates_for_query(query):
+            if not _covered(columns, predicate, existing):
+                seen[(columns, predicate)] = True
+    return list(seen)
+
+
+def candidate_ddl(columns, predicate, name=None, table="Task"):
+    if name is None:
+        name = "idx_task_" + "_".join(columns)
+        if predicate:
+            name += "_where_" + re.sub(r"\W+", "_", predicate).strip("_").lower()
+    ddl = f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"
+    if predicate:
+        ddl += f" WHERE {predicate}"
+    return name, ddl
+
+
+# =========================================================
+# MEASUREMENT
+# =========================================================
+
+FROM_TASK = re.compile(r"\bFROM\s+Task\b", re.IGNORECASE)
+
+
+def _workload_params(params, user_id):
+    return tuple(user_id if p == "{user_id}" else p for p in params)
+
+
+def create_scratch_copy(cur, node_name):
+    # Temporary, so it is private to this session and dropped with it.
+    timed_execute(cur, f"""
+        CREATE TEMP TABLE {SCRATCH_TABLE} (LIKE Task INCLUDING INDEXES);
+        INSERT INTO {SCRATCH_TABLE} SELECT * FROM Task;
+        ANALYZE {SCRATCH_TABLE};
+    """, label="Copy Task to scratch table", node_name=node_name)
+
+
+def _explain(cur, sql, params, analyze):
+    options = "ANALYZE, FORMAT JSON" if analyze else "FORMAT JSON"
+    cur.execute(f"EXPLAIN ({options}) {sql.strip().rstrip(';')}", params or None)
+    result = cur.fetchone()[0][0]
+    if analyze:
+        return result["Execution Time"]
+    return result["Plan"]["Total Cost"]
+
+
+def measure_workload(cur, user_id, analyze, table="Task"):
+    # Median of TIMING_RUNS runs (ms) with ANALYZE, planner cost without.
+    results = {}
+    for label, sql, params in WORKLOAD:
+        params = _workload_params(params, user_id)
+        sql = FROM_TASK.sub(f"FROM {table}", sql)
+        runs = TIMING_RUNS if analyze else 1
+        results[label] = statistics.median(_explain(cur, sql, params, analyze) for _ in range(runs))
+    return results
+
+
+def evaluate_candidate(cur, columns, predicate, user_id, use_hypopg):
+    name, ddl = candidate_ddl(columns, predicate)
+
+    if use_hypopg:
+        cur.execute("SELECT * FROM hypopg_create_index(%s);", (ddl,))
+        try:
+            return measure_workload(cur, user_id, analyze=False)
+        finally:
+            cur.execute("SELECT hypopg_reset();")
+
+    _, ddl = candidate_ddl(columns, predicate, name, table=SCRATCH_TABLE)
+    cur.execute("SAVEPOINT index_trial;")
+    try:
+        cur.execute(ddl + ";")
+        return measure_workload(cur, user_id, analyze=True, table=SCRATCH_TABLE)
+    finally:
+        cur.execute("ROLLBACK TO SAVEPOINT index_trial;")
+
+
+# =========================================================
+# ADVISE
+# =========================================================
+
+def advise_node(node_name):
+    conn = psycopg2.connect(DATABASE_NODES[node_name])
+    cur = conn.cursor()
+    try:
+        statements = read_statement_workload(cur, node_name)
+        existing = read_index_usage(cur, node_name)
+
+        cur.execute("SELECT user_id FROM Task GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1;")
+        row = cur.fetchone()
+        if row is None:
+            print(f"[{node_name}] Task is empty; nothing to measure")
+            return None
+        user_id = row[0]
+
+        use_hypopg = has_extension(cur, "hypopg")
+        unit = "cost" if use_hypopg else "ms"
+        mode = "hypothetical (hypopg)" if use_hypopg else "trial build on a scratch copy + rollback"
+        print(f"[{node_name}] Measuring with {mode}")
+
+        table = "Task"
+        if not use_hypopg:
+            create_scratch_copy(cur, node_name)
+            table = SCRATCH_TABLE
+
+        baseline = measure_workload(cur, user_id, analyze=not use_hypopg, table=table)
+        suggestions = []
+        for columns, predicate in collect_candidates(statements, existing):
+            after = evaluate_candidate(cur, columns, predicate, user_id, use_hypopg)
+            before_total = sum(baseline.values())
+            after_total = sum(after.values())
+            suggestions.append({
+                "ddl": candidate_ddl(columns, predicate)[1],
+                "before": before_total,
+                "after": after_total,
+                "per_query": {label: (baseline[label], after[label]) for label in baseline},
+            })
+
+        suggestions.sort(key=lambda s: s["after"] - s["before"])
+        unused = [name for name, scans, _, unique, primary, _ in existing
+                  if scans == 0 and not unique and not primary]
+
+        print_node_report(node_name, unit, suggestions, unused)
+        return {"node": node_name, "unit": unit, "suggestions": suggestions, "unused": unused}
+    finally:
+        conn.rollback()
+        cur.close()
+        conn.close()
+
+
+def print_node_report(node_name, unit, suggestions, unused):
+    print(f"\n[{node_name}] Workload total before/after each candidate ({unit})")
+    for s in suggestions:
+        change = (s["before"] - s["after"]) / s["before"] * 100 if s["before"] else 0
+        print(f"  {s['before']:>10.2f} -> {s['after']:>10.2f}  ({change:+.1f}% faster)  {s['ddl']}")
+        for label, (before, after) in s["per_query"].items():
+            print(f"      {label:<32}{before:>10.2f} -> {after:>10.2f}")
+
+    for name in unused:
+        print(f"  Never scanned, consider dropping: {name}")
+
+
+def advise_all(output=None):
+    reports = []
+    for node_name in get_available_nodes():
+        try:
+            reports.append(advise_node(node_name))
+        except psycopg2.Error as e:
+            print(f"[{node_name}] Advisor failed: {str(e).strip()}")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump([r for r in reports if r], f, indent=2)
+        print(f"\nReport written to {output}")
+    return reports
+
+
+# =========================================================
+# RUN
+# =========================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Suggest indexes for the Task workload on every node")
+    parser.add_argument("--node", help="only advise this node")
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    if args.node:
+        advise_node(args.node)
+    else:
+        advise_all(args.output)
@@ -0,0 +1,252 @@
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+from psycopg2 import sql
+
+from distributedApp import DATABASE_NODES, get_available_nodes, timed_execute
+
+# =========================================================
+# MAINTENANCE SCHEDULER
+# =========================================================
+# Keeps planner statistics and dead-tuple counts in check on every node,
+# e.g. after generate_random_tasks loads thousands of rows at once.
+#
+# For each table in pg_stat_user_tables:
+#   ANALYZE when n_mod_since_analyze > ANALYZE_BASE + ANALYZE_SCALE * n_live_tup
+#   VACUUM  when n_dead_tup          > VACUUM_BASE  + VACUUM_SCALE  * n_live_tup
+# (the same shape as autovacuum's own thresholds, but checked whenever
+# the scheduler runs instead of waiting for the autovacuum naptime).
+#
+# Nodes are processed in parallel, at most max_parallel at a time, so a
+# fleet-wide pass takes about as long as the slowest node instead of
+# the sum of all nodes. VACUUM and CREATE INDEX CONCURRENTLY cannot run
+# inside a transaction, so this module uses autocommit connections.
+
+ANALYZE_BASE = 50
+ANALYZE_SCALE = 0.1
+VACUUM_BASE = 50
+VACUUM_SCALE = 0.2
+MAX_PARALLEL = 3
+CHECK_INTERVAL_SECONDS = 300
+PROGRESS_INTERVAL_SECONDS = 2
+
+_print_lock = threading.Lock()
+
+
+def _log(node_name, message):
+    with _print_lock:
+        print(f"[{node_name}] {message}")
+
+
+def _connect(node_name):
+    conn = psycopg2.connect(DATABASE_NODES[node_name])
+    conn.autocommit = True
+    return conn
+
+
+# =========================================================
+# STATISTICS
+# =========================================================
+
+def table_stats(cur, node_name):
+    timed_execute(cur, """
+        SELECT schemaname, relname, n_live_tup, n_dead_tup, n_mod_since_analyze
+        FROM pg_stat_user_tables
+        ORDER BY relname;
+    """, label="Read table stats", node_name=node_name)
+    return cur.fetchall()
+
+
+def plan_maintenance(stats):
+    actions = []
+    for schema, table, live, dead, modified in stats:
+        if dead > VACUUM_BASE + VACUUM_SCALE * live:
+            # VACUUM (ANALYZE) refreshes statistics in the same pass.
+            actions.append(("VACUUM", schema, table, dead))
+        elif modified > ANALYZE_BASE + ANALYZE_SCALE * live:
+            actions.append(("ANALYZE", schema, table, modified))
+    return actions
+
+
+# =========================================================
+# PER-NODE RUN
+# =========================================================
+
+def maintain_node(node_name, dry_run=False):
+    report = {"node": node_name, "actions": [], "error": None}
+    start = time.perf_counter()
+
+    try:
+        conn = _connect(node_name)
+        cur = conn.cursor()
+        try:
+            actions = plan_maintenance(table_stats(cur, node_name))
+            if not actions:
+                _log(node_name, "Statistics are fresh; nothing to do")
+
+            for i, (action, schema, table, changed_rows) in enumerate(actions, start=1):
+                _log(node_name, f"({i}/{len(actions)}) {action} {table} "
+                                f"({changed_rows} changed rows)")
+                if dry_run:
+                    report["actions"].append((action, table, 0.0))
+                    continue
+
+                statement = sql.SQL("VACUUM (ANALYZE) {}" if action == "VACUUM" else "ANALYZE {}")
+                statement = statement.format(sql.Identifier(schema, table))
+
+                action_start = time.perf_counter()
+                timed_execute(cur, statement.as_string(conn),
+                              label=action, node_name=node_name, detail=table)
+                report["actions"].append(
+                    (action, table, (time.perf_counter() - action_start) * 1000)
+                )
+        finally:
+            cur.close()
+            conn.close()
+    except psycopg2.Error as e:
+        report["error"] = str(e).strip()
+        _log(node_name, f"Maintenance failed: {report['error']}")
+
+    report["elapsed_ms"] = (time.perf_counter() - start) * 1000
+    return report
+
+
+def _run_on_nodes(func, max_parallel, *args):
+    nodes = get_available_nodes()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(nodes)))) as pool:
+        return list(pool.map(lambda node_name: func(node_name, *args), nodes))
+
+
+def print_report(reports):
+    print(f"\n{'node':<10}{'actions':>8}{'elapsed ms':>12}  status")
+    for report in reports:
+        status = "ERROR: " + report["error"] if report["error"] else "ok"
+        print(f"{report['node']:<10}{len(report['actions']):>8}"
+              f"{report['elapsed_ms']:>12.2f}  {status}")
+
+
+def run_once(max_parallel=MAX_PARALLEL, dry_run=False):
+    reports = _run_on_nodes(maintain_node, max_parallel, dry_run)
+    print_report(reports)
+    return reports
+
+
+def run_forever(interval=CHECK_INTERVAL_SECONDS, max_parallel=MAX_PARALLEL):
+    print(f"Maintenance scheduler checking every {interval}s "
+          f"(max {max_parallel} nodes in parallel)")
+    while True:
+        started = time.monotonic()
+        run_once(max_parallel)
+        time.sleep(max(interval - (time.monotonic() - started), 0))
+
+
+# =========================================================
+# CONCURRENT INDEX BUILDS
+# =========================================================
+# CREATE INDEX CONCURRENTLY does not block writes to the table while
+# the index builds. If a concurrent build fails it leaves an INVALID
+# index behind, which IF NOT EXISTS would then silently accept, so an
+# invalid index with the same name is dropped before building.
+
+def _watch_index_progress(node_name, stop):
+    conn = _connect(node_name)
+    cur = conn.cursor()
+    try:
+        while not stop.wait(PROGRESS_INTERVAL_SECONDS):
+            cur.execute("""
+                SELECT phase, blocks_done, blocks_total, tuples_done, tuples_total
+                FROM pg_stat_progress_create_index;
+            """)
+            for phase, blocks_done, blocks_total, tuples_done, tuples_total in cur.fetchall():
+                if blocks_total:
+                    done = f"{100.0 * blocks_done / blocks_total:.1f}% of blocks"
+                elif tuples_total:
+                    done = f"{100.0 * tuples_done / tuples_total:.1f}% of tuples"
+                else:
+                    done = "..."
+                _log(node_name, f"index build: {phase} {done}")
+    finally:
+        cur.close()
+        conn.close()
+
+
+def create_index_concurrently_on_node(node_name, index_name, table, columns):
+    report = {"node": node_name, "actions": [], "error": None}
+    start = time.perf_counter()
+    stop = threading.Event()
+    watcher = threading.Thread(target=_watch_index_progress, args=(node_name, stop), daemon=True)
+
+    try:
+        conn = _connect(node_name)
+        cur = conn.cursor()
+        try:
+            timed_execute(cur, """
+                SELECT NOT i.indisvalid
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE c.relname = %s;
+            """, (index_name.lower(),), label="Check index validity", node_name=node_name)
+            row = cur.fetchone()
+            if row and row[0]:
+                _log(node_name, f"Dropping invalid index {index_name}")
+                timed_execute(
+                    cur,
+                    sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}")
+                    .format(sql.Identifier(index_name.lower())).as_string(conn),
+                    label="Drop invalid index", node_name=node_name
+                )
+
+            watcher.start()
+            # The schema uses unquoted names (Task, user_id), which
+            # Postgres folds to lower case.
+            statement = sql.SQL("CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} ({})").format(
+                sql.Identifier(index_name.lower()),
+                sql.Identifier(table.lower()),
+                sql.SQL(", ").join(sql.Identifier(column.lower()) for column in columns)
+            )
+            action_start = time.perf_counter()
+            timed_execute(cur, statement.as_string(conn),
+                          label="Create index", node_name=node_name, detail=index_name)
+            report["actions"].append(
+                ("CREATE INDEX", table, (time.perf_counter() - action_start) * 1000)
+            )
+        finally:
+            stop.set()
+            cur.close()
+            conn.close()
+    except psycopg2.Error as e:
+        report["error"] = str(e).strip()
+        _log(node_name, f"Index build failed: {report['error']}")
+
+    report["elapsed_ms"] = (time.perf_counter() - start) * 1000
+    return report
+
+
+def create_index_concurrently_all(index_name, table, columns, max_parallel=MAX_PARALLEL):
+    reports = _run_on_nodes(
+        create_index_concurrently_on_node, max_parallel, index_name, table, columns
+    )
+    print_report(reports)
+    return reports
+
+
+# =========================================================
+# RUN
+# =========================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ANALYZE / VACUUM / index maintenance on every node")
+    parser.add_argument("command", choices=["once", "watch", "dry-run"])
+    parser.add_argument("--parallel", type=int, default=MAX_PARALLEL)
+    parser.add_argument("--interval", type=int, default=CHECK_INTERVAL_SECONDS)
+    args = parser.parse_args()
+
+    if args.command == "once":
+        run_once(args.parallel)
+    elif args.command == "dry-run":
+        run_once(args.parallel, dry_run=True)
+    else:
+        run_forever(args.interval, args.parallel)
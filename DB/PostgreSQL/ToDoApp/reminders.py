@@ -0,0 +1,337 @@
+import argparse
+import os
+import select
+import time
+
+import psycopg2
+
+from app import DATABASE_URL, timed_execute
+
+# =========================================================
+# REMINDER DISPATCH
+# =========================================================
+# Delivers Task.reminder_time reminders.
+#
+# - A partial index holds only reminders that are scheduled and not
+#   yet sent, so finding due work costs O(log n) however many
+#   reminders have already been delivered.
+# - Workers claim due rows in batches with FOR UPDATE SKIP LOCKED.
+#   Any number of workers can run against the same database; each row
+#   is handed to exactly one of them.
+# - reminder_sent_at is set in the same transaction that claimed the
+#   row and is committed only after the batch was sent. If a worker
+#   dies mid-batch, the rows unlock and another worker picks them up
+#   (at-least-once delivery).
+# - Between batches a worker sleeps until the next reminder is due,
+#   not counting rows another worker holds locked, so idle workers do
+#   not spin while one of them is sending. A trigger NOTIFYs on new or
+#   changed reminders so a sleeping worker wakes up early when
+#   something is scheduled sooner.
+# - Moving a reminder_time clears reminder_sent_at, so a rescheduled
+#   reminder fires again.
+# - A reminder whose send() fails is not retried with its batch: it is
+#   released with reminder_retry_at set (exponential backoff) and the
+#   rest of the batch is committed. After MAX_SEND_ATTEMPTS failures it
+#   stays marked as sent and is reported as given up.
+
+REMINDER_CHANNEL = "task_reminders"
+DEFAULT_BATCH_SIZE = 500
+MAX_SLEEP_SECONDS = 60
+MIN_IDLE_SLEEP_SECONDS = 0.5
+ERROR_BACKOFF_SECONDS = 5
+RETRY_BACKOFF_SECONDS = 30
+MAX_RETRY_BACKOFF_SECONDS = 3600
+MAX_SEND_ATTEMPTS = 5
+
+
+# =========================================================
+# SCHEMA
+# =========================================================
+
+def init_reminders(dsn=DATABASE_URL, node=None):
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    where = {"node_name": node, "dsn": dsn}
+    try:
+        timed_execute(cur, """
+            ALTER TABLE Task
+            ADD COLUMN IF NOT EXISTS reminder_sent_at TIMESTAMPTZ,
+            ADD COLUMN IF NOT EXISTS reminder_attempts INTEGER NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS reminder_retry_at TIMESTAMPTZ;
+        """, label="Add reminder delivery columns", **where)
+
+        timed_execute(cur, """
+            CREATE INDEX IF NOT EXISTS idx_task_reminder_due
+            ON Task(reminder_time)
+            WHERE reminder_time IS NOT NULL AND reminder_sent_at IS NULL;
+        """, label="Create reminder due index", **where)
+
+        timed_execute(cur, """
+            CREATE INDEX IF NOT EXISTS idx_task_reminder_retry
+            ON Task(reminder_retry_at)
+            WHERE reminder_retry_at IS NOT NULL AND reminder_sent_at IS NULL;
+        """, label="Create reminder retry index", **where)
+
+        timed_execute(cur, """
+            CREATE OR REPLACE FUNCTION reset_task_reminder_sent() RETURNS trigger AS $$
+            BEGIN
+                IF NEW.reminder_time IS DISTINCT FROM OLD.reminder_time THEN
+                    NEW.reminder_sent_at := NULL;
+                    NEW.reminder_attempts := 0;
+                    NEW.reminder_retry_at := NULL;
+                END IF;
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+
+            DROP TRIGGER IF EXISTS trg_task_reminder_reset ON Task;
+
+            CREATE TRIGGER trg_task_reminder_reset
+            BEFORE UPDATE OF reminder_time ON Task
+            FOR EACH ROW EXECUTE FUNCTION reset_task_reminder_sent();
+        """, label="Create reminder reset trigger", **where)
+
+        # An empty payload lets Postgres fold all notifications from one
+        # transaction into one, so bulk inserts do not flood workers.
+        timed_execute(cur, f"""
+            CREATE OR REPLACE FUNCTION notify_task_reminder() RETURNS trigger AS $$
+            BEGIN
+                IF NEW.reminder_time IS NOT NULL AND NEW.reminder_sent_at IS NULL THEN
+                    PERFORM pg_notify('{REMINDER_CHANNEL}', '');
+                END IF;
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+
+            DROP TRIGGER IF EXISTS trg_task_reminder_notify ON Task;
+
+            CREATE TRIGGER trg_task_reminder_notify
+            AFTER INSERT OR UPDATE OF reminder_time ON Task
+            FOR EACH ROW EXECUTE FUNCTION notify_task_reminder();
+        """, label="Create reminder notify trigger", **where)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+# =========================================================
+# CLAIM + SEND
+# =========================================================
+
+def claim_due_reminders(cur, batch_size=DEFAULT_BATCH_SIZE, node=None, dsn=None):
+    timed_execute(cur, """
+        WITH due AS (
+            SELECT id
+            FROM Task
+            WHERE reminder_time IS NOT NULL
+              AND reminder_sent_at IS NULL
+              AND reminder_time <= NOW()
+              AND (reminder_retry_at IS NULL OR reminder_retry_at <= NOW())
+            ORDER BY reminder_time
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE Task t
+        SET reminder_sent_at = NOW()
+        FROM due
+        WHERE t.id = due.id
+        RETURNING t.id, t.user_id, t.title, t.reminder_time, t.reminder_attempts;
+    """, (batch_size,), label="Claim due reminders", node_name=node, dsn=dsn)
+    return cur.fetchall()
+
+
+def release_failed_reminder(cur, task_id, attempts, node=None, dsn=None):
+    # attempts: failures before this one. Returns True if the reminder
+    # will be retried, False if it was given up.
+    attempts += 1
+    retry = attempts < MAX_SEND_ATTEMPTS
+    delay = min(RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_RETRY_BACKOFF_SECONDS)
+    timed_execute(cur, """
+        UPDATE Task
+        SET reminder_attempts = %s,
+            reminder_sent_at = CASE WHEN %s THEN NULL ELSE reminder_sent_at END,
+            reminder_retry_at = NOW() + make_interval(secs => %s)
+        WHERE id = %s;
+    """, (attempts, retry, delay, task_id), label="Release failed reminder",
+        node_name=node, dsn=dsn)
+    return retry
+
+
+def seconds_until_next_reminder(cur, node=None, dsn=None):
+    # SKIP LOCKED leaves out rows another worker has claimed and is
+    # still sending; counting them would make this worker wake up at
+    # once and spin until that worker commits. Reminders waiting out a
+    # retry backoff count from their reminder_retry_at instead.
+    timed_execute(cur, """
+        SELECT EXTRACT(EPOCH FROM (reminder_time - NOW()))
+        FROM Task
+        WHERE reminder_time IS NOT NULL
+          AND reminder_sent_at IS NULL
+          AND (reminder_retry_at IS NULL OR reminder_retry_at <= NOW())
+        ORDER BY reminder_time
+        LIMIT 1
+        FOR KEY SHARE SKIP LOCKED;
+    """, label="Next reminder time", node_name=node, dsn=dsn)
+    waits = [row[0] for row in cur.fetchall()]
+
+    timed_execute(cur, """
+        SELECT EXTRACT(EPOCH FROM (MIN(reminder_retry_at) - NOW()))
+        FROM Task
+        WHERE reminder_retry_at > NOW()
+          AND reminder_sent_at IS NULL;
+    """, label="Next reminder retry time", node_name=node, dsn=dsn)
+    waits.append(cur.fetchone()[0])
+
+    waits = [float(w) for w in waits if w is not None]
+    if not waits:
+        return None
+    return max(min(waits), 0.0)
+
+
+def print_reminder(reminder):
+    task_id, user_id, title, reminder_time = reminder
+    print(f"🔔 Reminder for user {user_id}: task {task_id} '{title}' (due {reminder_time})")
+
+
+# =========================================================
+# DISPATCHER
+# =========================================================
+
+class ReminderDispatcher:
+    def __init__(self, dsn=DATABASE_URL, send=print_reminder,
+                 batch_size=DEFAULT_BATCH_SIZE, max_sleep=MAX_SLEEP_SECONDS, node=None):
+        self.dsn = dsn
+        self.node = node
+        self.send = send
+        self.batch_size = batch_size
+        self.max_sleep = max_sleep
+        self.running = False
+        self.sent = 0
+
+    def _connect(self):
+        self.conn = psycopg2.connect(self.dsn)
+
+        self.listen_conn = psycopg2.connect(self.dsn)
+        self.listen_conn.autocommit = True
+        listen_cur = self.listen_conn.cursor()
+        listen_cur.execute(f"LISTEN {REMINDER_CHANNEL};")
+        listen_cur.close()
+
+    def _close(self):
+        for conn in (getattr(self, "conn", None), getattr(self, "listen_conn", None)):
+            if conn is not None and not conn.closed:
+                conn.close()
+
+    def dispatch_batch(self):
+        cur = self.conn.cursor()
+        sent = 0
+        try:
+            reminders = claim_due_reminders(cur, self.batch_size, self.node, self.dsn)
+            for *reminder, attempts in reminders:
+                try:
+                    self.send(tuple(reminder))
+                except Exception as e:
+                    # Only this reminder is released; the others in the
+                    # batch were delivered and are committed below.
+                    task_id = reminder[0]
+                    if release_failed_reminder(cur, task_id, attempts, self.node, self.dsn):
+                        print(f"⚠ Reminder for task {task_id} failed, will retry: {e}")
+                    else:
+                        print(f"⚠ Reminder for task {task_id} failed "
+                              f"{MAX_SEND_ATTEMPTS} times, giving up: {e}")
+                    continue
+                sent += 1
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+        self.sent += sent
+        return len(reminders)
+
+    def _sleep_until_due(self, claimed):
+        cur = self.conn.cursor()
+        try:
+            wait = seconds_until_next_reminder(cur, self.node, self.dsn)
+            self.conn.commit()
+        finally:
+            cur.close()
+
+        if wait is None or wait > self.max_sleep:
+            wait = self.max_sleep
+        if wait <= 0:
+            if claimed:
+                return
+            # Due, but our claim came back empty (another worker got
+            # there first): back off briefly instead of spinning.
+            wait = MIN_IDLE_SLEEP_SECONDS
+
+        ready, _, _ = select.select([self.listen_conn], [], [], wait)
+        if ready:
+            self.listen_conn.poll()
+            self.listen_conn.notifies.clear()
+
+    def run(self):
+        self._connect()
+        self.running = True
+        print(f"Reminder dispatcher started (batch size {self.batch_size})")
+
+        try:
+            while self.running:
+                try:
+                    claimed = self.dispatch_batch()
+                    # A full batch means more reminders are probably due already.
+                    if claimed < self.batch_size:
+                        self._sleep_until_due(claimed)
+                except Exception as e:
+                    # A lost connection or failing query must not end the
+                    # dispatcher; the batch was rolled back and will be
+                    # claimed again.
+                    print(f"⚠ Reminder batch failed: {e}")
+                    time.sleep(ERROR_BACKOFF_SECONDS)
+                    if self.conn.closed or self.listen_conn.closed:
+                        try:
+                            self._close()
+                            self._connect()
+                        except psycopg2.Error as e:
+                            print(f"⚠ Reconnect failed: {e}")
+        finally:
+            self._close()
+            print(f"Reminder dispatcher stopped after {self.sent} reminders")
+
+    def stop(self):
+        self.running = False
+
+
+# =========================================================
+# RUN
+# =========================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dispatch due Task reminders")
+    parser.add_argument("--node", help="distributed node name, e.g. NODE1 (uses DATABASE_URL_<NODE>)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--init", action="store_true", help="create the reminder index and trigger first")
+    args = parser.parse_args()
+
+    dsn = DATABASE_URL
+    if args.node:
+        dsn = os.getenv(f"DATABASE_URL_{args.node.upper()}")
+        if not dsn:
+            raise ValueError(f"Missing environment variable: DATABASE_URL_{args.node.upper()}")
+
+    if args.init:
+        init_reminders(dsn, args.node)
+
+    dispatcher = ReminderDispatcher(dsn, batch_size=args.batch_size, node=args.node)
+    try:
+        dispatcher.run()
+    except KeyboardInterrupt:
+        dispatcher.stop()
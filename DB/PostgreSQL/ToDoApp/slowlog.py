@@ -0,0 +1,230 @@
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+
+import psycopg2
+
+# =========================================================
+# SLOW-QUERY LOG
+# =========================================================
+# timed_execute (app.py, distributedApp.py) calls submit() when a
+# statement took longer than SLOW_QUERY_MS. The statement, its bind
+# parameters and timing go on a queue. A background thread opens its
+# own connection and runs EXPLAIN (FORMAT JSON) for the statement, so
+# the request that was slow is not slowed down further.
+#
+# EXPLAIN without ANALYZE only plans the statement; INSERT/UPDATE/
+# DELETE are never executed a second time.
+#
+# Plans are fingerprinted by their shape: node types, tables, indexes
+# and join types, without costs or row estimates. The first time a
+# (label, fingerprint) pair is seen, the full entry is appended to
+# SLOW_QUERY_LOG. Repeats only bump a counter (see summary()), so the
+# log shows one line per distinct plan. A new line for the same label
+# means its plan changed, which is usually the regression you are
+# looking for.
+#
+#   SLOW_QUERY_MS=200            threshold in ms (unset or 0 = off)
+#   SLOW_QUERY_LOG=path.jsonl    where entries go
+#   SLOW_QUERY_LOG_PARAMS=0      do not write bind parameters
+
+THRESHOLD_MS = float(os.getenv("SLOW_QUERY_MS", "0") or 0)
+LOG_PATH = os.getenv("SLOW_QUERY_LOG", "slow_queries.jsonl")
+LOG_PARAMS = os.getenv("SLOW_QUERY_LOG_PARAMS", "1") == "1"
+QUEUE_SIZE = 1000
+MAX_PARAM_LENGTH = 200
+
+EXPLAINABLE_KEYWORDS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "VALUES", "TABLE")
+
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+_lock = threading.Lock()
+_seen = {}
+_worker = None
+dropped = 0
+
+
+def set_threshold(threshold_ms):
+    global THRESHOLD_MS
+    THRESHOLD_MS = threshold_ms
+
+
+def submit(label, query, params, elapsed_ms, dsn, node=None):
+    global dropped
+
+    if not THRESHOLD_MS or elapsed_ms < THRESHOLD_MS or not dsn:
+        return
+
+    _start_worker()
+    entry = {
+        "timestamp": time.time(),
+        "label": label,
+        "node": node,
+        "elapsed_ms": round(elapsed_ms, 3),
+        "query": query.strip(),
+        "params": params,
+    }
+    try:
+        _queue.put_nowait((entry, dsn))
+    except queue.Full:
+        # Never block the caller; losing a log line is better than
+        # adding latency to every request while the worker catches up.
+        dropped += 1
+
+
+# =========================================================
+# PLAN CAPTURE
+# =========================================================
+
+def _explainable(query):
+    statement = query.strip().rstrip(";").strip()
+    if not statement or ";" in statement:
+        # Multi-statement strings (DDL scripts) cannot be EXPLAINed.
+        return None
+
+    lines = [line for line in statement.splitlines() if not line.strip().startswith("--")]
+    statement = "\n".join(lines).strip()
+    if not statement.upper().startswith(EXPLAINABLE_KEYWORDS):
+        return None
+    return statement
+
+
+def _plan_shape(plan):
+    return {
+        "type": plan.get("Node Type"),
+        "relation": plan.get("Relation Name"),
+        "index": plan.get("Index Name"),
+        "join": plan.get("Join Type"),
+        "strategy": plan.get("Strategy"),
+        "children": [_plan_shape(child) for child in plan.get("Plans", [])],
+    }
+
+
+def plan_fingerprint(plan):
+    shape = json.dumps(_plan_shape(plan), sort_keys=True)
+    return hashlib.sha1(shape.encode()).hexdigest()[:16]
+
+
+def _json_params(params):
+    if not LOG_PARAMS or params is None:
+        return None
+
+    def short(value):
+        text = value if isinstance(value, (int, float, bool)) or value is None else str(value)
+        if isinstance(text, str) and len(text) > MAX_PARAM_LENGTH:
+            text = text[:MAX_PARAM_LENGTH] + "..."
+        return text
+
+    if isinstance(params, dict):
+        return {key: short(value) for key, value in params.items()}
+    return [short(value) for value in params]
+
+
+class _Explainer:
+    def __init__(self):
+        self.connections = {}
+
+    def _conn(self, dsn):
+        conn = self.connections.get(dsn)
+        if conn is None or conn.closed:
+            conn = psycopg2.connect(dsn)
+            conn.autocommit = True
+            self.connections[dsn] = conn
+        return conn
+
+    def _drop(self, dsn):
+        # Close before forgetting it, or the socket and the server
+        # session stay open until garbage collection.
+        conn = self.connections.pop(dsn, None)
+        if conn is not None and not conn.closed:
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+
+    def explain(self, statement, params, dsn):
+        cur = self._conn(dsn).cursor()
+        try:
+            cur.execute("EXPLAIN (FORMAT JSON) " + statement, params or None)
+            return cur.fetchone()[0][0]["Plan"]
+        finally:
+            cur.close()
+
+    def handle(self, entry, dsn):
+        statement = _explainable(entry["query"])
+        plan = None
+        fingerprint = None
+
+        if statement is not None:
+            try:
+                plan = self.explain(statement, entry["params"], dsn)
+                fingerprint = plan_fingerprint(plan)
+            except psycopg2.Error as e:
+                entry["explain_error"] = str(e).strip()
+                self._drop(dsn)
+
+        key = (entry["label"], entry["node"], fingerprint)
+        with _lock:
+            stats = _seen.get(key)
+            if stats is not None:
+                stats["count"] += 1
+                stats["max_ms"] = max(stats["max_ms"], entry["elapsed_ms"])
+                return
+            _seen[key] = {"count": 1, "max_ms": entry["elapsed_ms"]}
+
+        entry["params"] = _json_params(entry["params"])
+        entry["fingerprint"] = fingerprint
+        entry["plan"] = plan
+        with open(LOG_PATH, "a") as f:
+            f.write(json.dumps(entry, default=str) + "\n")
+
+        print(f"🐢 Slow query logged: {entry['label']} "
+              f"({entry['elapsed_ms']:.2f} ms, plan {fingerprint})")
+
+
+def _run_worker():
+    explainer = _Explainer()
+    while True:
+        entry, dsn = _queue.get()
+        try:
+            explainer.handle(entry, dsn)
+        except Exception as e:
+            print(f"⚠ Slow-query log failed: {e}")
+        finally:
+            _queue.task_done()
+
+
+def _start_worker():
+    global _worker
+    if _worker is not None:
+        return
+    with _lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run_worker, daemon=True)
+            _worker.start()
+
+
+def flush(timeout=5.0):
+    # Give queued EXPLAINs a chance to finish, e.g. before the script exits.
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+atexit.register(flush)
+
+
+def summary():
+    with _lock:
+        items = sorted(_seen.items(), key=lambda item: -item[1]["count"])
+
+    print(f"{'label':<40}{'node':<10}{'plan':<18}{'count':>7}{'max ms':>10}")
+    for (label, node, fingerprint), stats in items:
+        print(f"{label[:39]:<40}{node or '':<10}{fingerprint or '-':<18}"
+              f"{stats['count']:>7}{stats['max_ms']:>10.2f}")
+    if dropped:
+        print(f"({dropped} slow queries dropped because the queue was full)")
+    return items
@@ -0,0 +1,347 @@
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from aggregation import TaskDashboard, get_postgres_conn_cursor, get_task_dashboard
+
+# =========================================================
+# COLUMNAR SNAPSHOT OF task
+# =========================================================
+# Copies task out of Postgres ONCE and keeps it on local disk as one
+# raw binary file per column. Queries memory-map those files and run
+# the aggregation.py aggregates with NumPy, so repeated analytics
+# never go back over the network.
+#
+# Layout of SNAPSHOT_DIR:
+#   manifest.json          row count, max id, dictionaries
+#   id.bin                 int64
+#   priority.bin           int16
+#   estimated_hours.bin    int32
+#   status.bin             uint8   (code into manifest["status_dict"])
+#   title.bin              uint32  (code into manifest["title_dict"])
+#
+# status and title are dictionary-encoded: each distinct string is
+# stored once in the manifest and the column holds small integer codes.
+#
+# refresh() appends rows with id > max id. SERIAL ids are handed out
+# at INSERT time but become visible at COMMIT, so a slow transaction
+# can commit id 90 after id 100 was already copied. To catch those,
+# refresh() also re-reads the last REFRESH_OVERLAP_IDS ids below max
+# id and keeps only the ones not already in the snapshot. A row that
+# commits later than that window, and any UPDATE or DELETE of a row
+# already in the snapshot, is only picked up by build().
+#
+# manifest.json is the commit point: it is written last, by rename,
+# once every column file is complete. build() removes it first, so a
+# build that dies partway leaves no snapshot rather than an old
+# manifest pointing at half-written columns.
+
+SNAPSHOT_DIR = os.getenv("TASK_SNAPSHOT_DIR", "task_snapshot")
+CHUNK_ROWS = 100_000
+REFRESH_OVERLAP_IDS = int(os.getenv("TASK_SNAPSHOT_OVERLAP_IDS", "10000"))
+
+COLUMN_DTYPES = {
+    "id": np.int64,
+    "priority": np.int16,
+    "estimated_hours": np.int32,
+    "status": np.uint8,
+    "title": np.uint32,
+}
+
+COPY_SQL = """
+    COPY (
+        SELECT id, title, status, priority, estimated_hours
+        FROM task
+        WHERE id > {min_id}
+        ORDER BY id
+    ) TO STDOUT WITH (FORMAT csv)
+"""
+
+
+# =========================================================
+# MANIFEST
+# =========================================================
+
+def _manifest_path(directory):
+    return os.path.join(directory, "manifest.json")
+
+
+def _column_path(directory, column):
+    return os.path.join(directory, f"{column}.bin")
+
+
+def _empty_manifest():
+    return {"rows": 0, "max_id": 0, "status_dict": [], "title_dict": []}
+
+
+def load_manifest(directory=SNAPSHOT_DIR):
+    path = _manifest_path(directory)
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(directory, manifest):
+    # Write then rename so a crash never leaves a half-written manifest.
+    tmp_path = _manifest_path(directory) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, _manifest_path(directory))
+
+
+# =========================================================
+# BUILD + REFRESH
+# =========================================================
+
+def _encode(values, dictionary, lookup, column):
+    max_code = np.iinfo(COLUMN_DTYPES[column]).max
+    codes = []
+    for value in values:
+        code = lookup.get(value)
+        if code is None:
+            code = len(dictionary)
+            if code > max_code:
+                raise ValueError(
+                    f"{column} has more than {max_code + 1} distinct values; "
+                    f"widen its dtype in COLUMN_DTYPES and run build"
+                )
+            dictionary.append(value)
+            lookup[value] = code
+        codes.append(code)
+    return codes
+
+
+def _append_chunk(directory, manifest, lookups, rows):
+    ids, titles, statuses, priorities, hours = zip(*rows)
+
+    columns = {
+        "id": ids,
+        "priority": priorities,
+        "estimated_hours": hours,
+        "status": _encode(statuses, manifest["status_dict"], lookups["status"], "status"),
+        "title": _encode(titles, manifest["title_dict"], lookups["title"], "title"),
+    }
+
+    for column, values in columns.items():
+        array = np.asarray(values, dtype=COLUMN_DTYPES[column])
+        with open(_column_path(directory, column), "ab") as f:
+            array.tofile(f)
+
+    manifest["rows"] += len(rows)
+    manifest["max_id"] = max(manifest["max_id"], int(max(ids)))
+
+
+def _copy_new_rows(directory, manifest):
+    lookups = {
+        "status": {v: i for i, v in enumerate(manifest["status_dict"])},
+        "title": {v: i for i, v in enumerate(manifest["title_dict"])},
+    }
+
+    # Drop anything past the last committed manifest, e.g. a chunk that
+    # was written before an interrupted refresh could save the manifest.
+    # Only ever shrink: a column shorter than the manifest is corrupt,
+    # and os.truncate would silently pad it with zeros.
+    for column, dtype in COLUMN_DTYPES.items():
+        path = _column_path(directory, column)
+        expected = manifest["rows"] * np.dtype(dtype).itemsize
+        if not os.path.exists(path):
+            size = 0
+        else:
+            size = os.path.getsize(path)
+        if size < expected:
+            raise RuntimeError(
+                f"{path} has {size} bytes, manifest expects {expected}; run build"
+            )
+        if size > expected:
+            os.truncate(path, expected)
+
+    # Ids in the overlap window that the snapshot already holds; rows
+    # there that are not in this set committed out of order.
+    window_start = max(0, int(manifest["max_id"]) - REFRESH_OVERLAP_IDS)
+    known_ids = set()
+    if manifest["rows"]:
+        ids = np.memmap(_column_path(directory, "id"), dtype=COLUMN_DTYPES["id"],
+                        mode="r", shape=(manifest["rows"],))
+        known_ids = set(ids[ids > window_start].tolist())
+        del ids
+
+    start = time.perf_counter()
+
+    # COPY streams into a temporary file on disk, then the file is
+    # parsed in fixed-size chunks, so memory use does not grow with
+    # the size of task.
+    with tempfile.TemporaryFile(mode="w+", newline="") as spool:
+        with get_postgres_conn_cursor() as (_, cur):
+            cur.copy_expert(COPY_SQL.format(min_id=window_start), spool)
+
+        spool.seek(0)
+        chunk = []
+        copied = 0
+        for row in csv.reader(spool):
+            if int(row[0]) in known_ids:
+                continue
+            chunk.append((int(row[0]), row[1], row[2], int(row[3]), int(row[4])))
+            if len(chunk) >= CHUNK_ROWS:
+                _append_chunk(directory, manifest, lookups, chunk)
+                copied += len(chunk)
+                chunk = []
+        if chunk:
+            _append_chunk(directory, manifest, lookups, chunk)
+            copied += len(chunk)
+
+    _save_manifest(directory, manifest)
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"⏱ Snapshot copied {copied} rows in {elapsed_ms:.2f} ms "
+          f"(total {manifest['rows']}, max id {manifest['max_id']})")
+    return copied
+
+
+def build(directory=SNAPSHOT_DIR):
+    os.makedirs(directory, exist_ok=True)
+    if os.path.exists(_manifest_path(directory)):
+        os.remove(_manifest_path(directory))
+    for column in COLUMN_DTYPES:
+        path = _column_path(directory, column)
+        if os.path.exists(path):
+            os.remove(path)
+
+    return _copy_new_rows(directory, _empty_manifest())
+
+
+def refresh(directory=SNAPSHOT_DIR):
+    manifest = load_manifest(directory)
+    if manifest is None:
+        return build(directory)
+
+    return _copy_new_rows(directory, manifest)
+
+
+# =========================================================
+# QUERY
+# =========================================================
+
+class TaskSnapshot:
+    def __init__(self, directory=SNAPSHOT_DIR):
+        manifest = load_manifest(directory)
+        if manifest is None:
+            raise FileNotFoundError(f"No snapshot in {directory}; run build first")
+
+        self.manifest = manifest
+        self.status_dict = manifest["status_dict"]
+        self.title_dict = manifest["title_dict"]
+        self.rows = manifest["rows"]
+        self.columns = {}
+
+        for column, dtype in COLUMN_DTYPES.items():
+            if self.rows == 0:
+                self.columns[column] = np.empty(0, dtype=dtype)
+            else:
+                self.columns[column] = np.memmap(
+                    _column_path(directory, column),
+                    dtype=dtype,
+                    mode="r",
+                    shape=(self.rows,)
+                )
+
+    def status_code(self, status):
+        try:
+            return self.status_dict.index(status)
+        except ValueError:
+            return None
+
+    def dashboard(self):
+        start = time.perf_counter()
+
+        hours = self.columns["estimated_hours"]
+        priority = self.columns["priority"]
+        status = self.columns["status"]
+
+        result = TaskDashboard(total_tasks=self.rows)
+
+        if self.rows:
+            completed_code = self.status_code("completed")
+            if completed_code is None:
+                completed = np.zeros(self.rows, dtype=bool)
+            else:
+                completed = status == completed_code
+            completed_hours = hours[completed]
+
+            result.min_priority = int(priority.min())
+            result.avg_estimated_hours = float(hours.mean(dtype=np.float64))
+            result.count_completed = int(completed.sum())
+            if completed_hours.size:
+                result.max_completed_hours = int(completed_hours.max())
+                result.sum_completed_hours = int(completed_hours.sum(dtype=np.int64))
+
+            counts = np.bincount(status, minlength=len(self.status_dict))
+            sums = np.bincount(status, weights=hours, minlength=len(self.status_dict))
+            for code, name in enumerate(self.status_dict):
+                if counts[code]:
+                    result.avg_hours_per_status[name] = float(sums[code] / counts[code])
+
+            values, counts = np.unique(priority, return_counts=True)
+            result.count_per_priority = {
+                int(value): int(count) for value, count in zip(values, counts)
+            }
+
+        result.elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"⏱ Snapshot dashboard executed in {result.elapsed_ms:.2f} ms")
+        return result
+
+
+# =========================================================
+# BENCHMARK
+# =========================================================
+
+def benchmark(directory=SNAPSHOT_DIR, repeat=5):
+    snapshot = TaskSnapshot(directory)
+
+    postgres_ms = []
+    snapshot_ms = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        get_task_dashboard()
+        postgres_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        snapshot.dashboard()
+        snapshot_ms.append((time.perf_counter() - start) * 1000)
+
+    postgres_best = min(postgres_ms)
+    snapshot_best = min(snapshot_ms)
+
+    print(f"\nSnapshot benchmark (best of {repeat} runs, {snapshot.rows} rows)")
+    print(f"  Postgres dashboard: {postgres_best:.2f} ms")
+    print(f"  snapshot dashboard: {snapshot_best:.2f} ms")
+    print(f"  speedup:            {postgres_best / snapshot_best:.2f}x")
+    return postgres_best, snapshot_best
+
+
+# =========================================================
+# MAIN
+# =========================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar snapshot of the task table")
+    parser.add_argument("command", choices=["build", "refresh", "query", "benchmark"])
+    parser.add_argument("--dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.dir)
+    elif args.command == "refresh":
+        refresh(args.dir)
+    elif args.command == "query":
+        print(TaskSnapshot(args.dir).dashboard())
+    else:
+        benchmark(args.dir, args.repeat)
@@ -0,0 +1,216 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# =========================================================
+# QUERY TRACING
+# =========================================================
+# timed_execute (app.py, distributedApp.py) and timed_postgres_execute
+# (aggregation.py) call record() for every statement they run. Each
+# call produces a TraceRecord in a fixed-size ring buffer and updates
+# a per-(label, node) latency histogram.
+#
+# Labels become Prometheus label values, so they must be fixed strings
+# ("Create partition"), never built from data. The variable part (a
+# row count, a partition name) goes in detail, which is kept on the
+# TraceRecord and in the JSONL export but not in the histograms.
+#
+# Tracing is off unless QUERY_TRACING=1 is set or enable() is called.
+# When it is off, timed_execute only checks tracing.ENABLED, so the
+# cost is one attribute lookup per statement.
+#
+# Export:
+#   export_jsonl(path)   append the buffered records to a JSONL file
+#   prometheus_text()    histograms in Prometheus text format
+#   serve_metrics(port)  serve prometheus_text() at /metrics
+
+ENABLED = os.getenv("QUERY_TRACING", "0") == "1"
+BUFFER_SIZE = int(os.getenv("QUERY_TRACE_BUFFER", "10000"))
+
+# Upper bounds (ms) of the histogram buckets; +Inf is implied.
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+METRIC_PREFIX = "todo_query"
+
+
+@dataclass
+class TraceRecord:
+    timestamp: float
+    label: str
+    node: str
+    duration_ms: float
+    rows: int
+    error: str = None
+    detail: str = None
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.bucket_counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.errors = 0
+        self.rows = 0
+
+    def observe(self, duration_ms, rows, error):
+        index = len(BUCKETS_MS)
+        for i, bound in enumerate(BUCKETS_MS):
+            if duration_ms <= bound:
+                index = i
+                break
+        self.bucket_counts[index] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        if error:
+            self.errors += 1
+        if rows and rows > 0:
+            self.rows += rows
+
+    def percentile(self, p):
+        # Upper bound of the bucket that contains the p-th percentile.
+        if not self.count:
+            return None
+        target = self.count * p / 100.0
+        seen = 0
+        for bound, bucket_count in zip(BUCKETS_MS + (float("inf"),), self.bucket_counts):
+            seen += bucket_count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+_lock = threading.Lock()
+_buffer = deque(maxlen=BUFFER_SIZE)
+_histograms = {}
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+def reset():
+    with _lock:
+        _buffer.clear()
+        _histograms.clear()
+
+
+def record(label, node, duration_ms, rows=-1, error=None, detail=None):
+    node = node or "primary"
+    error_text = f"{type(error).__name__}: {error}" if error else None
+    trace = TraceRecord(time.time(), label, node, duration_ms, rows, error_text, detail)
+
+    with _lock:
+        _buffer.append(trace)
+        histogram = _histograms.get((label, node))
+        if histogram is None:
+            histogram = _histograms[(label, node)] = LatencyHistogram()
+        histogram.observe(duration_ms, rows, error)
+
+    return trace
+
+
+def recent(n=None):
+    with _lock:
+        records = list(_buffer)
+    return records if n is None else records[-n:]
+
+
+def histograms():
+    with _lock:
+        return dict(_histograms)
+
+
+# =========================================================
+# EXPORT
+# =========================================================
+
+def export_jsonl(path="query_trace.jsonl", clear=True):
+    with _lock:
+        records = list(_buffer)
+        if clear:
+            _buffer.clear()
+
+    with open(path, "a") as f:
+        for trace in records:
+            f.write(json.dumps(asdict(trace)) + "\n")
+
+    print(f"Exported {len(records)} trace records to {path}")
+    return len(records)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    lines = [
+        f"# HELP {METRIC_PREFIX}_duration_ms Statement latency in milliseconds.",
+        f"# TYPE {METRIC_PREFIX}_duration_ms histogram",
+    ]
+    errors = [
+        f"# HELP {METRIC_PREFIX}_errors_total Statements that raised an error.",
+        f"# TYPE {METRIC_PREFIX}_errors_total counter",
+    ]
+    rows = [
+        f"# HELP {METRIC_PREFIX}_rows_total Rows reported by cursor.rowcount.",
+        f"# TYPE {METRIC_PREFIX}_rows_total counter",
+    ]
+
+    for (label, node), histogram in sorted(histograms().items()):
+        labels = f'label="{_escape(label)}",node="{_escape(node)}"'
+
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS_MS, histogram.bucket_counts):
+            cumulative += bucket_count
+            lines.append(f'{METRIC_PREFIX}_duration_ms_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{METRIC_PREFIX}_duration_ms_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f"{METRIC_PREFIX}_duration_ms_sum{{{labels}}} {histogram.total_ms:.3f}")
+        lines.append(f"{METRIC_PREFIX}_duration_ms_count{{{labels}}} {histogram.count}")
+
+        errors.append(f"{METRIC_PREFIX}_errors_total{{{labels}}} {histogram.errors}")
+        rows.append(f"{METRIC_PREFIX}_rows_total{{{labels}}} {histogram.rows}")
+
+    return "\n".join(lines + errors + rows) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port=9108, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"Serving query metrics at http://{host}:{port}/metrics")
+    return server
+
+
+def print_summary():
+    print(f"{'label':<40}{'node':<10}{'count':>8}{'avg ms':>10}{'p95 ms':>10}{'errors':>8}")
+    for (label, node), histogram in sorted(histograms().items()):
+        avg = histogram.total_ms / histogram.count if histogram.count else 0
+        print(f"{label[:39]:<40}{node:<10}{histogram.count:>8}{avg:>10.2f}"
+              f"{histogram.percentile(95):>10}{histogram.errors:>8}")
@@ -15,7 +15,7 @@ def init_db():
     conn = _get_conn()
     cur = conn.cursor()
     cur.execute("""
-        DROP TABLE IF EXISTS team12_flowers;
+        DROP TABLE IF EXISTS team12_flowers CASCADE;
         CREATE TABLE IF NOT EXISTS team12_flowers (
             id SERIAL PRIMARY KEY,
             name VARCHAR(100) NOT NULL,
@@ -23,6 +23,29 @@ def init_db():
             water_level INT NOT NULL,
             min_water_required INT NOT NULL
         );
+
+        -- Day the level first drops below min_water_required (stored, indexed).
+        ALTER TABLE team12_flowers ADD COLUMN IF NOT EXISTS needs_water_at DATE
+            GENERATED ALWAYS AS (
+                CASE WHEN min_water_required > 0 THEN
+                    last_watered + GREATEST(FLOOR((water_level - min_water_required) / 5.0)::INT + 1, 0)
+                END
+            ) STORED;
+        CREATE INDEX IF NOT EXISTS idx_team12_flowers_needs_water_at ON team12_flowers (needs_water_at);
+
+        -- Current level: water_level minus 5 per day since last_watered.
+        CREATE OR REPLACE FUNCTION team12_current_water_level(
+            level_at_watering INT, watered_on DATE, as_of DATE DEFAULT CURRENT_DATE
+        ) RETURNS INT
+        LANGUAGE SQL IMMUTABLE AS $$
+            SELECT GREATEST(level_at_watering - 5 * GREATEST(as_of - watered_on, 0), 0);
+        $$;
+
+        CREATE OR REPLACE VIEW team12_flowers_current AS
+        SELECT id, name, last_watered,
+               team12_current_water_level(water_level, last_watered) AS water_level,
+               min_water_required, needs_water_at
+        FROM team12_flowers;
     """)
     conn.commit()
     cur.close()
@@ -1,6 +1,12 @@
-import psycopg2
+import os
+import sys
 from flask import Flask, request, jsonify, send_from_directory
 
+# Modules shared by the team apps live in Project/common.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.db_pool import FlaskConnectionPool
+from common.query_params import parse_within
+
 app = Flask(__name__)
 
 # Database connection details
@@ -10,22 +16,17 @@ DATABASE_URL = (
     "neondb?sslmode=require"
 )
 
+db_pool = FlaskConnectionPool(DATABASE_URL)
+db_pool.init_app(app)
+
 def get_db_connection():
-    return psycopg2.connect(DATABASE_URL)
+    # Pooled, request-scoped connection (see common/db_pool.py). conn.close()
+    # in the routes below just hands it back at the end of the request.
+    return db_pool.get_connection()
 
-# Simulate daily water loss (5 inches per day since last watered)
-@app.route('/flowers/simulate', methods=['POST'])
-def simulate_water_loss():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        UPDATE team12_flowers
-        SET water_level = water_level - (5 * (CURRENT_DATE - last_watered));
-    """)
-    conn.commit()
-    cur.close()
-    conn.close()
-    return jsonify({"message": "Water loss simulated successfully!"})
+@app.route('/_pool', methods=['GET'])
+def pool_metrics():
+    return jsonify(db_pool.metrics())
 
 # Get all flowers
 @app.route('/flowers', methods=['GET'])
@@ -34,7 +35,7 @@ def get_flowers():
     cur = conn.cursor()
     cur.execute("""
         SELECT *
-        FROM team12_flowers
+        FROM team12_flowers_current
         ORDER BY id;
     """)  # SELECT query
     flowers = cur.fetchall()
@@ -52,8 +53,8 @@ def get_flowers_needing_water():
     cur = conn.cursor()
     cur.execute("""
         SELECT *
-        FROM team12_flowers
-        WHERE water_level < min_water_required
+        FROM team12_flowers_current
+        WHERE needs_water_at <= CURRENT_DATE
         ORDER BY id;
     """)  # SELECT query
     flowers = cur.fetchall()
@@ -65,6 +66,32 @@ def get_flowers_needing_water():
         "water_level": f[3], "needs_watering": f[3] < f[4]
     } for f in flowers])
 
+# Flowers that need water within the next N days (including the ones
+# that already do), soonest first: /flowers/due?within=3d
+@app.route('/flowers/due', methods=['GET'])
+def get_flowers_due():
+    days = parse_within(request.args.get('within', '0d'))
+    if days is None:
+        return jsonify({"message": "within must be a number of days, e.g. 3d"}), 400
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT id, name, last_watered, water_level, min_water_required, needs_water_at
+        FROM team12_flowers_current
+        WHERE needs_water_at <= CURRENT_DATE + %s
+        ORDER BY needs_water_at, id;
+    """, (days,))
+    flowers = cur.fetchall()
+    cur.close()
+    conn.close()
+
+    return jsonify([{
+        "id": f[0], "name": f[1], "last_watered": f[2].strftime("%Y-%m-%d"),
+        "water_level": f[3], "min_water_required": f[4], "needs_watering": f[3] < f[4],
+        "needs_water_at": f[5].strftime("%Y-%m-%d")
+    } for f in flowers])
+
 # Add a flower
 @app.route('/flowers', methods=['POST'])
 def add_flower():
@@ -85,29 +112,23 @@ def update_flower(id):
     conn = get_db_connection()
     cur = conn.cursor()
 
-    # Get current stored values
+    # water_level is stored as of last_watered. Without a new date the
+    # amount is added to that level and last_watered stays; with one,
+    # the amount is added to the level as of that date.
     cur.execute("""
-        SELECT water_level, last_watered
-        FROM team12_flowers
-        WHERE id = %s
-    """, (id,))
-    current_data = cur.fetchone()
-    if not current_data:
+        UPDATE team12_flowers
+        SET water_level = CASE
+                WHEN %(last_watered)s::date IS NULL THEN water_level
+                ELSE team12_current_water_level(water_level, last_watered, %(last_watered)s::date)
+            END + %(amount)s,
+            last_watered = COALESCE(%(last_watered)s::date, last_watered)
+        WHERE id = %(id)s
+    """, {"amount": data.get('water_level', 0), "last_watered": data.get('last_watered'),
+          "id": id})  # query to update flower details
+    if cur.rowcount == 0:
         cur.close()
         conn.close()
         return jsonify({"message": "Flower not found!"}), 404
-
-    current_water_level, current_last_watered = current_data
-
-    # Update values based on input, keeping existing values if not provided
-    new_water_level = current_water_level + data.get('water_level', 0)
-    new_last_watered = data.get('last_watered', current_last_watered)
-
-    cur.execute("""
-        UPDATE team12_flowers
-        SET water_level = %s, last_watered = %s
-        WHERE id = %s
-    """, (new_water_level, new_last_watered, id))  # query to update flower details
     conn.commit()
     cur.close()
     conn.close()
@@ -14,7 +14,7 @@ def init_db():
     cur = conn.cursor()
     try:
         # Drop and recreate to ensure correct schema
-        cur.execute("DROP TABLE IF EXISTS team2_flowers;")
+        cur.execute("DROP TABLE IF EXISTS team2_flowers CASCADE;")
         cur.execute("""
             CREATE TABLE team2_flowers (
                 id SERIAL PRIMARY KEY,
@@ -27,6 +27,36 @@ def init_db():
             );
         """)
         # Patch existing tables that are missing the color column
+
+        # Day the level first drops below min_water_required (stored, indexed).
+        cur.execute("""
+            ALTER TABLE team2_flowers ADD COLUMN IF NOT EXISTS needs_water_at DATE
+                GENERATED ALWAYS AS (
+                    CASE WHEN min_water_required > 0 THEN
+                        last_watered + GREATEST(FLOOR((water_level - min_water_required) / 5.0)::INT + 1, 0)
+                    END
+                ) STORED;
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_team2_flowers_needs_water_at ON team2_flowers (needs_water_at);
+        """)
+
+        # Current level: water_level minus 5 per day since last_watered.
+        cur.execute("""
+            CREATE OR REPLACE FUNCTION team2_current_water_level(
+                level_at_watering INT, watered_on DATE, as_of DATE DEFAULT CURRENT_DATE
+            ) RETURNS INT
+            LANGUAGE SQL IMMUTABLE AS $$
+                SELECT GREATEST(level_at_watering - 5 * GREATEST(as_of - watered_on, 0), 0);
+            $$;
+        """)
+        cur.execute("""
+            CREATE OR REPLACE VIEW team2_flowers_current AS
+            SELECT id, name, color, price, last_watered,
+                   team2_current_water_level(water_level, last_watered) AS water_level,
+                   min_water_required, needs_water_at
+            FROM team2_flowers;
+        """)
         
         conn.commit()
         print("Database initialized successfully with team2_flowers table.")
@@ -1,5 +1,12 @@
+import os
+import sys
+
 import psycopg2
 
+# Modules shared by the team apps live in Project/common.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.query_params import parse_within
+
 DATABASE_URL = (
     "postgresql://neondb_owner:npg_M5sVheSzQLv4@"
     "ep-shrill-tree-a819xf7v-pooler.eastus2.azure.neon.tech/"
@@ -7,6 +14,8 @@ DATABASE_URL = (
 )
 
 TEAM_TABLE = "team2_flowers"
+# Same rows with water loss applied (see admin.init_db); use it for reads.
+TEAM_VIEW = "team2_flowers_current"
 
 def _get_conn():
     return psycopg2.connect(DATABASE_URL)
@@ -120,8 +129,8 @@ def get_flowers_api(needs_only: bool = False):
             cur.execute(
                 f"""
                 SELECT id, name, last_watered, water_level, min_water_required
-                FROM {TEAM_TABLE}
-                WHERE water_level < min_water_required
+                FROM {TEAM_VIEW}
+                WHERE needs_water_at <= CURRENT_DATE
                 ORDER BY id;
                 """
             )
@@ -129,7 +138,7 @@ def get_flowers_api(needs_only: bool = False):
             cur.execute(
                 f"""
                 SELECT id, name, last_watered, water_level, min_water_required
-                FROM {TEAM_TABLE}
+                FROM {TEAM_VIEW}
                 ORDER BY id;
                 """
             )
@@ -150,6 +159,38 @@ def get_flowers_api(needs_only: bool = False):
         conn.close()
 
 
+def get_flowers_due_api(days):
+    # Flowers that need water within `days` days (including the ones
+    # that already do), soonest first. Uses the needs_water_at index.
+    conn = _get_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"""
+            SELECT id, name, last_watered, water_level, min_water_required, needs_water_at
+            FROM {TEAM_VIEW}
+            WHERE needs_water_at <= CURRENT_DATE + %s
+            ORDER BY needs_water_at, id;
+            """,
+            (days,),
+        )
+        rows = cur.fetchall()
+        return [
+            {
+                "id": r[0],
+                "name": r[1],
+                "last_watered": _format_date(r[2]),
+                "water_level": r[3],
+                "needs_watering": r[3] < r[4],
+                "needs_water_at": _format_date(r[5]),
+            }
+            for r in rows
+        ]
+    finally:
+        cur.close()
+        conn.close()
+
+
 def add_flower_api(name, color, price, last_watered, water_level, min_water_required):
     conn = _get_conn()
     cur = conn.cursor()
@@ -228,24 +269,23 @@ def delete_flower_api(id):
 
 
 def daily_watering_check():
+    # Water loss no longer has to be written back every day; the view
+    # already reflects it, so the daily check only counts the flowers
+    # that are below their minimum today.
     conn = _get_conn()
     cur = conn.cursor()
     try:
         cur.execute(
             f"""
-            UPDATE {TEAM_TABLE}
-            SET water_level = GREATEST(0, water_level - (5 * (CURRENT_DATE - last_watered)));
-
-            
+            SELECT COUNT(*)
+            FROM {TEAM_VIEW}
+            WHERE water_level < min_water_required;
             """
-           # WHERE water_level < min_water_required;
         )
-        conn.commit()
-        return cur.rowcount
+        return cur.fetchone()[0]
     except Exception as e:
-        conn.rollback()
         print("Daily check error:", e)
         return 0
     finally:
         cur.close()
-        conn.close()
\ No newline at end of file
+        conn.close()
@@ -27,8 +27,8 @@ def flowers_status():
 # --- Daily watering algorithm ---
 @app.route("/flowers/daily_check", methods=["POST"])
 def daily_check():
-    updated = backend.daily_watering_check()
-    return jsonify({"message": f"Water levels updated for {updated} flowers."})
+    needs_water = backend.daily_watering_check()
+    return jsonify({"message": f"{needs_water} flowers need watering today."})
 
 
 # --- API routes ---
@@ -44,6 +44,16 @@ def get_flowers_needing_water():
     return jsonify(flowers)
 
 
+@app.route("/flowers/due", methods=["GET"])
+def get_flowers_due():
+    # /flowers/due?within=3d
+    days = backend.parse_within(request.args.get("within", "0d"))
+    if days is None:
+        return jsonify({"message": "within must be a number of days, e.g. 3d"}), 400
+    flowers = backend.get_flowers_due_api(days)
+    return jsonify(flowers)
+
+
 @app.route("/flowers", methods=["POST"])
 def add_flower():
     data = request.get_json(force=True)
@@ -21,6 +21,20 @@ def init_db():
             min_water_required INT NOT NULL CHECK(min_water_required >= 0)
 
         );
+
+        -- Current level: water_level minus 5 per day since last_watered.
+        CREATE OR REPLACE FUNCTION team8_current_water_level(
+            level_at_watering INT, watered_on DATE, as_of DATE DEFAULT CURRENT_DATE
+        ) RETURNS INT
+        LANGUAGE SQL IMMUTABLE AS $$
+            SELECT GREATEST(level_at_watering - 5 * GREATEST(as_of - watered_on, 0), 0);
+        $$;
+
+        CREATE OR REPLACE VIEW team8_flowers_current AS
+        SELECT flower_id, name, last_watered,
+               team8_current_water_level(water_level, last_watered) AS water_level,
+               min_water_required
+        FROM team8_flowers;
     """)
     conn.commit()
     cur.close()
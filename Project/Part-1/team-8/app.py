@@ -68,7 +68,7 @@ def get_flowers():
 def get_flowers_needing_water():
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute("SELECT flower_id, name, last_watered, water_level, min_water_required FROM team8_flowers WHERE (water_level < min_water_required)")  #FIXED: Changed `id` --> `flower_id` and `lastwatered` --> `last_watered`
+    cur.execute("SELECT flower_id, name, last_watered, water_level, min_water_required FROM team8_flowers_current WHERE (water_level < min_water_required)")  #FIXED: Changed `id` --> `flower_id` and `lastwatered` --> `last_watered`
     flowers = cur.fetchall()
     cur.close()
     conn.close()
@@ -31,14 +31,13 @@ def insert_flower(name, last_watered, water_level, min_water_required):
 
 #Get all flowers
 def select_flower(flower_id=None):
-    daily_water_update()
     conn = _get_conn()
     cur = conn.cursor()
     try:
         if flower_id is None:
             sql = """
                 SELECT flower_id, name, last_watered, water_level, min_water_required
-                FROM team8_flowers
+                FROM team8_flowers_current
                 ORDER BY flower_id;
             """
             cur.execute(sql)
@@ -56,7 +55,7 @@ def select_flower(flower_id=None):
         else:
             sql = f"""
                 SELECT flower_id, name, last_watered, water_level, min_water_required
-                FROM team8_flowers
+                FROM team8_flowers_current
                 WHERE flower_id = {flower_id};
             """
             cur.execute(sql)
@@ -128,27 +127,11 @@ def water_flower(flower_id):
 
     cur.execute("""
         UPDATE team8_flowers
-        SET water_level = water_level + 10,
+        SET water_level = team8_current_water_level(water_level, last_watered) + 10,
             last_watered = CURRENT_DATE
         WHERE flower_id = %s;
     """, (flower_id,))
 
-    conn.commit()
-    cur.close()
-    conn.close()
-
-# Shows water loss after day(s)
-def daily_water_update():
-    conn = _get_conn()
-    cur = conn.cursor()
-
-    cur.execute("""
-        UPDATE team8_flowers
-        SET water_level = GREATEST(water_level - (5 * (CURRENT_DATE - last_watered)),
-        0)
-        WHERE CURRENT_DATE > last_watered;
-    """)
-
     conn.commit()
     cur.close()
     conn.close()
\ No newline at end of file
@@ -1,18 +1,6 @@
 from flask import Flask
 import admin
 from frontend import frontend_bp
-from apscheduler.schedulers.background import BackgroundScheduler
-import backend
-
-def start_scheduler():
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(
-        backend.daily_water_update,
-        'cron',
-        hour=0,
-        minute=0
-    )
-    scheduler.start()
 
 def create_app():
     app = Flask(__name__)
@@ -20,7 +8,8 @@ def create_app():
     admin.init_db()
     admin.seed_data()
 
-    start_scheduler()
+    # No nightly water-loss job: team8_flowers_current (admin.py)
+    # computes the current water level whenever a flower is read.
 
     app.register_blueprint(frontend_bp)
 
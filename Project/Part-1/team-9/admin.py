@@ -21,6 +21,29 @@ def init_db():
             water_level INT NOT NULL,
             min_water_required INT NOT NULL
         );
+
+        -- Day the level first drops below min_water_required (stored, indexed).
+        ALTER TABLE team9_flowers ADD COLUMN IF NOT EXISTS needs_water_at DATE
+            GENERATED ALWAYS AS (
+                CASE WHEN min_water_required > 0 THEN
+                    last_watered + GREATEST(FLOOR((last_watered_water_level - min_water_required) / 5.0)::INT + 1, 0)
+                END
+            ) STORED;
+        CREATE INDEX IF NOT EXISTS idx_team9_flowers_needs_water_at ON team9_flowers (needs_water_at);
+
+        -- Current level: last_watered_water_level minus 5 per day since last_watered.
+        CREATE OR REPLACE FUNCTION team9_current_water_level(
+            level_at_watering INT, watered_on DATE, as_of DATE DEFAULT CURRENT_DATE
+        ) RETURNS INT
+        LANGUAGE SQL IMMUTABLE AS $$
+            SELECT GREATEST(level_at_watering - 5 * GREATEST(as_of - watered_on, 0), 0);
+        $$;
+
+        CREATE OR REPLACE VIEW team9_flowers_current AS
+        SELECT id, name, last_watered,
+               team9_current_water_level(last_watered_water_level, last_watered) AS water_level,
+               min_water_required, needs_water_at
+        FROM team9_flowers;
     """)
     conn.commit()
     cur.close()
@@ -44,16 +67,3 @@ def seed_data():
     conn.commit()
     cur.close()
     conn.close()
-    
-def update_water_levels():
-    conn = _get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        UPDATE team9_flowers
-        SET water_level = GREATEST(last_watered_water_level - (5 * (CURRENT_DATE - last_watered)), 0);
-    """)
-    conn.commit()
-    cur.close()
-    conn.close()
-
-
@@ -1,6 +1,13 @@
+import os
+import sys
 import psycopg2
 from flask import Flask, request, jsonify, send_file
 
+# Modules shared by the team apps live in Project/common.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.alerts import WateringAlertScheduler
+from common.query_params import parse_within
+
 app = Flask(__name__)
 
 # Database connection details
@@ -13,12 +20,17 @@ DATABASE_URL = (
 def get_db_connection():
     return psycopg2.connect(DATABASE_URL)
 
+# Fires a "needs watering" alert when each flower's needs_water_at comes
+# around; started in server.create_app(). Write routes below reschedule
+# the flower they changed.
+watering_alerts = WateringAlertScheduler(DATABASE_URL, "team9_flowers")
+
 # Get all flowers
 @app.route('/flowers', methods=['GET'])
 def get_flowers():
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute("SELECT id, name, last_watered, water_level, min_water_required FROM team9_flowers;")
+    cur.execute("SELECT id, name, last_watered, water_level, min_water_required FROM team9_flowers_current;")
     flowers = cur.fetchall()
     cur.close()
     conn.close()
@@ -34,8 +46,8 @@ def get_flowers_needing_water():
     cur = conn.cursor()
     cur.execute("""
         SELECT *
-        FROM team9_flowers
-        WHERE water_level < min_water_required;
+        FROM team9_flowers_current
+        WHERE needs_water_at <= CURRENT_DATE;
     """)
     flowers = cur.fetchall()
     cur.close()
@@ -46,6 +58,32 @@ def get_flowers_needing_water():
         "water_level": f[3], "needs_watering": f[3] < f[4]
     } for f in flowers])
 
+# Flowers that need water within the next N days (including the ones
+# that already do), soonest first: /flowers/due?within=3d
+@app.route('/flowers/due', methods=['GET'])
+def get_flowers_due():
+    days = parse_within(request.args.get('within', '0d'))
+    if days is None:
+        return jsonify({"message": "within must be a number of days, e.g. 3d"}), 400
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT id, name, last_watered, water_level, min_water_required, needs_water_at
+        FROM team9_flowers_current
+        WHERE needs_water_at <= CURRENT_DATE + %s
+        ORDER BY needs_water_at, id;
+    """, (days,))
+    flowers = cur.fetchall()
+    cur.close()
+    conn.close()
+
+    return jsonify([{
+        "id": f[0], "name": f[1], "last_watered": f[2].strftime("%Y-%m-%d"),
+        "water_level": f[3], "min_water_required": f[4], "needs_watering": f[3] < f[4],
+        "needs_water_at": f[5].strftime("%Y-%m-%d")
+    } for f in flowers])
+
 # Add a flower
 @app.route('/flowers', methods=['POST'])
 def add_flower():
@@ -54,9 +92,12 @@ def add_flower():
     cur = conn.cursor()
     cur.execute("""
         INSERT INTO team9_flowers (name, last_watered, water_level, last_watered_water_level, min_water_required)
-        VALUES (%s, %s, %s, %s, %s);
+        VALUES (%s, %s, %s, %s, %s)
+        RETURNING id, needs_water_at;
     """, (data['name'], data['last_watered'], data['water_level'], data['water_level'], data['min_water_required']))
+    flower_id, needs_water_at = cur.fetchone()
     conn.commit()
+    watering_alerts.schedule(flower_id, needs_water_at, data['name'])
     cur.close()
     conn.close()
     return jsonify({"message": "Flower added successfully!"})
@@ -72,9 +113,13 @@ def update_flower(id):
         SET last_watered = %s,
             water_level = %s,
             last_watered_water_level = %s
-        WHERE id = %s;
+        WHERE id = %s
+        RETURNING name, needs_water_at;
     """, (data['last_watered'], data['water_level'], data['water_level'], id))
+    row = cur.fetchone()
     conn.commit()
+    if row:
+        watering_alerts.schedule(id, row[1], row[0])
     cur.close()
     conn.close()
     return jsonify({"message": "Flower updated successfully!"})
@@ -90,9 +135,13 @@ def water_flower(id):
         SET last_watered = CURRENT_DATE,
             water_level = %s,
             last_watered_water_level = %s
-        WHERE id = %s;
+        WHERE id = %s
+        RETURNING name, needs_water_at;
     """, (data['water_level'], data['water_level'], id))
+    row = cur.fetchone()
     conn.commit()
+    if row:
+        watering_alerts.schedule(id, row[1], row[0])
     cur.close()
     conn.close()
     return jsonify({"message": "Flower updated successfully!"})
@@ -107,10 +156,19 @@ def delete_flower(id):
         WHERE id = %s;
     """, (id,))
     conn.commit()
+    watering_alerts.cancel(id)
     cur.close()
     conn.close()
     return jsonify({"message": "Flower deleted successfully!"})  
 
+# Most recent watering alerts, newest last
+@app.route('/flowers/alerts', methods=['GET'])
+def get_watering_alerts():
+    return jsonify({
+        "pending": watering_alerts.pending(),
+        "alerts": list(watering_alerts.recent_alerts)
+    })
+
 @app.route('/')
 def home():
     return send_file('flowers.html')
@@ -1,25 +1,14 @@
 import admin
-from app import app
-from threading import Thread
-from time import sleep
-
-WATER_LEVEL_UPDATE_INTERVAL = 24 * 60 * 60  # 1 day in seconds
-
-
-def update_loop():
-    # currently just updates water level every 24 hours
-    while True:
-        print("updating water levels")
-        admin.update_water_levels()
-        sleep(WATER_LEVEL_UPDATE_INTERVAL)
-
+from app import app, watering_alerts
 
 def create_app():
     admin.init_db()
     admin.seed_data()
 
-    update_thread = Thread(target=update_loop, daemon=True)
-    update_thread.start();
+    # Water levels are no longer rewritten every 24 hours; reads go
+    # through team9_flowers_current (admin.py), which computes them.
+    # Alerts fire when each flower actually crosses its minimum.
+    watering_alerts.start()
 
     return app
 
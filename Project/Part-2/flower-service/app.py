@@ -0,0 +1,182 @@
+import os
+import sys
+
+import psycopg2
+from flask import Flask, request, jsonify, abort
+
+# Modules shared by the team apps live in Project/common.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.db_pool import FlaskConnectionPool
+from statements import TenantStatements
+from tenants import drop_missing_tables, load_registry
+
+# ============================================================
+# Multi-tenant flower service
+# ============================================================
+# One process serves every team's flower API:
+#
+#   GET    /t/<tenant>/flowers
+#   GET    /t/<tenant>/flowers/needs_watering
+#   POST   /t/<tenant>/flowers
+#   PUT    /t/<tenant>/flowers/<id>
+#   PUT    /t/<tenant>/flowers/<id>/water
+#   DELETE /t/<tenant>/flowers/<id>
+#
+# <tenant> is looked up in the tenant registry (tenants.py), which
+# says which table (and schema) holds that tenant's flowers. All
+# tenants share one connection pool (common/db_pool.py), so the database sees
+# at most DB_POOL_MAX connections in total instead of one pool or one
+# connection per request for each team's own Flask process. Statements
+# are prepared per tenant and connection (statements.py).
+#
+# Settings: DATABASE_URL, FLOWER_TENANTS (registry JSON),
+# FLOWER_SERVICE_PREPARE (1, 0 or auto: off for "-pooler" hosts),
+# plus the DB_POOL_* settings from common/db_pool.py.
+
+DATABASE_URL = os.getenv("DATABASE_URL", (
+    "postgresql://neondb_owner:npg_M5sVheSzQLv4@"
+    "ep-shrill-tree-a819xf7v-pooler.eastus2.azure.neon.tech/"
+    "neondb?sslmode=require"
+))
+
+PREPARE = os.getenv("FLOWER_SERVICE_PREPARE", "auto")
+if PREPARE == "auto":
+    PREPARE = "0" if "-pooler" in DATABASE_URL else "1"
+
+app = Flask(__name__)
+app.json.sort_keys = False
+
+registry = load_registry()
+# Tenants whose table is missing answer 404 instead of a database error.
+_startup_conn = psycopg2.connect(DATABASE_URL)
+try:
+    registry = drop_missing_tables(_startup_conn, registry)
+finally:
+    _startup_conn.close()
+statements = TenantStatements(registry, prepare=PREPARE == "1")
+db_pool = FlaskConnectionPool(DATABASE_URL)
+db_pool.init_app(app)
+
+
+def _tenant(tenant):
+    if tenant not in registry:
+        abort(404, description=f"Unknown tenant: {tenant}")
+    return tenant
+
+
+def _run(tenant, key, params=()):
+    tenant = _tenant(tenant)
+    conn = db_pool.get_connection()
+    cur = conn.cursor()
+    statements.execute(conn, cur, tenant, key, params)
+    return conn, cur
+
+
+def _flowers(rows):
+    return [{
+        "id": f[0], "name": f[1], "last_watered": f[2].strftime("%Y-%m-%d"),
+        "water_level": f[3], "min_water_required": f[4], "needs_watering": f[3] < f[4]
+    } for f in rows]
+
+
+@app.errorhandler(404)
+def not_found(e):
+    return jsonify({"message": e.description}), 404
+
+
+# The pool rolls the connection back when the request ends.
+@app.errorhandler(psycopg2.IntegrityError)
+def conflict(e):
+    # e.g. a duplicate name on a tenant whose names are unique.
+    return jsonify({"message": str(e).strip()}), 409
+
+
+@app.errorhandler(psycopg2.DataError)
+def invalid_value(e):
+    # Bad dates, out-of-range levels and the like.
+    return jsonify({"message": str(e).strip()}), 400
+
+
+@app.errorhandler(psycopg2.Error)
+def database_error(e):
+    return jsonify({"message": str(e).strip()}), 500
+
+
+# ------------------ Service ------------------
+@app.route('/tenants', methods=['GET'])
+def list_tenants():
+    return jsonify(registry)
+
+
+@app.route('/_pool', methods=['GET'])
+def pool_metrics():
+    return jsonify(dict(db_pool.metrics(), **statements.metrics()))
+
+
+# ------------------ Flowers ------------------
+@app.route('/t/<tenant>/flowers', methods=['GET'])
+def get_flowers(tenant):
+    _, cur = _run(tenant, "list")
+    return jsonify(_flowers(cur.fetchall()))
+
+
+@app.route('/t/<tenant>/flowers/needs_watering', methods=['GET'])
+def get_flowers_needing_water(tenant):
+    _, cur = _run(tenant, "needs_watering")
+    return jsonify(_flowers(cur.fetchall()))
+
+
+@app.route('/t/<tenant>/flowers', methods=['POST'])
+def add_flower(tenant):
+    data = request.get_json(silent=True) or {}
+    required = ["name", "last_watered", "water_level", "min_water_required"]
+    missing = [k for k in required if k not in data]
+    if missing:
+        return jsonify({"message": f"Missing fields: {', '.join(missing)}"}), 400
+
+    conn, cur = _run(tenant, "insert", [data[k] for k in required])
+    new_id = cur.fetchone()[0]
+    conn.commit()
+    return jsonify({"message": "Flower added successfully!", "id": new_id}), 201
+
+
+@app.route('/t/<tenant>/flowers/<int:id>', methods=['PUT'])
+def update_flower(tenant, id):
+    data = request.get_json(silent=True) or {}
+    if "last_watered" not in data or "water_level" not in data:
+        return jsonify({"message": "Missing fields: last_watered, water_level"}), 400
+
+    conn, cur = _run(tenant, "update", [data["last_watered"], data["water_level"], id])
+    conn.commit()
+    if cur.rowcount == 0:
+        return jsonify({"message": "Flower not found"}), 404
+    return jsonify({"message": "Flower updated successfully!"})
+
+
+@app.route('/t/<tenant>/flowers/<int:id>/water', methods=['PUT'])
+def water_flower(tenant, id):
+    data = request.get_json(silent=True) or {}
+    amount = data.get("amount", 5)
+    if isinstance(amount, str) and amount.strip().isdigit():
+        amount = int(amount)
+    if type(amount) is not int or not 0 < amount <= 1000:
+        return jsonify({"message": "amount must be an integer between 1 and 1000"}), 400
+
+    conn, cur = _run(tenant, "water", [amount, id])
+    conn.commit()
+    if cur.rowcount == 0:
+        return jsonify({"message": "Flower not found"}), 404
+    return jsonify({"message": "Flower watered successfully!"})
+
+
+@app.route('/t/<tenant>/flowers/<int:id>', methods=['DELETE'])
+def delete_flower(tenant, id):
+    conn, cur = _run(tenant, "delete", [id])
+    conn.commit()
+    if cur.rowcount == 0:
+        return jsonify({"message": "Flower not found"}), 404
+    return jsonify({"message": "Flower deleted successfully!"})
+
+
+if __name__ == "__main__":
+    app.run(host="127.0.0.1", port=5001, debug=True)
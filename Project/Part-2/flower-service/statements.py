@@ -0,0 +1,161 @@
+import re
+import threading
+import weakref
+
+from psycopg2 import errors, sql
+
+# ============================================================
+# Per-tenant prepared statements
+# ============================================================
+# Each tenant gets the same small set of statements (list, insert,
+# water, ...) built once from its registry entry. Tenant identifiers
+# are quoted with psycopg2.sql, never formatted into the SQL by hand.
+#
+# With prepare=True a statement is PREPAREd the first time a pooled
+# connection runs it for a tenant and EXECUTEd from then on, so
+# Postgres parses and plans it once per connection instead of once per
+# request. Prepared statements belong to one server session; which
+# ones exist is tracked per pooled connection object (weakly, so the
+# bookkeeping goes away with the connection).
+#
+# A transaction-mode pooler (such as Neon's "-pooler" endpoints) may
+# run each transaction on a different server session, so SQL-level
+# PREPARE does not work through it. Then prepare=False sends the same
+# SQL as plain parameterized statements.
+
+STATEMENT_PARAM = re.compile(r"\$(\d+)")
+
+
+def _current_level(level):
+    # Water loss of 5 per day since last_watered, computed on read.
+    return sql.SQL(
+        "GREATEST({level} - 5 * GREATEST(CURRENT_DATE - last_watered::date, 0), 0)"
+    ).format(level=level)
+
+
+def build_statements(tenant):
+    table = sql.Identifier(tenant["schema"], tenant["table"])
+    id_column = sql.Identifier(tenant["id_column"])
+    levels = [sql.Identifier(c) for c in tenant["level_columns"]]
+    current = _current_level(levels[0]) if tenant["decay_on_read"] else levels[0]
+
+    select = sql.SQL("""
+        SELECT {id}, name, last_watered::date, {current}, min_water_required
+        FROM {table}
+    """).format(id=id_column, current=current, table=table)
+
+    return {
+        "list": select + sql.SQL("ORDER BY {}").format(id_column),
+        "needs_watering": select + sql.SQL(
+            "WHERE {current} < min_water_required ORDER BY {id}"
+        ).format(current=current, id=id_column),
+        "insert": sql.SQL("""
+            INSERT INTO {table} (name, last_watered, {levels}, min_water_required)
+            VALUES ($1, $2, {values}, $4)
+            RETURNING {id}
+        """).format(
+            table=table, id=id_column,
+            levels=sql.SQL(", ").join(levels),
+            values=sql.SQL(", ").join(sql.SQL("$3") for _ in levels),
+        ),
+        "update": sql.SQL("""
+            UPDATE {table}
+            SET last_watered = $1, {levels}
+            WHERE {id} = $3
+        """).format(
+            table=table, id=id_column,
+            levels=sql.SQL(", ").join(sql.SQL("{} = $2").format(c) for c in levels),
+        ),
+        "water": sql.SQL("""
+            UPDATE {table}
+            SET {levels}, last_watered = CURRENT_DATE
+            WHERE {id} = $2
+        """).format(
+            table=table, id=id_column,
+            levels=sql.SQL(", ").join(
+                sql.SQL("{} = {} + $1").format(c, current) for c in levels
+            ),
+        ),
+        "delete": sql.SQL("DELETE FROM {table} WHERE {id} = $1").format(
+            table=table, id=id_column
+        ),
+    }
+
+
+def _positional(text, params):
+    # "$2 ... $1 ... $2" -> "%s ... %s ... %s" with params reordered to match.
+    order = [int(n) - 1 for n in STATEMENT_PARAM.findall(text)]
+    return STATEMENT_PARAM.sub("%s", text), [params[i] for i in order]
+
+
+def _raw(conn):
+    # The pool hands out a wrapper per request; the psycopg2 connection
+    # underneath is what lives on between requests.
+    return getattr(conn, "_conn", conn)
+
+
+class TenantStatements:
+    def __init__(self, registry, prepare=True):
+        self.registry = registry
+        self.prepare = prepare
+        self._text = {}        # (tenant, key) -> SQL text
+        self._prepared = weakref.WeakKeyDictionary()   # connection -> names prepared on it
+        self._lock = threading.Lock()
+
+        self.prepares = 0
+        self.executions = 0
+
+    def _sql(self, conn, tenant, key):
+        text = self._text.get((tenant, key))
+        if text is None:
+            for name, statement in build_statements(self.registry[tenant]).items():
+                self._text[(tenant, name)] = statement.as_string(conn)
+            text = self._text[(tenant, key)]
+        return text
+
+    def execute(self, conn, cur, tenant, key, params=()):
+        text = self._sql(conn, tenant, key)
+        with self._lock:
+            self.executions += 1
+
+        if not self.prepare:
+            query, args = _positional(text, params)
+            cur.execute(query, args)
+            return
+
+        try:
+            self._execute_prepared(conn, cur, tenant, key, text, params)
+        except (errors.InvalidSqlStatementName, errors.DuplicatePreparedStatement):
+            # Our bookkeeping was stale (someone ran DEALLOCATE or
+            # DISCARD on this session). Start the session over.
+            conn.rollback()
+            with self._lock:
+                self._prepared.pop(_raw(conn), None)
+            cur.execute("DEALLOCATE ALL")
+            self._execute_prepared(conn, cur, tenant, key, text, params)
+
+    def _execute_prepared(self, conn, cur, tenant, key, text, params):
+        name = f"flowers_{tenant}_{key}"
+        with self._lock:
+            prepared = self._prepared.setdefault(_raw(conn), set())
+            is_new = name not in prepared
+
+        if is_new:
+            cur.execute(f"PREPARE {name} AS {text}")
+            with self._lock:
+                prepared.add(name)
+                self.prepares += 1
+
+        if params:
+            cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cur.execute(f"EXECUTE {name}")
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "prepared_statements": self.prepare,
+                "sessions": len(self._prepared),
+                "prepares": self.prepares,
+                "executions": self.executions,
+            }
@@ -0,0 +1,84 @@
+import json
+import os
+import re
+
+# ============================================================
+# Tenant registry
+# ============================================================
+# Maps the tenant in /t/<tenant>/flowers to the table that holds its
+# flowers. Every team's table has the same shape (name, last_watered,
+# water level, min_water_required); the registry records where they
+# differ:
+#
+#   table          table name
+#   schema         schema name (default "public")
+#   id_column      primary key column (default "id")
+#   level_columns  water level columns; the first one is read, all of
+#                  them are written (team9 keeps two)
+#   decay_on_read  subtract 5 per day since last_watered when reading
+#                  (default true). False for teams whose own app still
+#                  writes the daily loss into the stored level, so it is
+#                  not counted twice.
+#
+# The defaults below cover team1 ... team13 in the shared database.
+# FLOWER_TENANTS=path/to/tenants.json replaces them with a JSON object
+# of the same shape, e.g. {"team1": {"table": "team1_flowers"}}.
+#
+# drop_missing_tables() removes tenants whose table does not exist in
+# the database, so they answer 404 instead of failing on every request.
+
+TENANT_NAME = re.compile(r"^[a-z][a-z0-9_]{0,30}$")
+
+DEFAULT_TENANT = {
+    "schema": "public",
+    "id_column": "id",
+    "level_columns": ["water_level"],
+    "decay_on_read": True,
+}
+
+OVERRIDES = {
+    "team3": {"decay_on_read": False},
+    "team4": {"id_column": "flower_id"},
+    "team5": {"decay_on_read": False},
+    "team8": {"id_column": "flower_id"},
+    "team9": {"level_columns": ["last_watered_water_level", "water_level"]},
+}
+
+
+def _default_registry():
+    registry = {}
+    for number in range(1, 14):
+        name = f"team{number}"
+        registry[name] = dict(OVERRIDES.get(name, {}), table=f"{name}_flowers")
+    return registry
+
+
+def load_registry(path=None):
+    path = path or os.getenv("FLOWER_TENANTS")
+    if path:
+        with open(path) as f:
+            entries = json.load(f)
+    else:
+        entries = _default_registry()
+
+    registry = {}
+    for name, entry in entries.items():
+        if not TENANT_NAME.match(name):
+            raise ValueError(f"Invalid tenant name: {name!r}")
+        if "table" not in entry:
+            raise ValueError(f"Tenant {name!r} has no table")
+        registry[name] = dict(DEFAULT_TENANT, **entry)
+    return registry
+
+
+def drop_missing_tables(conn, registry):
+    present = {}
+    with conn.cursor() as cur:
+        for name, entry in registry.items():
+            cur.execute("SELECT to_regclass(format('%%I.%%I', %s, %s))",
+                        (entry["schema"], entry["table"]))
+            if cur.fetchone()[0] is None:
+                print(f"Tenant {name}: table {entry['schema']}.{entry['table']} not found, skipped")
+                continue
+            present[name] = entry
+    return present
@@ -1,10 +1,14 @@
+import os
 import psycopg2
+import psycopg2.errors
 
-DATABASE_URL = (
+# DATABASE_URL in the environment overrides it (e.g. a local Postgres
+# for load testing).
+DATABASE_URL = os.getenv("DATABASE_URL", (
     "postgresql://neondb_owner:npg_M5sVheSzQLv4@"
     "ep-shrill-tree-a819xf7v-pooler.eastus2.azure.neon.tech/"
     "neondb?sslmode=require"
-)
+))
 
 def _get_conn():
     return psycopg2.connect(DATABASE_URL)
@@ -22,6 +26,52 @@ def init_db():
 );
     """)
     conn.commit()
+
+    # Flower names are unique: seed_data and POST /flowers/bulk merge on
+    # them with ON CONFLICT (name). Duplicates from before the index
+    # existed are not deleted here (orders may point at them); they have
+    # to be merged or renamed by hand first.
+    try:
+        cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS team1_flowers_name_key ON team1_flowers (name);")
+    except psycopg2.errors.UniqueViolation:
+        conn.rollback()
+        cur.execute("""
+            SELECT name FROM team1_flowers GROUP BY name HAVING COUNT(*) > 1 ORDER BY name LIMIT 10;
+        """)
+        names = ", ".join(row[0] for row in cur.fetchall())
+        cur.close()
+        conn.close()
+        raise RuntimeError(
+            f"team1_flowers has duplicate names ({names}); rename or merge them, "
+            "then start again so the unique index can be created"
+        )
+    conn.commit()
+
+    cur.execute("""
+     -- Day the level first drops below min_water_required (stored, indexed).
+     ALTER TABLE team1_flowers ADD COLUMN IF NOT EXISTS needs_water_at DATE
+         GENERATED ALWAYS AS (
+             CASE WHEN min_water_required > 0 THEN
+                 last_watered + GREATEST(FLOOR((water_level - min_water_required) / 5.0)::INT + 1, 0)
+             END
+         ) STORED;
+     CREATE INDEX IF NOT EXISTS idx_team1_flowers_needs_water_at ON team1_flowers (needs_water_at);
+
+     -- Current level: water_level minus 5 per day since last_watered.
+     CREATE OR REPLACE FUNCTION team1_current_water_level(
+        level_at_watering INT, watered_on DATE, as_of DATE DEFAULT CURRENT_DATE
+     ) RETURNS INT
+     LANGUAGE SQL IMMUTABLE AS $$
+        SELECT GREATEST(level_at_watering - 5 * GREATEST(as_of - watered_on, 0), 0);
+     $$;
+
+     CREATE OR REPLACE VIEW team1_flowers_current AS
+     SELECT id, name, last_watered,
+            team1_current_water_level(water_level, last_watered) AS water_level,
+            min_water_required, needs_water_at
+     FROM team1_flowers;
+    """)
+    conn.commit()
     cur.close()
     conn.close()
 
@@ -1,9 +1,20 @@
 #update
 import psycopg2
+from psycopg2.extras import execute_values
 from flask import Flask, request, jsonify, render_template
+import io
 import os
+import sys
 import time
 
+# Modules shared by the team apps live in Project/common.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.db_pool import FlaskConnectionPool
+from common.profiling import RequestProfiler
+from common.query_params import parse_within
+import bulk_import
+import serialization
+
 app = Flask(__name__)
 
 print("APP FILE:", __file__)
@@ -11,69 +22,72 @@ print("CURRENT DIR:", os.getcwd())
 print("TEMPLATES EXISTS:", os.path.exists("templates/flowers.html"))
 
 # Database connection details
-DATABASE_URL = (
+# DATABASE_URL in the environment overrides it (e.g. a local Postgres
+# for load testing).
+DATABASE_URL = os.getenv("DATABASE_URL", (
     "postgresql://neondb_owner:npg_M5sVheSzQLv4@"
     "ep-shrill-tree-a819xf7v-pooler.eastus2.azure.neon.tech/"
     "neondb?sslmode=require"
-)
+))
+
+db_pool = FlaskConnectionPool(DATABASE_URL)
+db_pool.init_app(app)
+
+# Samples requests and breaks their time down into connection, query,
+# serialization and Python time: /_metrics and /_debug/last.
+profiler = RequestProfiler("team1_request")
+profiler.init_app(app)
 
 def get_db_connection():
-    return psycopg2.connect(DATABASE_URL)
+    # Pooled, request-scoped connection (see common/db_pool.py). conn.close()
+    # in the routes below just hands it back at the end of the request.
+    return profiler.connection(db_pool.get_connection)
+
+@app.route('/_pool', methods=['GET'])
+def pool_metrics():
+    return jsonify(db_pool.metrics())
 
 @app.route('/')
 def home():
     return render_template('flowers.html')
 
+# Listings return JSON-ready columns and leave the encoding to
+# serialization.flowers_response, which picks the fastest path for
+# each endpoint (see serialization.py).
+FLOWER_LISTING = """
+    SELECT id, name, to_char(last_watered, 'YYYY-MM-DD') AS last_watered,
+           water_level, water_level < min_water_required AS needs_watering{extra}
+    FROM team1_flowers_current
+"""
+
 # Get all flowers
 @app.route('/flowers', methods=['GET'])
 def get_flowers():
     conn = get_db_connection()
-    cur = conn.cursor()
-
-    cur.execute("""
-        SELECT 
-            id,
-            name,
-            last_watered,
-            GREATEST(
-                water_level - (CURRENT_DATE - last_watered) * 5,
-                0
-            ) AS water_level,
-            min_water_required
-        FROM team1_flowers
-    """)
-
-    flowers = cur.fetchall()
-    cur.close()
-    conn.close()
-    
-    return jsonify([{
-        "id": f[0],
-        "name": f[1],
-        "last_watered": f[2].strftime("%Y-%m-%d"),
-        "water_level": f[3],
-        "needs_watering": f[3] < f[4]
-    } for f in flowers])
+    return serialization.flowers_response(
+        conn, FLOWER_LISTING.format(extra=""), None, "r.id", "flowers")
 
 @app.route('/flowers/needs_watering', methods=['GET'])
 def get_flowers_needing_water():
     conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT * FROM team1_flowers
-        WHERE water_level < min_water_required
-    """)
-    flowers = cur.fetchall()
-    cur.close()
-    conn.close()
+    return serialization.flowers_response(
+        conn, FLOWER_LISTING.format(extra="") + "WHERE needs_water_at <= CURRENT_DATE",
+        None, "r.id", "needs_watering")
+
+# Flowers that need water within the next N days (including the ones
+# that already do), soonest first: /flowers/due?within=3d
+@app.route('/flowers/due', methods=['GET'])
+def get_flowers_due():
+    days = parse_within(request.args.get('within', '0d'))
+    if days is None:
+        return jsonify({"message": "within must be a number of days, e.g. 3d"}), 400
 
-    return jsonify([{
-        "id": f[0],
-        "name": f[1],
-        "last_watered": f[2].strftime("%Y-%m-%d"),
-        "water_level": f[3],
-        "needs_watering": f[3] < f[4]
-    } for f in flowers])
+    conn = get_db_connection()
+    return serialization.flowers_response(
+        conn,
+        FLOWER_LISTING.format(extra=", to_char(needs_water_at, 'YYYY-MM-DD') AS needs_water_at")
+        + "WHERE needs_water_at <= CURRENT_DATE + %s",
+        (days,), "r.needs_water_at, r.id", "due")
 
 # Add a flower
 @app.route('/flowers', methods=['POST'])
@@ -92,16 +106,43 @@ def add_flower():
     else:
         water_level = 8
 
-    cur.execute("""
-        INSERT INTO team1_flowers (name, last_watered, water_level, min_water_required)
-        VALUES (%s, CURRENT_DATE, %s, %s)
-    """, (data['name'], water_level, data['min_water_required']))
+    try:
+        cur.execute("""
+            INSERT INTO team1_flowers (name, last_watered, water_level, min_water_required)
+            VALUES (%s, CURRENT_DATE, %s, %s)
+        """, (data['name'], water_level, data['min_water_required']))
+        conn.commit()
+    except psycopg2.IntegrityError:
+        # Flower names are unique (team1_flowers_name_key).
+        conn.rollback()
+        return jsonify({"message": f"A flower named {data['name']!r} already exists"}), 409
+    finally:
+        cur.close()
+        conn.close()
 
-    conn.commit()
-    cur.close()
+    return jsonify({"message": "Flower added successfully!"})
+
+# Import many flowers at once from a JSON array, NDJSON or CSV upload
+# (request body or multipart "file"). Existing names are updated.
+# See bulk_import.py for the columns.
+@app.route('/flowers/bulk', methods=['POST'])
+def bulk_add_flowers():
+    upload = request.files.get('file') if request.mimetype == 'multipart/form-data' else None
+    fmt = bulk_import.detect_format(
+        upload.mimetype if upload else request.mimetype,
+        request.args.get('format'),
+        upload.filename if upload else None
+    )
+    if fmt is None:
+        return jsonify({"message": "Send application/json, application/x-ndjson or text/csv"}), 415
+
+    body = io.TextIOWrapper(upload.stream if upload else request.stream,
+                            encoding="utf-8", newline="")
+    conn = get_db_connection()
+    report = bulk_import.import_flowers(conn, body, fmt)
     conn.close()
 
-    return jsonify({"message": "Flower added successfully!"})
+    return jsonify(report)
 
 # Update a flower by ID
 @app.route('/flowers/<int:id>', methods=['PUT'])
@@ -127,7 +168,7 @@ def water_flower(id):
 
     cur.execute("""
         UPDATE team1_flowers
-        SET water_level = water_level + 5,
+        SET water_level = team1_current_water_level(water_level, last_watered) + 5,
             last_watered = CURRENT_DATE
         WHERE id = %s
     """, (id,))
@@ -137,6 +178,124 @@ def water_flower(id):
 
     return jsonify({"message": "Flower watered successfully!"})
 
+# ------------------ Bulk watering / bulk update ------------------
+# One request and one UPDATE ... FROM (VALUES ...) statement for any
+# number of flowers, instead of one request + commit per flower. Both
+# routes return the new state of every flower they changed.
+
+# Upper bound for one watering, so level + amount stays far from INT's limit.
+MAX_WATER_AMOUNT = 1000
+
+BULK_RETURNING = """
+    RETURNING f.id, f.name, f.last_watered,
+              team1_current_water_level(f.water_level, f.last_watered),
+              f.min_water_required, f.needs_water_at
+"""
+
+def _bulk_result(rows, requested_ids):
+    found = {r[0] for r in rows}
+    return {
+        "updated": len(rows),
+        "not_found": [i for i in requested_ids if i not in found],
+        "flowers": [{
+            "id": r[0],
+            "name": r[1],
+            "last_watered": r[2].strftime("%Y-%m-%d"),
+            "water_level": r[3],
+            "needs_watering": r[3] < r[4],
+            "needs_water_at": r[5].strftime("%Y-%m-%d") if r[5] else None
+        } for r in rows]
+    }
+
+def _int_list(values):
+    if not isinstance(values, list) or not all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return None
+    return list(dict.fromkeys(values))
+
+# Water many flowers: body is [1, 2, 3] or {"ids": [1, 2, 3], "amount": 5}
+@app.route('/flowers/water', methods=['POST'])
+def water_flowers():
+    data = request.get_json(silent=True)
+    amount = 5
+    if isinstance(data, dict):
+        amount = data.get('amount', 5)
+        data = data.get('ids')
+    ids = _int_list(data)
+    if (not ids or not isinstance(amount, int) or isinstance(amount, bool)
+            or not 0 <= amount <= MAX_WATER_AMOUNT):
+        return jsonify({"message": "Send a list of flower ids and an optional amount "
+                                   f"from 0 to {MAX_WATER_AMOUNT}"}), 400
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        rows = execute_values(cur, """
+            UPDATE team1_flowers AS f
+            SET water_level = team1_current_water_level(f.water_level, f.last_watered) + v.amount,
+                last_watered = CURRENT_DATE
+            FROM (VALUES %s) AS v(id, amount)
+            WHERE f.id = v.id
+        """ + BULK_RETURNING, [(i, amount) for i in ids], page_size=len(ids), fetch=True)
+        conn.commit()
+    except psycopg2.DataError as e:
+        # A stored level already near INT's limit can still overflow.
+        conn.rollback()
+        return jsonify({"message": f"Invalid value: {str(e).strip()}"}), 400
+    finally:
+        cur.close()
+        conn.close()
+
+    return jsonify(_bulk_result(rows, ids))
+
+# Update many flowers: body is [{"id": 1, "water_level": 8, "last_watered": "2026-03-01"}, ...]
+# Fields that are left out keep their current value.
+@app.route('/flowers', methods=['PATCH'])
+def update_flowers():
+    data = request.get_json(silent=True)
+    if not isinstance(data, list) or not data:
+        return jsonify({"message": "Send a list of {id, ...} updates"}), 400
+
+    updates = {}
+    for item in data:
+        if not isinstance(item, dict) or _int_list([item.get('id')]) is None:
+            return jsonify({"message": "Every update needs an integer id"}), 400
+        # A later update for the same id wins.
+        updates[item['id']] = (
+            item['id'],
+            item.get('name'),
+            item.get('last_watered'),
+            item.get('water_level'),
+            item.get('min_water_required'),
+        )
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        rows = execute_values(cur, """
+            UPDATE team1_flowers AS f
+            SET name = COALESCE(v.name::varchar, f.name),
+                last_watered = COALESCE(v.last_watered::date, f.last_watered),
+                water_level = COALESCE(v.water_level::int, f.water_level),
+                min_water_required = COALESCE(v.min_water_required::int, f.min_water_required)
+            FROM (VALUES %s) AS v(id, name, last_watered, water_level, min_water_required)
+            WHERE f.id = v.id
+        """ + BULK_RETURNING, list(updates.values()), page_size=len(updates), fetch=True)
+        conn.commit()
+    except psycopg2.IntegrityError as e:
+        # e.g. renaming a flower to a name that is already taken.
+        conn.rollback()
+        return jsonify({"message": f"Conflicting update: {str(e).strip()}"}), 409
+    except (psycopg2.DataError, psycopg2.ProgrammingError) as e:
+        # ProgrammingError covers DatatypeMismatch, raised when the same
+        # field has different JSON types across updates.
+        conn.rollback()
+        return jsonify({"message": f"Invalid value: {str(e).strip()}"}), 400
+    finally:
+        cur.close()
+        conn.close()
+
+    return jsonify(_bulk_result(rows, list(updates)))
+
 # Delete a flower by ID
 @app.route('/flowers/<int:id>', methods=['DELETE'])
 def delete_flower(id):
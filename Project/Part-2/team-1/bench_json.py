@@ -0,0 +1,139 @@
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import serialization
+
+# ============================================================
+# Serialization benchmark
+# ============================================================
+# Compares the JSON paths in serialization.py on throughput (rows/s)
+# and peak Python memory (tracemalloc), timing and memory measured in
+# separate runs so tracemalloc does not skew the timings.
+#
+#   python bench_json.py --rows 100000
+#       Offline: synthetic rows, no database. Compares the original
+#       per-row dict + strftime code with the "dicts" and "chunked"
+#       paths ("db" needs Postgres).
+#
+#   python bench_json.py --app --endpoint /flowers
+#       Through the Flask test client against the real database, one
+#       run per ?json= mode, including "db".
+
+REPEATS = 5
+
+
+def synthetic_rows(n):
+    start = date(2026, 1, 1)
+    # As the old code fetched them: dates as date objects.
+    raw = [(i, f"Flower {i}", start + timedelta(days=i % 365), i % 40, 10) for i in range(n)]
+    # As the JSON-ready SELECT returns them.
+    ready = [(i, name, d.strftime("%Y-%m-%d"), level, level < minimum)
+             for i, name, d, level, minimum in raw]
+    return raw, ready
+
+
+class _FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.position = 0
+
+    def fetchall(self):
+        rows, self.position = self.rows[self.position:], len(self.rows)
+        return rows
+
+    def fetchmany(self, size):
+        rows = self.rows[self.position:self.position + size]
+        self.position += len(rows)
+        return rows
+
+
+KEYS = ["id", "name", "last_watered", "water_level", "needs_watering"]
+
+
+def original(raw, ready):
+    return json.dumps([{
+        "id": f[0],
+        "name": f[1],
+        "last_watered": f[2].strftime("%Y-%m-%d"),
+        "water_level": f[3],
+        "needs_watering": f[3] < f[4]
+    } for f in raw])
+
+
+def dicts(raw, ready):
+    return json.dumps([dict(zip(KEYS, row)) for row in _FakeCursor(ready).fetchall()])
+
+
+def chunked(raw, ready):
+    # Consumed chunk by chunk like a streamed response would be.
+    size = 0
+    for chunk in serialization._chunks(_FakeCursor(ready), KEYS):
+        size += len(chunk)
+    return size
+
+
+OFFLINE = {"original": original, "dicts": dicts, "chunked": chunked}
+
+
+def measure(func, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def print_row(name, rows, seconds, peak):
+    print(f"{name:<10}{seconds * 1000:>12.1f}{rows / seconds:>14,.0f}{peak / 1024 / 1024:>12.1f}")
+
+
+def run_offline(n, repeats):
+    raw, ready = synthetic_rows(n)
+    print(f"{n} synthetic rows, median of {repeats} runs")
+    print(f"{'path':<10}{'ms':>12}{'rows/s':>14}{'peak MiB':>12}")
+    for name, func in OFFLINE.items():
+        seconds, peak = measure(lambda: func(raw, ready), repeats)
+        print_row(name, n, seconds, peak)
+
+
+def run_app(endpoint, repeats):
+    from app import app
+
+    client = app.test_client()
+    rows = len(client.get(endpoint, query_string={"json": "db"}).get_json())
+    print(f"{endpoint}: {rows} rows, median of {repeats} runs")
+    print(f"{'path':<10}{'ms':>12}{'rows/s':>14}{'peak MiB':>12}")
+
+    for mode in serialization.MODES:
+        def request():
+            response = client.get(endpoint, query_string={"json": mode})
+            for _ in response.response:
+                pass
+            response.close()
+
+        seconds, peak = measure(request, repeats)
+        print_row(mode, max(rows, 1), seconds, peak)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare JSON serialization paths")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--app", action="store_true", help="benchmark the real endpoints")
+    parser.add_argument("--endpoint", default="/flowers")
+    args = parser.parse_args()
+
+    if args.app:
+        run_app(args.endpoint, args.repeats)
+    else:
+        run_offline(args.rows, args.repeats)
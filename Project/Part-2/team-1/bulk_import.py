@@ -0,0 +1,204 @@
+import csv
+import io
+import json
+from datetime import date
+
+# ============================================================
+# Bulk flower import (POST /flowers/bulk)
+# ============================================================
+# Uploads are parsed row by row and streamed into a temporary staging
+# table with COPY, then merged into team1_flowers with one
+# INSERT ... ON CONFLICT (name) DO UPDATE. Nothing is held in memory
+# per row except for JSON arrays, which have to be parsed whole; send
+# NDJSON or CSV for very large uploads.
+#
+# Accepted formats (Content-Type, ?format=, or a multipart "file"):
+#   application/json      [{"name": ..., "water_level": ..., ...}, ...]
+#   application/x-ndjson  one JSON object per line
+#   text/csv              header row with the same column names
+#
+# Columns: name, water_level, min_water_required (required) and
+# last_watered (YYYY-MM-DD, defaults to today). If a name appears more
+# than once in one upload, the last row wins.
+
+FORMATS = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+COPY_COLUMNS = ["line", "name", "last_watered", "water_level", "min_water_required"]
+MAX_REPORTED_ERRORS = 20
+READ_SIZE = 65536
+INT4_MAX = 2147483647
+
+
+def detect_format(mimetype, requested=None, filename=None):
+    if requested:
+        return requested if requested in FORMATS.values() else None
+    if filename:
+        for fmt in ("csv", "ndjson", "json"):
+            if filename.lower().endswith("." + fmt):
+                return fmt
+    return FORMATS.get(mimetype)
+
+
+def read_rows(f, fmt):
+    # Yields (line_number, row dict or None for unparseable input).
+    if fmt == "csv":
+        for line_number, row in enumerate(csv.DictReader(f), start=2):
+            yield line_number, row
+    elif fmt == "ndjson":
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        try:
+            rows = json.load(f)
+        except ValueError:
+            rows = None
+        if not isinstance(rows, list):
+            yield 1, None
+            return
+        for index, row in enumerate(rows, start=1):
+            yield index, row if isinstance(row, dict) else None
+
+
+def _int_field(row, column):
+    value = row.get(column)
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, float) and not value.is_integer():
+        # int() would silently truncate 7.9 to 7.
+        raise ValueError
+    value = int(value)
+    if not 0 <= value <= INT4_MAX:
+        raise ValueError
+    return value
+
+
+def validate_row(row):
+    if row is None:
+        return None, "not a JSON object"
+
+    name = str(row.get("name") or "").strip()
+    if not name or len(name) > 100:
+        return None, "name must be 1-100 characters"
+    if "\x00" in name:
+        # Postgres text cannot hold NUL; COPY would fail the whole upload.
+        return None, "name must not contain NUL characters"
+
+    values = [name]
+    last_watered = row.get("last_watered") or None
+    if last_watered is not None:
+        try:
+            last_watered = date.fromisoformat(str(last_watered)).isoformat()
+        except ValueError:
+            return None, "last_watered must be YYYY-MM-DD"
+    values.append(last_watered)
+
+    for column in ("water_level", "min_water_required"):
+        try:
+            values.append(_int_field(row, column))
+        except (TypeError, ValueError):
+            return None, f"{column} must be an integer from 0 to {INT4_MAX}"
+
+    return values, None
+
+
+class CopyRowStream:
+    """
+    File-like object for cur.copy_expert: turns the valid rows into CSV
+    on demand, so only about one read() worth of data is in memory.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, lineterminator="\n")
+        self.accepted = 0
+        self.rejected = 0
+        self.errors = []
+
+    def read(self, size=-1):
+        size = size if size and size > 0 else READ_SIZE
+        while self.buffer.tell() < size:
+            try:
+                line_number, row = next(self.rows)
+            except StopIteration:
+                break
+
+            values, error = validate_row(row)
+            if error:
+                self.rejected += 1
+                if len(self.errors) < MAX_REPORTED_ERRORS:
+                    self.errors.append({"line": line_number, "error": error})
+                continue
+
+            # None becomes an empty unquoted field, which CSV COPY reads as NULL.
+            self.writer.writerow([line_number] + ["" if v is None else v for v in values])
+            self.accepted += 1
+
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+def import_flowers(conn, f, fmt):
+    stream = CopyRowStream(read_rows(f, fmt))
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            CREATE TEMP TABLE team1_flowers_import (
+                line INT,
+                name VARCHAR(100),
+                last_watered DATE,
+                water_level INT,
+                min_water_required INT
+            ) ON COMMIT DROP;
+        """)
+        cur.copy_expert(
+            f"COPY team1_flowers_import ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            stream
+        )
+
+        # ON CONFLICT cannot touch the same row twice in one statement,
+        # so only the last row per name is merged. xmax = 0 is true for
+        # freshly inserted rows and false for updated ones.
+        cur.execute("""
+            WITH merged AS (
+                INSERT INTO team1_flowers (name, last_watered, water_level, min_water_required)
+                SELECT DISTINCT ON (name)
+                       name, COALESCE(last_watered, CURRENT_DATE), water_level, min_water_required
+                FROM team1_flowers_import
+                ORDER BY name, line DESC
+                ON CONFLICT (name) DO UPDATE
+                SET last_watered = EXCLUDED.last_watered,
+                    water_level = EXCLUDED.water_level,
+                    min_water_required = EXCLUDED.min_water_required
+                RETURNING (xmax = 0) AS inserted
+            )
+            SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted)
+            FROM merged;
+        """)
+        inserted, updated = cur.fetchone()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "rejected": stream.rejected,
+        "superseded": stream.accepted - inserted - updated,
+        "errors": stream.errors,
+    }
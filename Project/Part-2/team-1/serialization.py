@@ -0,0 +1,143 @@
+import itertools
+import json
+
+from flask import Response, jsonify, request, stream_with_context
+
+# ============================================================
+# JSON serialization paths for flower listings
+# ============================================================
+# Building one dict per row and then calling jsonify() is fine for a
+# few hundred flowers, but at 100k rows the Python objects (tuples,
+# date objects, dicts, the encoder's own lists) dominate the response
+# time and peak memory. Each listing can use one of three paths:
+#
+#   dicts    fetchall() + a dict per row + jsonify()       (original)
+#   chunked  a named (server-side) cursor read CHUNK_ROWS rows at a
+#            time, each chunk encoded and streamed as soon as it
+#            arrives
+#   db       Postgres builds the whole array with json_agg and
+#            Python passes the text through untouched
+#
+# "db" is the fastest when the whole response is wanted at once; the
+# cost moves to the database server, which is usually less loaded than
+# the app. "chunked" keeps Python memory flat and starts sending
+# before the last row is read. ENDPOINT_MODES picks the path per
+# endpoint; ?json=<mode> overrides it per request (bench_json.py uses
+# that to compare them).
+#
+# ?format=ndjson (or Accept: application/x-ndjson) sends one object per
+# line instead of one array; it always uses the "chunked" path.
+#
+# The SELECT passed in must already return JSON-ready columns, named
+# as the output keys: dates as to_char(..., 'YYYY-MM-DD') text,
+# booleans as booleans.
+
+MODES = ("dicts", "chunked", "db")
+ENDPOINT_MODES = {
+    "flowers": "chunked",
+    "needs_watering": "db",
+    "due": "chunked",
+}
+CHUNK_ROWS = 2000
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+_cursor_ids = itertools.count()
+
+
+def wants_ndjson():
+    if request.args.get("format") == "ndjson":
+        return True
+    return request.accept_mimetypes.best == "application/x-ndjson"
+
+
+def choose_mode(endpoint):
+    if wants_ndjson():
+        return "chunked"
+    requested = request.args.get("json")
+    if requested in MODES:
+        return requested
+    return ENDPOINT_MODES.get(endpoint, "dicts")
+
+
+def _dicts(cur, keys):
+    return jsonify([dict(zip(keys, row)) for row in cur.fetchall()])
+
+
+def _row_chunks(cur, keys):
+    # Only one chunk of rows (and their dicts) is alive at a time. A
+    # named cursor has no description until the first fetch, so keys
+    # may be None and are read from it then.
+    while True:
+        rows = cur.fetchmany(CHUNK_ROWS)
+        if not rows:
+            break
+        if keys is None:
+            keys = [column[0] for column in cur.description]
+        yield [dict(zip(keys, row)) for row in rows]
+
+
+def _chunks(cur, keys=None):
+    # The C encoder does the actual JSON work, one chunk at a time.
+    first = True
+    yield "["
+    for rows in _row_chunks(cur, keys):
+        chunk = _encode(rows)[1:-1]
+        yield chunk if first else "," + chunk
+        first = False
+    yield "]"
+
+
+def _ndjson_chunks(cur, keys=None):
+    for rows in _row_chunks(cur, keys):
+        yield "\n".join(_encode(row) for row in rows) + "\n"
+
+
+def flowers_response(conn, select_sql, params, order_by, endpoint):
+    """
+    Run select_sql (JSON-ready columns, see above) and return the rows
+    as a JSON array (or NDJSON) using the endpoint's serialization path.
+    """
+    mode = choose_mode(endpoint)
+
+    if mode == "db":
+        cur = conn.cursor()
+        # ::text keeps psycopg2 from parsing the JSON back into Python.
+        cur.execute(f"""
+            SELECT COALESCE(json_agg(r ORDER BY {order_by}), '[]')::text
+            FROM ({select_sql}) r
+        """, params or None)
+        body = cur.fetchone()[0]
+        cur.close()
+        return Response(body, mimetype="application/json")
+
+    query = f"SELECT * FROM ({select_sql}) r ORDER BY {order_by}"
+
+    if mode == "dicts":
+        cur = conn.cursor()
+        cur.execute(query, params or None)
+        response = _dicts(cur, [column[0] for column in cur.description])
+        cur.close()
+        return response
+
+    # Server-side cursor: Postgres keeps the result and hands over
+    # CHUNK_ROWS rows per round trip, so neither side of the connection
+    # ever holds the whole listing. It lives in the request's
+    # transaction, which the pool rolls back when the request ends.
+    cur = conn.cursor(name=f"flowers_{next(_cursor_ids)}")
+    cur.itersize = CHUNK_ROWS
+    cur.execute(query, params or None)
+
+    if wants_ndjson():
+        encode, mimetype = _ndjson_chunks, "application/x-ndjson"
+    else:
+        encode, mimetype = _chunks, "application/json"
+
+    def generate():
+        try:
+            yield from encode(cur)
+        finally:
+            cur.close()
+
+    # stream_with_context keeps the request (and its pooled connection)
+    # alive until the last chunk has been sent.
+    return Response(stream_with_context(generate()), mimetype=mimetype)
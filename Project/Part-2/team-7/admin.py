@@ -31,6 +31,29 @@ def init_db():
             flower_id INT REFERENCES team7_flowers(id),
             order_date DATE NOT NULL DEFAULT CURRENT_DATE
         );
+
+        -- Day the level first drops below min_water_required (stored, indexed).
+        ALTER TABLE team7_flowers ADD COLUMN IF NOT EXISTS needs_water_at DATE
+            GENERATED ALWAYS AS (
+                CASE WHEN min_water_required > 0 THEN
+                    last_watered + GREATEST(FLOOR((water_level - min_water_required) / 5.0)::INT + 1, 0)
+                END
+            ) STORED;
+        CREATE INDEX IF NOT EXISTS idx_team7_flowers_needs_water_at ON team7_flowers (needs_water_at);
+
+        -- Current level: water_level minus 5 per day since last_watered.
+        CREATE OR REPLACE FUNCTION team7_current_water_level(
+            level_at_watering INT, watered_on DATE, as_of DATE DEFAULT CURRENT_DATE
+        ) RETURNS INT
+        LANGUAGE SQL IMMUTABLE AS $$
+            SELECT GREATEST(level_at_watering - 5 * GREATEST(as_of - watered_on, 0), 0);
+        $$;
+
+        CREATE OR REPLACE VIEW team7_flowers_current AS
+        SELECT id, name, last_watered,
+               team7_current_water_level(water_level, last_watered) AS water_level,
+               min_water_required, needs_water_at
+        FROM team7_flowers;
     """)
     conn.commit()
     cur.close()
@@ -1,6 +1,12 @@
+import os
+import sys
 import psycopg2
 from flask import request, jsonify
 
+# Modules shared by the team apps live in Project/common.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.query_params import parse_within
+
 DATABASE_URL = (
     "postgresql://neondb_owner:npg_M5sVheSzQLv4@"
     "ep-shrill-tree-a819xf7v-pooler.eastus2.azure.neon.tech/"
@@ -10,31 +16,16 @@ DATABASE_URL = (
 def get_db_connection():
     return psycopg2.connect(DATABASE_URL)
 
-def apply_watering_loss():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        UPDATE team7_flowers
-        SET water_level = GREATEST(
-            0,
-            water_level - (5 * (CURRENT_DATE - last_watered))
-        );
-    """)
-    conn.commit()
-    cur.close()
-    conn.close()
-
 def register_routes(bp):
-    # Get all flowers
+    # Get all flowers. Reads go through team7_flowers_current (admin.py),
+    # which applies the daily water loss without writing to the table.
     @bp.route('/flowers', methods=['GET'])
     def get_flowers():
-        apply_watering_loss()
-
         conn = get_db_connection()
         cur = conn.cursor()
         cur.execute("""
             SELECT id, name, last_watered, water_level, min_water_required
-            FROM team7_flowers
+            FROM team7_flowers_current
             ORDER BY id;
         """)
         flowers = cur.fetchall()
@@ -52,14 +43,12 @@ def register_routes(bp):
 
     @bp.route('/flowers/needs_watering', methods=['GET'])
     def get_flowers_needing_water():
-        apply_watering_loss()
-
         conn = get_db_connection()
         cur = conn.cursor()
         cur.execute("""
             SELECT id, name, last_watered, water_level, min_water_required
-            FROM team7_flowers
-            WHERE water_level < min_water_required
+            FROM team7_flowers_current
+            WHERE needs_water_at <= CURRENT_DATE
             ORDER BY id;
         """)
         flowers = cur.fetchall()
@@ -75,6 +64,36 @@ def register_routes(bp):
             "needs_watering": f[3] < f[4]
         } for f in flowers])
 
+    # Flowers that need water within the next N days (including the
+    # ones that already do), soonest first: /flowers/due?within=3d
+    @bp.route('/flowers/due', methods=['GET'])
+    def get_flowers_due():
+        days = parse_within(request.args.get('within', '0d'))
+        if days is None:
+            return jsonify({"message": "within must be a number of days, e.g. 3d"}), 400
+
+        conn = get_db_connection()
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT id, name, last_watered, water_level, min_water_required, needs_water_at
+            FROM team7_flowers_current
+            WHERE needs_water_at <= CURRENT_DATE + %s
+            ORDER BY needs_water_at, id;
+        """, (days,))
+        flowers = cur.fetchall()
+        cur.close()
+        conn.close()
+
+        return jsonify([{
+            "id": f[0],
+            "name": f[1],
+            "last_watered": f[2].strftime("%Y-%m-%d"),
+            "water_level": f[3],
+            "min_water_required": f[4],
+            "needs_watering": f[3] < f[4],
+            "needs_water_at": f[5].strftime("%Y-%m-%d")
+        } for f in flowers])
+
     # Add a flower
     @bp.route('/flowers', methods=['POST'])
     def add_flower():
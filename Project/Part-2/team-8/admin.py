@@ -1,10 +1,13 @@
+import os
 import psycopg2
 
-DATABASE_URL = (
+# DATABASE_URL in the environment overrides it (e.g. a local Postgres
+# for load testing).
+DATABASE_URL = os.getenv("DATABASE_URL", (
     "postgresql://neondb_owner:npg_nTU5Yia7xSdB@" #"postgresql://neondb_owner:npg_M5sVheSzQLv4@"
     "ep-late-bird-amz6lx5v-pooler.c-5.us-east-1.aws.neon.tech/" #"ep-shrill-tree-a819xf7v-pooler.eastus2.azure.neon.tech/"
     "neondb?sslmode=require&channel_binding=require" #"neondb?sslmode=require"
-)
+))
 
 def _get_conn():
     return psycopg2.connect(DATABASE_URL)
@@ -31,6 +34,29 @@ def init_db():
             flower_id INT REFERENCES team8_flowers(id),
             order_date DATE
         );
+
+        -- Day the level first drops below min_water_required (stored, indexed).
+        ALTER TABLE team8_flowers ADD COLUMN IF NOT EXISTS needs_water_at DATE
+            GENERATED ALWAYS AS (
+                CASE WHEN min_water_required > 0 THEN
+                    last_watered + GREATEST(FLOOR((water_level - min_water_required) / 5.0)::INT + 1, 0)
+                END
+            ) STORED;
+        CREATE INDEX IF NOT EXISTS idx_team8_flowers_needs_water_at ON team8_flowers (needs_water_at);
+
+        -- Current level: water_level minus 5 per day since last_watered.
+        CREATE OR REPLACE FUNCTION team8_current_water_level(
+            level_at_watering INT, watered_on DATE, as_of DATE DEFAULT CURRENT_DATE
+        ) RETURNS INT
+        LANGUAGE SQL IMMUTABLE AS $$
+            SELECT GREATEST(level_at_watering - 5 * GREATEST(as_of - watered_on, 0), 0);
+        $$;
+
+        CREATE OR REPLACE VIEW team8_flowers_current AS
+        SELECT id, name, last_watered,
+               team8_current_water_level(water_level, last_watered) AS water_level,
+               min_water_required, needs_water_at
+        FROM team8_flowers;
     """)
     conn.commit()
     cur.close()
@@ -1,24 +1,53 @@
+import os
+import sys
 import time
 import psycopg2
+from psycopg2.extras import execute_values
 from flask import Flask, request, jsonify, redirect, url_for, flash, render_template
 from apscheduler.schedulers.background import BackgroundScheduler
 import admin
+# Modules shared by the team apps live in Project/common.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.alerts import WateringAlertScheduler
+from common.db_pool import FlaskConnectionPool
+from common.profiling import RequestProfiler
+from common.query_params import parse_within
+from streaming import stream_rows
 
 # Database connection details
-DATABASE_URL = (
+# DATABASE_URL in the environment overrides it (e.g. a local Postgres
+# for load testing).
+DATABASE_URL = os.getenv("DATABASE_URL", (
     "postgresql://neondb_owner:npg_nTU5Yia7xSdB@"
     "ep-late-bird-amz6lx5v-pooler.c-5.us-east-1.aws.neon.tech/"
     "neondb?sslmode=require&channel_binding=require"
-)
+))
+
+db_pool = FlaskConnectionPool(DATABASE_URL)
+
+# Samples requests and breaks their time down into connection, query,
+# serialization and Python time: /_metrics and /_debug/last.
+profiler = RequestProfiler("team8_request")
 
 def get_db_connection():
-    return psycopg2.connect(DATABASE_URL)
+    # Pooled, request-scoped connection (see common/db_pool.py). Routes may
+    # still call conn.close(); the connection goes back to the pool
+    # when the request ends.
+    return profiler.connection(db_pool.get_connection)
+
+# Fires a "needs watering" alert when each flower's needs_water_at comes
+# around (replaces the midnight APScheduler job). Write routes below
+# reschedule the flower they changed.
+watering_alerts = WateringAlertScheduler(DATABASE_URL, "team8_flowers")
 
 def create_app():
     app = Flask(__name__, template_folder='template')
     admin.init_db()
     admin.seed_data()
     admin.create_indexes()   # Part 2: indexes used by the fast query
+    db_pool.init_app(app)
+    profiler.init_app(app)
+    watering_alerts.start()
     return app
 
 app = create_app()
@@ -68,19 +97,35 @@ def _run_and_time(sql: str):
     """Execute a SQL string, discard the rows, return elapsed seconds.
     Matches the spirit of \\timing on / \\timing off."""
     conn = get_db_connection()
-    cur  = conn.cursor()
+    # Server-side cursor: the rows are still all read (so network time
+    # counts) but only itersize of them are held at a time.
+    cur  = conn.cursor(name="team8_timed_query")
+    cur.itersize = 2000
     start = time.perf_counter()
-    cur.execute(sql)
-    try:
-        cur.fetchall()          # consume so network + serialization time counts
-    except psycopg2.ProgrammingError:
-        pass                    # no results to fetch (shouldn't happen here)
+    cur.execute(sql.rstrip().rstrip(";"))
+    for _ in cur:
+        pass
     elapsed = time.perf_counter() - start
     cur.close()
     conn.close()
     return elapsed
 
 
+# ------------------ Pool metrics ------------------
+@app.route('/_pool', methods=['GET'])
+def pool_metrics():
+    return jsonify(db_pool.metrics())
+
+
+# ------------------ Watering alerts ------------------
+@app.route('/team8_flowers/alerts', methods=['GET'])
+def watering_alert_list():
+    return jsonify({
+        "pending": watering_alerts.pending(),
+        "alerts": list(watering_alerts.recent_alerts)
+    })
+
+
 # ------------------ Pages ------------------
 @app.route('/')
 def index():
@@ -88,34 +133,53 @@ def index():
 
 
 # ------------------ Part 1 CRUD endpoints (unchanged) ------------------
+# The listings below are streamed from a server-side cursor (see
+# streaming.py); add ?format=ndjson for one object per line.
 @app.route('/team8_flowers', methods=['GET'])
 def get_flowers():
     conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT id, name, last_watered,
-               GREATEST(water_level - (5 * (CURRENT_DATE - last_watered)), 0) AS water_level,
-               min_water_required
-        FROM team8_flowers;
-    """)
-    flowers = cur.fetchall()
-    cur.close()
-    conn.close()
-    return jsonify([{
+    return stream_rows(conn, """
+        SELECT id, name, last_watered, water_level, min_water_required
+        FROM team8_flowers_current
+        ORDER BY id
+    """, None, lambda f: {
         "id": f[0], "name": f[1], "last_watered": f[2].strftime("%Y-%m-%d"),
         "water_level": f[3], "min_water_required": f[4], "needs_watering": f[3] < f[4]
-    } for f in flowers])
+    })
 
 
+# First 10 customers by default (what the page shows); ?limit=N or
+# ?limit=all for more.
 @app.route('/team8_customers', methods=['GET'])
 def get_customers():
+    limit = request.args.get('limit', '10')
+    if limit != 'all' and not limit.isdigit():
+        return jsonify({"message": "limit must be a number or 'all'"}), 400
+
     conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT id, name, email FROM team8_customers LIMIT 10;")
-    customers = cur.fetchall()
-    cur.close()
-    conn.close()
-    return jsonify([{"id": c[0], "name": c[1], "email": c[2]} for c in customers])
+    return stream_rows(conn, """
+        SELECT id, name, email FROM team8_customers
+        ORDER BY id
+        LIMIT %s
+    """, (None if limit == 'all' else int(limit),),
+        lambda c: {"id": c[0], "name": c[1], "email": c[2]})
+
+
+# All orders with their customer and flower, in order id order.
+@app.route('/team8_orders', methods=['GET'])
+def get_orders():
+    conn = get_db_connection()
+    return stream_rows(conn, """
+        SELECT o.id, o.order_date, c.name, c.email, f.name
+        FROM team8_orders o
+        JOIN team8_customers c ON o.customer_id = c.id
+        JOIN team8_flowers   f ON o.flower_id   = f.id
+        ORDER BY o.id
+    """, None, lambda o: {
+        "order_id": o[0],
+        "order_date": o[1].strftime("%Y-%m-%d") if o[1] else None,
+        "customer_name": o[2], "customer_email": o[3], "flower_name": o[4]
+    })
 
 
 @app.route('/team8_flowers/needs_water', methods=['GET'])
@@ -124,8 +188,8 @@ def get_flowers_needing_water():
     cur = conn.cursor()
     cur.execute("""
         SELECT id, name, last_watered, water_level, min_water_required
-        FROM team8_flowers
-        WHERE water_level < min_water_required;
+        FROM team8_flowers_current
+        WHERE needs_water_at <= CURRENT_DATE;
     """)
     flowers = cur.fetchall()
     cur.close()
@@ -136,6 +200,32 @@ def get_flowers_needing_water():
     } for f in flowers])
 
 
+# Flowers that need water within the next N days (including the ones
+# that already do), soonest first: /team8_flowers/due?within=3d
+@app.route('/team8_flowers/due', methods=['GET'])
+def get_flowers_due():
+    days = parse_within(request.args.get('within', '0d'))
+    if days is None:
+        return jsonify({"message": "within must be a number of days, e.g. 3d"}), 400
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT id, name, last_watered, water_level, min_water_required, needs_water_at
+        FROM team8_flowers_current
+        WHERE needs_water_at <= CURRENT_DATE + %s
+        ORDER BY needs_water_at, id;
+    """, (days,))
+    flowers = cur.fetchall()
+    cur.close()
+    conn.close()
+    return jsonify([{
+        "id": f[0], "name": f[1], "last_watered": f[2].strftime("%Y-%m-%d"),
+        "water_level": f[3], "min_water_required": f[4], "needs_watering": f[3] < f[4],
+        "needs_water_at": f[5].strftime("%Y-%m-%d")
+    } for f in flowers])
+
+
 # ============================================================
 # Part 2: Slow Query and Fast Query endpoints
 # ============================================================
@@ -184,10 +274,13 @@ def add_flower():
         conn = get_db_connection()
         cur = conn.cursor()
         cur.execute(
-            "INSERT INTO team8_flowers (name, last_watered, water_level, min_water_required) VALUES (%s, %s, %s, %s)",
+            "INSERT INTO team8_flowers (name, last_watered, water_level, min_water_required) VALUES (%s, %s, %s, %s) "
+            "RETURNING id, needs_water_at",
             (data['name'], data['last_watered'], data['water_level'], data['min_water_required'])
         )
+        flower_id, needs_water_at = cur.fetchone()
         conn.commit()
+        watering_alerts.schedule(flower_id, needs_water_at, data['name'])
         cur.close()
         conn.close()
         flash("Flower added successfully!")
@@ -203,10 +296,14 @@ def update_flower(id):
     conn = get_db_connection()
     cur = conn.cursor()
     cur.execute(
-        "UPDATE team8_flowers SET name = %s, last_watered = %s, water_level = %s, min_water_required = %s WHERE id = %s;",
+        "UPDATE team8_flowers SET name = %s, last_watered = %s, water_level = %s, min_water_required = %s WHERE id = %s "
+        "RETURNING name, needs_water_at;",
         (data['name'], data['last_watered'], data['water_level'], data['min_water_required'], id)
     )
+    row = cur.fetchone()
     conn.commit()
+    if row:
+        watering_alerts.schedule(id, row[1], row[0])
     cur.close()
     conn.close()
     flash("Flower updated successfully!")
@@ -219,6 +316,7 @@ def delete_flower(id):
     cur = conn.cursor()
     cur.execute("DELETE FROM team8_flowers WHERE id = %s", (id,))
     conn.commit()
+    watering_alerts.cancel(id)
     cur.close()
     conn.close()
     flash("Flower deleted successfully!")
@@ -231,16 +329,137 @@ def water(id):
     cur = conn.cursor()
     cur.execute("""
         UPDATE team8_flowers
-        SET water_level = GREATEST(water_level - (5 * (CURRENT_DATE - last_watered)), 0) + 10,
+        SET water_level = team8_current_water_level(water_level, last_watered) + 10,
             last_watered = CURRENT_DATE
         WHERE id = %s
+        RETURNING name, needs_water_at
     """, (id,))
+    row = cur.fetchone()
     conn.commit()
+    if row:
+        watering_alerts.schedule(id, row[1], row[0])
     cur.close()
     conn.close()
     flash("Flower watered successfully!")
     return redirect(url_for('index'))
 
 
+# ------------------ Bulk watering / bulk update ------------------
+# One request and one UPDATE ... FROM (VALUES ...) statement for any
+# number of flowers. Both return the new state of every changed flower
+# as JSON (the form routes above redirect instead).
+
+# Upper bound for one watering, so level + amount stays far from INT's limit.
+MAX_WATER_AMOUNT = 1000
+
+BULK_RETURNING = """
+    RETURNING f.id, f.name, f.last_watered,
+              team8_current_water_level(f.water_level, f.last_watered),
+              f.min_water_required, f.needs_water_at
+"""
+
+
+def _bulk_result(rows, requested_ids):
+    for r in rows:
+        watering_alerts.schedule(r[0], r[5], r[1])
+    found = {r[0] for r in rows}
+    return {
+        "updated": len(rows),
+        "not_found": [i for i in requested_ids if i not in found],
+        "flowers": [{
+            "id": r[0], "name": r[1], "last_watered": r[2].strftime("%Y-%m-%d"),
+            "water_level": r[3], "min_water_required": r[4], "needs_watering": r[3] < r[4],
+            "needs_water_at": r[5].strftime("%Y-%m-%d") if r[5] else None
+        } for r in rows]
+    }
+
+
+def _int_list(values):
+    if not isinstance(values, list) or not all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return None
+    return list(dict.fromkeys(values))
+
+
+# Body: [1, 2, 3] or {"ids": [1, 2, 3], "amount": 10}
+@app.route("/team8_flowers/water", methods=["POST"])
+def water_many():
+    data = request.get_json(silent=True)
+    amount = 10
+    if isinstance(data, dict):
+        amount = data.get("amount", 10)
+        data = data.get("ids")
+    ids = _int_list(data)
+    if (not ids or not isinstance(amount, int) or isinstance(amount, bool)
+            or not 0 <= amount <= MAX_WATER_AMOUNT):
+        return jsonify({"message": "Send a list of flower ids and an optional amount "
+                                   f"from 0 to {MAX_WATER_AMOUNT}"}), 400
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        rows = execute_values(cur, """
+            UPDATE team8_flowers AS f
+            SET water_level = team8_current_water_level(f.water_level, f.last_watered) + v.amount,
+                last_watered = CURRENT_DATE
+            FROM (VALUES %s) AS v(id, amount)
+            WHERE f.id = v.id
+        """ + BULK_RETURNING, [(i, amount) for i in ids], page_size=len(ids), fetch=True)
+        conn.commit()
+    except psycopg2.DataError as e:
+        # A stored level already near INT's limit can still overflow.
+        conn.rollback()
+        return jsonify({"message": f"Invalid value: {str(e).strip()}"}), 400
+    finally:
+        cur.close()
+        conn.close()
+    return jsonify(_bulk_result(rows, ids))
+
+
+# Body: [{"id": 1, "water_level": 8, "last_watered": "2026-03-01"}, ...]
+# Fields that are left out keep their current value.
+@app.route("/team8_flowers", methods=["PATCH"])
+def update_many():
+    data = request.get_json(silent=True)
+    if not isinstance(data, list) or not data:
+        return jsonify({"message": "Send a list of {id, ...} updates"}), 400
+
+    updates = {}
+    for item in data:
+        if not isinstance(item, dict) or _int_list([item.get("id")]) is None:
+            return jsonify({"message": "Every update needs an integer id"}), 400
+        # A later update for the same id wins.
+        updates[item["id"]] = (
+            item["id"], item.get("name"), item.get("last_watered"),
+            item.get("water_level"), item.get("min_water_required"),
+        )
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        rows = execute_values(cur, """
+            UPDATE team8_flowers AS f
+            SET name = COALESCE(v.name::varchar, f.name),
+                last_watered = COALESCE(v.last_watered::date, f.last_watered),
+                water_level = COALESCE(v.water_level::int, f.water_level),
+                min_water_required = COALESCE(v.min_water_required::int, f.min_water_required)
+            FROM (VALUES %s) AS v(id, name, last_watered, water_level, min_water_required)
+            WHERE f.id = v.id
+        """ + BULK_RETURNING, list(updates.values()), page_size=len(updates), fetch=True)
+        conn.commit()
+    except psycopg2.IntegrityError as e:
+        # A CHECK / UNIQUE violation: nothing is updated.
+        conn.rollback()
+        return jsonify({"message": f"Conflicting update: {str(e).strip()}"}), 409
+    except (psycopg2.DataError, psycopg2.ProgrammingError) as e:
+        # ProgrammingError covers DatatypeMismatch, raised when the same
+        # field has different JSON types across updates.
+        conn.rollback()
+        return jsonify({"message": f"Invalid value: {str(e).strip()}"}), 400
+    finally:
+        cur.close()
+        conn.close()
+    return jsonify(_bulk_result(rows, list(updates)))
+
+
 if __name__ == "__main__":
     app.run(debug=True, use_reloader=False, port=3000, host="0.0.0.0")
\ No newline at end of file
@@ -9,6 +9,31 @@ DATABASE_URL = (
 def _get_conn():
     return psycopg2.connect(DATABASE_URL)
 
+# The frontend's team8_flowers (flower_id, ...) lives in this database,
+# not in the one admin.py sets up, so the decay-on-read function and
+# view it reads are created here. Same definitions as Part-1/team-8
+# admin.py, which owns this table.
+def init_db():
+    conn = _get_conn()
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION team8_current_water_level(
+            level_at_watering INT, watered_on DATE, as_of DATE DEFAULT CURRENT_DATE
+        ) RETURNS INT
+        LANGUAGE SQL IMMUTABLE AS $$
+            SELECT GREATEST(level_at_watering - 5 * GREATEST(as_of - watered_on, 0), 0);
+        $$;
+
+        CREATE OR REPLACE VIEW team8_flowers_current AS
+        SELECT flower_id, name, last_watered,
+               team8_current_water_level(water_level, last_watered) AS water_level,
+               min_water_required
+        FROM team8_flowers;
+    """)
+    conn.commit()
+    cur.close()
+    conn.close()
+
 #==========SQL QUERIES============
 def insert_flower(name, last_watered, water_level, min_water_required):
     conn = _get_conn()
@@ -31,14 +56,13 @@ def insert_flower(name, last_watered, water_level, min_water_required):
 
 #Get all flowers
 def select_flower(flower_id=None):
-    daily_water_update()
     conn = _get_conn()
     cur = conn.cursor()
     try:
         if flower_id is None:
             sql = """
                 SELECT flower_id, name, last_watered, water_level, min_water_required
-                FROM team8_flowers
+                FROM team8_flowers_current
                 ORDER BY flower_id;
             """
             cur.execute(sql)
@@ -56,7 +80,7 @@ def select_flower(flower_id=None):
         else:
             sql = f"""
                 SELECT flower_id, name, last_watered, water_level, min_water_required
-                FROM team8_flowers
+                FROM team8_flowers_current
                 WHERE flower_id = {flower_id};
             """
             cur.execute(sql)
@@ -128,7 +152,7 @@ def water_flower(flower_id):
 
     cur.execute("""
         UPDATE team8_flowers
-        SET water_level = water_level + 10,
+        SET water_level = team8_current_water_level(water_level, last_watered) + 10,
             last_watered = CURRENT_DATE
         WHERE flower_id = %s;
     """, (flower_id,))
@@ -136,19 +160,3 @@ def water_flower(flower_id):
     conn.commit()
     cur.close()
     conn.close()
-
-# Shows water loss after day(s)
-def daily_water_update():
-    conn = _get_conn()
-    cur = conn.cursor()
-
-    cur.execute("""
-        UPDATE team8_flowers
-        SET water_level = GREATEST(water_level - (5 * (CURRENT_DATE - last_watered)),
-        0)
-        WHERE CURRENT_DATE > last_watered;
-    """)
-
-    conn.commit()
-    cur.close()
-    conn.close()
\ No newline at end of file
@@ -0,0 +1,80 @@
+import itertools
+import json
+
+from flask import Response, request, stream_with_context
+
+# ============================================================
+# Streamed listings
+# ============================================================
+# fetchall() + jsonify() holds every row, every dict and the whole
+# JSON document in memory at once, and the first byte is only sent
+# after the last row has been read. stream_rows() instead:
+#
+#   - reads through a named (server-side) cursor, so Postgres hands
+#     over ITERSIZE rows per round trip instead of the whole result;
+#   - encodes one chunk of rows at a time and sends it right away,
+#     either as one JSON array written incrementally (the default, the
+#     same document the old endpoints returned) or as NDJSON, one
+#     object per line (?format=ndjson or Accept: application/x-ndjson).
+#
+# Peak memory stays at about one chunk regardless of table size.
+
+ITERSIZE = 2000
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+_cursor_ids = itertools.count()
+
+
+def wants_ndjson():
+    if request.args.get("format") == "ndjson":
+        return True
+    return request.accept_mimetypes.best == "application/x-ndjson"
+
+
+def _json_array(chunks):
+    first = True
+    yield "["
+    for rows in chunks:
+        chunk = _encode(rows)[1:-1]
+        if chunk:
+            yield chunk if first else "," + chunk
+            first = False
+    yield "]"
+
+
+def _ndjson(chunks):
+    for rows in chunks:
+        if rows:
+            yield "\n".join(_encode(row) for row in rows) + "\n"
+
+
+def stream_rows(conn, sql, params, to_dict):
+    """
+    Stream the rows of sql as JSON; to_dict turns one row tuple into
+    the object sent for it. sql becomes DECLARE ... CURSOR FOR <sql>,
+    so it must not end with a semicolon.
+    """
+    # A named cursor only exists inside a transaction; the pool rolls
+    # it back when the request ends.
+    cur = conn.cursor(name=f"stream_{next(_cursor_ids)}")
+    cur.itersize = ITERSIZE
+    cur.execute(sql, params)
+
+    def chunks():
+        try:
+            while True:
+                rows = cur.fetchmany(ITERSIZE)
+                if not rows:
+                    break
+                yield [to_dict(row) for row in rows]
+        finally:
+            cur.close()
+
+    if wants_ndjson():
+        body, mimetype = _ndjson(chunks()), "application/x-ndjson"
+    else:
+        body, mimetype = _json_array(chunks()), "application/json"
+
+    # stream_with_context keeps the request (and its pooled connection)
+    # alive until the last chunk has been sent.
+    return Response(stream_with_context(body), mimetype=mimetype)
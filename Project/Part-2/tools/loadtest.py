@@ -0,0 +1,428 @@
+import argparse
+import importlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+# ============================================================
+# Load generator for the flower APIs
+# ============================================================
+# Drives a weighted mix of list / add / update / water / delete
+# requests against one of the apps and reports, per route, requests
+# per second, p50/p95/p99 latency and the error rate.
+#
+#   python tools/loadtest.py --target team-8 --url http://127.0.0.1:5000
+#       A running app (any WSGI server, any number of processes).
+#
+#   python tools/loadtest.py --target team-1 --test-client
+#       Imports <target>/app.py and calls it through the Flask test
+#       client in this process: no HTTP, no server, just the app and
+#       its database.
+#
+# The apps read DATABASE_URL from the environment, so point them (and
+# --test-client runs) at a local Postgres to keep load off the shared
+# Neon database. SQLite cannot stand in for the apps themselves: their
+# views, generated columns and functions are Postgres-only.
+#
+# Two load models:
+#
+#   closed  --concurrency workers, each sending its next request as
+#           soon as the previous one finishes (plus --think seconds).
+#           Measures the throughput the app can sustain.
+#   open    requests arrive at --rate per second (Poisson arrivals)
+#           whether or not earlier ones have finished, the way real
+#           users do. Latency is measured from the scheduled arrival,
+#           so time spent waiting behind a slow app is counted too.
+#
+# Write requests only touch flowers the harness created itself (names
+# starting with PREFIX): --seed of them are added before the run and
+# the leftovers are deleted afterwards unless --keep is given.
+
+PREFIX = "loadtest-"
+DEFAULT_MIX = "get=60,post=10,put=10,water=15,delete=5"
+OPERATIONS = ("get", "post", "put", "water", "delete")
+
+
+def _today():
+    return date.today().strftime("%Y-%m-%d")
+
+
+# Per app: the listing route and, per operation, (method, path, body).
+# "<id>" is replaced by a flower id and "<tenant>" by --tenant; body
+# gets a sequence number and returns request keyword arguments.
+TARGETS = {
+    "team-1": {
+        "list": "/flowers",
+        "get": ("GET", "/flowers", None),
+        "post": ("POST", "/flowers", lambda n: {"json": {
+            "name": f"{PREFIX}{n}", "min_water_required": 5}}),
+        "put": ("PUT", "/flowers/<id>", lambda n: {"json": {
+            "last_watered": _today(), "water_level": 10}}),
+        "water": ("PUT", "/flowers/<id>/water", None),
+        "delete": ("DELETE", "/flowers/<id>", None),
+    },
+    "team-8": {
+        "list": "/team8_flowers",
+        "get": ("GET", "/team8_flowers", None),
+        "post": ("POST", "/team8_flowers/add", lambda n: {"data": {
+            "name": f"{PREFIX}{n}", "last_watered": _today(),
+            "water_level": 10, "min_water_required": 5}}),
+        "put": ("POST", "/team8_flowers/update/<id>", lambda n: {"data": {
+            "name": f"{PREFIX}{n}", "last_watered": _today(),
+            "water_level": 10, "min_water_required": 5}}),
+        "water": ("POST", "/team8_flowers/water/<id>", None),
+        "delete": ("POST", "/team8_flowers/delete/<id>", None),
+    },
+    "flower-service": {
+        "list": "/t/<tenant>/flowers",
+        "get": ("GET", "/t/<tenant>/flowers", None),
+        "post": ("POST", "/t/<tenant>/flowers", lambda n: {"json": {
+            "name": f"{PREFIX}{n}", "last_watered": _today(),
+            "water_level": 10, "min_water_required": 5}}),
+        "put": ("PUT", "/t/<tenant>/flowers/<id>", lambda n: {"json": {
+            "last_watered": _today(), "water_level": 10}}),
+        "water": ("PUT", "/t/<tenant>/flowers/<id>/water", None),
+        "delete": ("DELETE", "/t/<tenant>/flowers/<id>", None),
+    },
+}
+
+
+def parse_mix(text):
+    # "get=60,post=10" -> {"get": 60, "post": 10}
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"unknown operation in mix: {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ------------------ Clients ------------------
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # The team-8 form routes answer with a redirect to the page; the
+    # redirect itself is the response we are timing.
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpClient:
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(_NoRedirect)
+
+    def request(self, method, path, json_body=None, form=None):
+        headers = {}
+        data = None
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers["Content-Type"] = "application/json"
+        elif form is not None:
+            data = urllib.parse.urlencode(form).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        req = urllib.request.Request(self.base_url + path, data=data,
+                                     headers=headers, method=method)
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class TestClient:
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, json_body=None, form=None):
+        # One test client per thread.
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=json_body, data=form)
+        body = response.get_data()   # drains streamed responses too
+        response.close()
+        return response.status_code, body
+
+
+def load_app(target):
+    # Import <target>/app.py the way "python app.py" would see it.
+    app_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), target)
+    sys.path.insert(0, app_dir)
+    os.chdir(app_dir)
+    return importlib.import_module("app").app
+
+
+# ------------------ Flowers under test ------------------
+class Flowers:
+    """Ids of the flowers this run created, shared by all workers."""
+
+    def __init__(self):
+        self.ids = []
+        self.deleted = set()
+        self._lock = threading.Lock()
+        self._sequence = 0
+
+    def next_number(self):
+        with self._lock:
+            self._sequence += 1
+            return f"{os.getpid()}-{self._sequence}"
+
+    def refresh(self, body):
+        try:
+            rows = json.loads(body)
+        except ValueError:
+            return
+        with self._lock:
+            # A listing fetched before a delete finished still has the
+            # deleted flower in it.
+            self.ids = [r["id"] for r in rows
+                        if isinstance(r, dict) and str(r.get("name", "")).startswith(PREFIX)
+                        and r["id"] not in self.deleted]
+
+    def pick(self, remove=False):
+        with self._lock:
+            if not self.ids:
+                return None
+            index = random.randrange(len(self.ids))
+            if remove:
+                # Claimed, so no other worker deletes it too.
+                self.ids[index], self.ids[-1] = self.ids[-1], self.ids[index]
+                flower_id = self.ids.pop()
+                self.deleted.add(flower_id)
+                return flower_id
+            return self.ids[index]
+
+
+# ------------------ Results ------------------
+class Results:
+    def __init__(self):
+        self.latencies = {}   # route -> [seconds]
+        self.errors = {}      # route -> count
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds, ok):
+        with self._lock:
+            self.latencies.setdefault(route, []).append(seconds)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile of an already sorted list.
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(results, seconds):
+    rows = []
+    everything = []
+    total_errors = 0
+    for route in sorted(results.latencies):
+        values = sorted(results.latencies[route])
+        errors = results.errors.get(route, 0)
+        everything.extend(values)
+        total_errors += errors
+        rows.append(_summary_row(route, values, errors, seconds))
+    everything.sort()
+    rows.append(_summary_row("TOTAL", everything, total_errors, seconds))
+    return rows
+
+
+def _summary_row(route, values, errors, seconds):
+    return {
+        "route": route,
+        "requests": len(values),
+        "rps": len(values) / seconds if seconds else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "error_rate": errors / len(values) if values else 0.0,
+    }
+
+
+def print_summary(rows, args, seconds):
+    model = (f"closed, {args.concurrency} workers" if args.model == "closed"
+             else f"open, {args.rate:g} req/s offered")
+    print(f"{args.target}: {model}, {seconds:.1f}s measured")
+    width = max(len(r["route"]) for r in rows) + 2
+    print(f"{'route':<{width}}{'requests':>9}{'rps':>9}{'p50 ms':>9}"
+          f"{'p95 ms':>9}{'p99 ms':>9}{'errors':>9}")
+    for r in rows:
+        print(f"{r['route']:<{width}}{r['requests']:>9}{r['rps']:>9.1f}{r['p50_ms']:>9.1f}"
+              f"{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['error_rate']:>9.1%}")
+
+
+# ------------------ Load ------------------
+class LoadTest:
+    def __init__(self, client, target, mix, tenant="team1"):
+        self.client = client
+        self.routes = TARGETS[target]
+        self.tenant = tenant
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.flowers = Flowers()
+        self.results = Results()
+        self.measure_from = 0.0
+        self._gets = 0
+
+    def _path(self, path, flower_id=None):
+        path = path.replace("<tenant>", self.tenant)
+        if flower_id is not None:
+            path = path.replace("<id>", str(flower_id))
+        return path
+
+    def _send(self, operation, flower_id=None):
+        method, path, body = self.routes[operation]
+        kwargs = body(self.flowers.next_number()) if body else {}
+        status, content = self.client.request(
+            method, self._path(path, flower_id),
+            json_body=kwargs.get("json"), form=kwargs.get("data"))
+        return status, content
+
+    def refresh_flowers(self):
+        status, content = self.client.request("GET", self._path(self.routes["list"]))
+        if status < 400:
+            self.flowers.refresh(content)
+
+    def seed(self, count):
+        for _ in range(count):
+            self._send("post")
+        self.refresh_flowers()
+
+    def cleanup(self):
+        self.refresh_flowers()
+        while True:
+            flower_id = self.flowers.pick(remove=True)
+            if flower_id is None:
+                break
+            self._send("delete", flower_id)
+
+    def run_one(self, started=None):
+        """Send one request from the mix and record it."""
+        operation = random.choices(self.operations, self.weights)[0]
+        flower_id = None
+        if operation in ("put", "water", "delete"):
+            flower_id = self.flowers.pick(remove=operation == "delete")
+            if flower_id is None:
+                operation = "post"   # nothing to work on yet
+
+        method, path, _ = self.routes[operation]
+        route = f"{method} {path.replace('<tenant>', self.tenant)}"
+        if started is None:
+            started = time.perf_counter()
+        try:
+            status, content = self._send(operation, flower_id)
+            ok = status < 400
+        except Exception:
+            status, content, ok = 0, b"", False
+        finished = time.perf_counter()
+
+        if started >= self.measure_from:
+            self.results.record(route, finished - started, ok)
+
+        if operation == "get" and ok:
+            # Learn the ids of flowers added so far (every 10th listing
+            # is enough and keeps the harness's own JSON parsing cheap).
+            self._gets += 1
+            if self._gets % 10 == 1 or not self.flowers.ids:
+                self.flowers.refresh(content)
+
+    def closed_loop(self, concurrency, duration, think=0.0):
+        deadline = time.perf_counter() + duration
+
+        def worker():
+            while time.perf_counter() < deadline:
+                self.run_one()
+                if think:
+                    time.sleep(think)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def open_loop(self, rate, duration, max_inflight):
+        start = time.perf_counter()
+        next_arrival = start
+        deadline = start + duration
+        with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+            while True:
+                next_arrival += random.expovariate(rate)
+                if next_arrival >= deadline:
+                    break
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                # The request "started" when it was due to arrive, even
+                # if every worker was still busy.
+                pool.submit(self.run_one, next_arrival)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test a flower API")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="team-8")
+    where = parser.add_mutually_exclusive_group(required=True)
+    where.add_argument("--url", help="base URL of a running app")
+    where.add_argument("--test-client", action="store_true",
+                       help="import <target>/app.py and use the Flask test client")
+    parser.add_argument("--tenant", default="team1", help="flower-service tenant")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--model", choices=["closed", "open"], default="closed")
+    parser.add_argument("--concurrency", type=int, default=8, help="closed-loop workers")
+    parser.add_argument("--think", type=float, default=0.0,
+                        help="closed-loop pause between requests (seconds)")
+    parser.add_argument("--rate", type=float, default=50.0, help="open-loop requests per second")
+    parser.add_argument("--max-inflight", type=int, default=256,
+                        help="open-loop limit on concurrent requests")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0,
+                        help="seconds of load before measuring starts")
+    parser.add_argument("--seed", type=int, default=20, help="flowers to add before the run")
+    parser.add_argument("--keep", action="store_true", help="keep the flowers the run added")
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args()
+    if args.json:
+        args.json = os.path.abspath(args.json)   # load_app changes directory
+
+    client = TestClient(load_app(args.target)) if args.test_client else HttpClient(args.url)
+    test = LoadTest(client, args.target, parse_mix(args.mix), args.tenant)
+    test.seed(args.seed)
+
+    total = args.warmup + args.duration
+    test.measure_from = time.perf_counter() + args.warmup
+    if args.model == "closed":
+        test.closed_loop(args.concurrency, total, args.think)
+    else:
+        test.open_loop(args.rate, total, args.max_inflight)
+    measured = max(time.perf_counter() - test.measure_from, 1e-9)
+
+    rows = summarize(test.results, measured)
+    print_summary(rows, args, measured)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"target": args.target, "model": args.model,
+                       "seconds": measured, "routes": rows}, f, indent=2)
+
+    if not args.keep:
+        test.cleanup()
+
+
+if __name__ == "__main__":
+    main()
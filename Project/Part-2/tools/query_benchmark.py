@@ -0,0 +1,354 @@
+import argparse
+import json
+import math
+import os
+import statistics
+import time
+
+import psycopg2
+from psycopg2 import sql
+
+# ============================================================
+# Slow vs. fast query benchmark across teams
+# ============================================================
+# The apps time their slow and fast queries once each with
+# time.perf_counter() / time.time() against whatever data their own
+# database holds, so neither the numbers nor the teams can be compared.
+# This runner:
+#
+#   1. builds one generated dataset per scale (--scales, in orders) in
+#      its own schema, qbench_<orders>, and copies it into every team's
+#      table names (team1_orders, team5_orders, ...) so all teams query
+#      identical rows;
+#   2. runs each team's slow and fast query unchanged (search_path
+#      points at the dataset schema), --warmup times untimed and then
+#      --reps times timed, each time draining a server-side cursor so
+#      client memory stays flat and the full result is still read;
+#   3. runs EXPLAIN (ANALYZE, BUFFERS) once per query;
+#   4. prints median and p95 time, rows, buffers and plan shape per
+#      scale, team and query (--json for everything, full plans too).
+#
+#   DATABASE_URL=postgresql://localhost/flowers python tools/query_benchmark.py
+#       --scales 10000,100000 --reps 10
+#
+# Use a scratch database: the qbench_* schemas are dropped and
+# recreated (and dropped again at the end unless --keep is given).
+# Queries that fail or run past --timeout are reported as such.
+
+# The query text as it appears in each app.
+QUERIES = {
+    # team-8/app.py SLOW_SQL / FAST_SQL
+    "team8": {
+        "slow": """
+            SELECT *
+            FROM team8_orders o, team8_customers c, team8_flowers f
+            WHERE CAST(o.customer_id AS TEXT) = CAST(c.id AS TEXT)
+              AND CAST(o.flower_id   AS TEXT) = CAST(f.id AS TEXT)
+              AND LOWER(c.email) LIKE '%customer%'
+              AND LOWER(c.name)  LIKE '%customer%'
+              AND UPPER(f.name)  LIKE '%O%'
+              AND md5(c.name || c.email || f.name || o.order_date::text) LIKE '%a%'
+            ORDER BY md5(c.email || c.name || f.name || o.order_date::text),
+                     LOWER(c.name),
+                     UPPER(f.name),
+                     md5(o.order_date::text)
+        """,
+        "fast": """
+            SELECT o.id AS order_id,
+                   o.order_date,
+                   c.name  AS customer_name,
+                   c.email AS customer_email,
+                   f.name  AS flower_name
+            FROM team8_orders   o
+            JOIN team8_customers c ON o.customer_id = c.id
+            JOIN team8_flowers   f ON o.flower_id   = f.id
+            WHERE f.name IN ('Rose', 'Poppy')
+              AND c.email LIKE 'customer_%'
+            ORDER BY o.id
+            LIMIT 100 OFFSET 0
+        """,
+    },
+    # team-1/app.py /slow-query and /fast-query
+    "team1": {
+        "slow": """
+            SELECT *
+            FROM team1_orders o
+            JOIN team1_customers c ON o.customer_id = c.id
+            JOIN team1_flowers f ON o.flower_id = f.id
+            WHERE LOWER(f.name) LIKE '%rose%'
+            ORDER BY f.name
+        """,
+        "fast": """
+            SELECT f.name, c.name
+            FROM team1_orders o
+            JOIN team1_customers c ON o.customer_id = c.id
+            JOIN team1_flowers f ON o.flower_id = f.id
+            WHERE f.name LIKE 'Rose%'
+            LIMIT 50
+        """,
+    },
+    # team-5/app.py slow_query / fast_query
+    "team5": {
+        "slow": """
+            SELECT COUNT(*) FROM (
+                SELECT f.id, f.name, f.last_watered, f.water_level, f.min_water_required,
+                    c.name AS customer_name, o.order_date
+                FROM team5_flowers f
+                CROSS JOIN (SELECT * FROM team5_orders
+                CROSS JOIN team5_customers)
+                WHERE name LIKE '_e' AND water_level < min_water_required
+                ORDER BY o.order_date DESC
+            )
+        """,
+        "fast": """
+            SELECT f.id, f.name, f.last_watered, f.water_level, f.min_water_required,
+                   c.name AS customer_name, o.order_date
+            FROM team5_flowers f
+            JOIN team5_orders o ON f.id = o.flower_id
+            JOIN team5_customers c ON o.customer_id = c.id
+            WHERE f.name LIKE 'Rose%'
+              AND c.name LIKE 'Customer%'
+            ORDER BY o.order_date DESC
+            LIMIT 100 OFFSET 0
+        """,
+    },
+}
+
+FLOWER_NAMES = ["Rose", "Tulip", "Lily", "Daisy", "Poppy", "Orchid", "Azalea", "Chrysanthemum"]
+ITERSIZE = 2000
+
+# Secondary indexes added with --indexes, the same for every team.
+INDEXES = [
+    ("orders", "customer_id"),
+    ("orders", "flower_id"),
+    ("flowers", "name"),
+    ("customers", "email"),
+]
+
+
+def _schema(scale):
+    return f"qbench_{scale}"
+
+
+def dataset_sizes(orders):
+    # Customers and flowers grow with the orders, in the same ratio as
+    # the seed data (10000 orders, 500 customers).
+    return {"orders": orders, "customers": max(orders // 20, 1), "flowers": max(orders // 1000, len(FLOWER_NAMES))}
+
+
+def build_dataset(conn, scale, teams, indexes):
+    """(Re)create qbench_<scale> with one copy of the data per team."""
+    sizes = dataset_sizes(scale)
+    schema = sql.Identifier(_schema(scale))
+    cur = conn.cursor()
+    cur.execute(sql.SQL("DROP SCHEMA IF EXISTS {s} CASCADE; CREATE SCHEMA {s}").format(s=schema))
+
+    # Generated from the row number only (no random()), so every run
+    # builds the same rows for a given scale. The first flowers carry the
+    # plain names the queries look for ('Rose', 'Poppy', ...), the rest
+    # get a suffix ('Rose_9').
+    cur.execute(sql.SQL("""
+        CREATE TABLE {s}.bench_flowers AS
+        SELECT g AS id,
+               CASE WHEN g <= %(names)s THEN (%(name_list)s)[g]
+                    ELSE (%(name_list)s)[1 + (g - 1) %% %(names)s] || '_' || g END AS name,
+               DATE '2026-03-01' - (g %% 30) AS last_watered,
+               (g * 13) %% 40 AS water_level,
+               5 + g %% 10 AS min_water_required
+        FROM generate_series(1, %(flowers)s) AS g;
+
+        CREATE TABLE {s}.bench_customers AS
+        SELECT g AS id,
+               'Customer_' || g AS name,
+               'customer_' || g || '@example.com' AS email
+        FROM generate_series(1, %(customers)s) AS g;
+
+        CREATE TABLE {s}.bench_orders AS
+        SELECT g AS id,
+               (1 + (g::BIGINT * 7919) %% %(customers)s)::INT AS customer_id,
+               (1 + (g::BIGINT * 104729) %% %(flowers)s)::INT AS flower_id,
+               DATE '2026-01-01' - ((g * 37) %% 365) AS order_date
+        FROM generate_series(1, %(orders)s) AS g;
+    """).format(s=schema), dict(sizes, names=len(FLOWER_NAMES), name_list=FLOWER_NAMES))
+
+    for team in teams:
+        for table in ("flowers", "customers", "orders"):
+            target = sql.Identifier(_schema(scale), f"{team}_{table}")
+            cur.execute(sql.SQL("""
+                CREATE TABLE {target} AS TABLE {source};
+                ALTER TABLE {target} ADD PRIMARY KEY (id);
+            """).format(target=target, source=sql.Identifier(_schema(scale), f"bench_{table}")))
+            if indexes:
+                for indexed_table, column in INDEXES:
+                    if indexed_table == table:
+                        cur.execute(sql.SQL("CREATE INDEX ON {} ({})").format(
+                            target, sql.Identifier(column)))
+            # Fresh statistics for every copy, so plans do not depend
+            # on when autovacuum last ran.
+            cur.execute(sql.SQL("ANALYZE {}").format(target))
+
+    conn.commit()
+    cur.close()
+    return sizes
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile of an already sorted list.
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def _drain(conn, query):
+    # Server-side cursor: rows arrive ITERSIZE at a time and are
+    # dropped, so a million-row result does not sit in client memory.
+    cur = conn.cursor(name="qbench")
+    cur.itersize = ITERSIZE
+    start = time.perf_counter()
+    cur.execute(query)
+    rows = 0
+    for _ in cur:
+        rows += 1
+    elapsed = time.perf_counter() - start
+    cur.close()
+    conn.rollback()
+    return elapsed, rows
+
+
+def plan_shape(node):
+    """'Limit(Nested Loop(Seq Scan team1_orders, Index Scan team1_customers))'"""
+    label = node["Node Type"]
+    if "Relation Name" in node:
+        label += f" {node['Relation Name']}"
+    children = node.get("Plans", [])
+    if not children:
+        return label
+    return f"{label}({', '.join(plan_shape(child) for child in children)})"
+
+
+def explain(conn, query):
+    cur = conn.cursor()
+    cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}")
+    plan = cur.fetchone()[0][0]
+    cur.close()
+    conn.rollback()
+    return plan
+
+
+def run_query(conn, query, warmup, reps):
+    result = {"status": "ok"}
+    rows = None
+    try:
+        for _ in range(warmup):
+            _drain(conn, query)
+        times = []
+        for _ in range(reps):
+            elapsed, rows = _drain(conn, query)
+            times.append(elapsed * 1000)
+        plan = explain(conn, query)
+    except psycopg2.errors.QueryCanceled:
+        conn.rollback()
+        return {"status": "timeout"}
+    except psycopg2.Error as e:
+        conn.rollback()
+        return {"status": "error", "error": str(e).strip().splitlines()[0]}
+
+    times.sort()
+    top = plan["Plan"]
+    result.update({
+        "rows": rows,
+        "median_ms": statistics.median(times),
+        "p95_ms": percentile(times, 95),
+        "times_ms": times,
+        "explain_ms": plan.get("Execution Time"),
+        "shared_hit": top.get("Shared Hit Blocks", 0),
+        "shared_read": top.get("Shared Read Blocks", 0),
+        "plan_shape": plan_shape(top),
+        "plan": plan,
+    })
+    return result
+
+
+def _cell(value, fmt):
+    return "-" if value is None else format(value, fmt)
+
+
+def print_table(results):
+    print(f"{'orders':>9}  {'team':<6}{'query':<6}{'median ms':>11}{'p95 ms':>11}"
+          f"{'rows':>9}{'hit':>9}{'read':>8}  plan")
+    for r in results:
+        if r["status"] != "ok":
+            detail = r.get("error", "")
+            print(f"{r['scale']:>9}  {r['team']:<6}{r['query']:<6}{r['status'].upper():>11}  {detail}")
+            continue
+        print(f"{r['scale']:>9}  {r['team']:<6}{r['query']:<6}"
+              f"{_cell(r['median_ms'], '.2f'):>11}{_cell(r['p95_ms'], '.2f'):>11}"
+              f"{r['rows']:>9}{r['shared_hit']:>9}{r['shared_read']:>8}  {r['plan_shape']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare every team's slow and fast query")
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL"),
+                        help="scratch database (default: $DATABASE_URL)")
+    parser.add_argument("--scales", default="10000,100000",
+                        help="comma-separated dataset sizes, in orders")
+    parser.add_argument("--teams", default=",".join(QUERIES), help="comma-separated teams")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--reps", type=int, default=10, help="timed runs per query (at least 1)")
+    parser.add_argument("--timeout", type=float, default=60.0,
+                        help="statement timeout in seconds")
+    parser.add_argument("--indexes", action="store_true",
+                        help="add the same secondary indexes for every team")
+    parser.add_argument("--keep", action="store_true", help="keep the qbench_* schemas")
+    parser.add_argument("--json", help="write all results, with full plans, to this file")
+    args = parser.parse_args()
+
+    if not args.dsn:
+        parser.error("set DATABASE_URL or pass --dsn")
+    teams = [t.strip() for t in args.teams.split(",") if t.strip()]
+    unknown = [t for t in teams if t not in QUERIES]
+    if unknown:
+        parser.error(f"unknown teams: {', '.join(unknown)}")
+    scales = [int(s) for s in args.scales.split(",")]
+    if args.reps < 1:
+        parser.error("--reps must be at least 1")
+
+    conn = psycopg2.connect(args.dsn)
+    results = []
+    try:
+        for scale in scales:
+            start = time.perf_counter()
+            sizes = build_dataset(conn, scale, teams, args.indexes)
+            print(f"built {_schema(scale)}: {sizes} in {time.perf_counter() - start:.1f}s")
+
+            cur = conn.cursor()
+            cur.execute(sql.SQL("SET search_path TO {}").format(sql.Identifier(_schema(scale))))
+            cur.execute("SET statement_timeout = %s", (int(args.timeout * 1000),))
+            cur.close()
+            conn.commit()
+
+            for team in teams:
+                for name, query in QUERIES[team].items():
+                    result = run_query(conn, query.strip(), args.warmup, args.reps)
+                    result.update({"scale": scale, "team": team, "query": name})
+                    results.append(result)
+    finally:
+        if not args.keep:
+            conn.rollback()
+            cur = conn.cursor()
+            for scale in scales:
+                cur.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(
+                    sql.Identifier(_schema(scale))))
+            conn.commit()
+        conn.close()
+
+    print()
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Modules shared by the team apps and the flower service.
@@ -0,0 +1,169 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import psycopg2
+
+# ============================================================
+# Watering alert scheduler
+# ============================================================
+# Replaces polling loops that wake up once a day and rewrite the
+# table. Every flower already knows when it will need water: the
+# stored needs_water_at column (see the team's admin.init_db). The scheduler
+# keeps one timer per flower in a heap ordered by that time and a
+# single thread sleeps until the earliest one is due, so thousands
+# of pending timers cost nothing between events.
+#
+#   - start() loads needs_water_at for every flower and starts the
+#     thread. Flowers that are already overdue fire right away.
+#   - schedule(id, needs_water_at) replaces one flower's timer, e.g.
+#     after /water or PUT /flowers/<id> (use UPDATE ... RETURNING
+#     needs_water_at so no extra query is needed).
+#   - cancel(id) removes it, e.g. after DELETE.
+#
+# Replaced timers are not removed from the heap right away; they are
+# skipped when they reach the top (and the heap is rebuilt when they
+# pile up). A fired alert calls on_alert(alert) and is kept in
+# recent_alerts.
+
+HISTORY_SIZE = 100
+
+
+def _print_alert(alert):
+    print(f"Flower {alert['id']} ({alert['name']}) needs watering since {alert['needs_water_at']}")
+
+
+def _fire_time(needs_water_at):
+    # needs_water_at is a date: the flower drops below its minimum at
+    # the start of that day.
+    return datetime.combine(needs_water_at, datetime.min.time()).timestamp()
+
+
+class WateringAlertScheduler:
+    def __init__(self, dsn, table, on_alert=_print_alert, history=HISTORY_SIZE):
+        self.dsn = dsn
+        self.table = table
+        self.on_alert = on_alert
+        self.recent_alerts = deque(maxlen=history)
+
+        self._heap = []       # (fire_at, seq, flower_id)
+        self._entries = {}    # flower_id -> (fire_at, seq, name, needs_water_at)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    # ------------------ setup ------------------
+
+    def load(self):
+        conn = psycopg2.connect(self.dsn)
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT id, name, needs_water_at
+            FROM {self.table}
+            WHERE needs_water_at IS NOT NULL;
+        """)
+        rows = cur.fetchall()
+        cur.close()
+        conn.close()
+
+        with self._cond:
+            self._heap = []
+            self._entries = {}
+            for flower_id, name, needs_water_at in rows:
+                self._push(flower_id, needs_water_at, name)
+            self._cond.notify()
+        return len(rows)
+
+    def start(self):
+        count = self.load()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        print(f"Watering alerts scheduled for {count} flowers")
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    # ------------------ timers ------------------
+
+    def _push(self, flower_id, needs_water_at, name):
+        fire_at = _fire_time(needs_water_at)
+        seq = next(self._seq)
+        self._entries[flower_id] = (fire_at, seq, name, needs_water_at)
+        heapq.heappush(self._heap, (fire_at, seq, flower_id))
+
+    def schedule(self, flower_id, needs_water_at, name=None):
+        with self._cond:
+            if needs_water_at is None:
+                # min_water_required <= 0: this flower never needs water.
+                self._entries.pop(flower_id, None)
+            else:
+                self._push(flower_id, needs_water_at, name)
+            if len(self._heap) > 2 * len(self._entries) + 64:
+                self._heap = [(fire_at, seq, flower_id)
+                              for flower_id, (fire_at, seq, _, _) in self._entries.items()]
+                heapq.heapify(self._heap)
+            # Wake the thread in case this timer is now the earliest one.
+            self._cond.notify()
+
+    def cancel(self, flower_id):
+        self.schedule(flower_id, None)
+
+    def _is_current(self, seq, flower_id):
+        entry = self._entries.get(flower_id)
+        return entry is not None and entry[1] == seq
+
+    def _next_due(self):
+        # Wait (holding the condition) until a timer is due; return the
+        # due alerts, or None when stopped.
+        while not self._stopped:
+            while self._heap and not self._is_current(self._heap[0][1], self._heap[0][2]):
+                heapq.heappop(self._heap)
+
+            if not self._heap:
+                self._cond.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                self._cond.wait(delay)
+                continue
+
+            due = []
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, seq, flower_id = heapq.heappop(self._heap)
+                if self._is_current(seq, flower_id):
+                    _, _, name, needs_water_at = self._entries.pop(flower_id)
+                    due.append({
+                        "id": flower_id,
+                        "name": name,
+                        "needs_water_at": needs_water_at.strftime("%Y-%m-%d"),
+                        "fired_at": datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S"),
+                    })
+            return due
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                due = self._next_due()
+            if due is None:
+                return
+            # Callbacks run without the lock so schedule() never waits on them.
+            for alert in due:
+                self.recent_alerts.append(alert)
+                try:
+                    self.on_alert(alert)
+                except Exception as e:
+                    print("Watering alert error:", e)
+
+    def pending(self):
+        with self._cond:
+            return len(self._entries)
@@ -0,0 +1,212 @@
+import os
+import threading
+import time
+
+import psycopg2
+from flask import g, has_app_context
+from psycopg2 import extensions
+
+# ============================================================
+# Request-scoped connection pool
+# ============================================================
+# Opening a new TLS connection to Neon costs roughly 50-150 ms, which
+# used to be paid on every API call. The pool keeps connections open
+# and lends one to each request:
+#
+#   - get_connection() checks a connection out on first use and keeps
+#     it in flask.g, so every query in the same request reuses it.
+#   - When the request ends (teardown_appcontext) the connection is
+#     rolled back if a transaction is still open and returned to the
+#     pool. Calling conn.close() inside a route is a no-op, so existing
+#     route code keeps working unchanged.
+#   - A connection that sat idle longer than pre_ping_seconds is
+#     checked with SELECT 1 before use; dead ones are replaced.
+#   - When all connections are busy, a request waits up to
+#     checkout_timeout seconds instead of failing immediately.
+#
+# Shared by the team apps and the flower service (Project/common).
+#
+# Settings: DB_POOL_MIN, DB_POOL_MAX, DB_POOL_PRE_PING_SECONDS,
+# DB_POOL_TIMEOUT_SECONDS.
+
+POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+PRE_PING_SECONDS = float(os.getenv("DB_POOL_PRE_PING_SECONDS", "30"))
+CHECKOUT_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class _PooledConnection:
+    """
+    Wraps a pooled connection; close() is left to the pool. Attribute
+    access is forwarded with __getattr__, which Python skips for dunder
+    methods, so the ones routes use are forwarded explicitly: "with
+    conn:" commits or rolls back like a plain psycopg2 connection.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class FlaskConnectionPool:
+    def __init__(self, dsn, minconn=POOL_MIN, maxconn=POOL_MAX,
+                 pre_ping_seconds=PRE_PING_SECONDS,
+                 checkout_timeout=CHECKOUT_TIMEOUT_SECONDS):
+        self.dsn = dsn
+        self.maxconn = maxconn
+        self.pre_ping_seconds = pre_ping_seconds
+        self.checkout_timeout = checkout_timeout
+
+        # Connections are opened lazily on first checkout and kept in
+        # _idle between requests. (psycopg2's own pools close every
+        # connection returned beyond minconn, so they cannot open lazily
+        # and still reuse.) The semaphore caps open connections at
+        # maxconn and makes callers queue up when all are in use.
+        self._idle = []
+        self._minconn = minconn
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used = {}
+
+        self.checkouts = 0
+        self.in_use = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.pre_ping_failures = 0
+        self.timeouts = 0
+
+    def init_app(self, app):
+        app.teardown_appcontext(self._teardown)
+
+        # Warm up minconn connections so the first requests skip the handshake.
+        warm = []
+        for _ in range(self._minconn):
+            warm.append(self._checkout())
+        for conn in warm:
+            self._checkin(conn)
+
+    # ------------------ checkout / checkin ------------------
+
+    def _checkout(self):
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(f"No database connection free after {self.checkout_timeout}s")
+
+        try:
+            conn = self._take_idle()
+            if conn is not None and self._needs_ping(conn) and not self._ping(conn):
+                with self._lock:
+                    self.pre_ping_failures += 1
+                    self._last_used.pop(id(conn), None)
+                self._close(conn)
+                conn = None
+            if conn is None:
+                conn = psycopg2.connect(self.dsn)
+        except Exception:
+            self._slots.release()
+            raise
+
+        wait_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        return conn
+
+    def _checkin(self, conn):
+        close = conn.closed != 0
+        if not close and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                close = True
+
+        with self._lock:
+            self.in_use -= 1
+            if close:
+                self._last_used.pop(id(conn), None)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+                self._idle.append(conn)
+
+        if close:
+            self._close(conn)
+        self._slots.release()
+
+    def _take_idle(self):
+        # Most recently used first: it is the least likely to have gone stale.
+        with self._lock:
+            return self._idle.pop() if self._idle else None
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _needs_ping(self, conn):
+        if conn.closed:
+            return True
+        last_used = self._last_used.get(id(conn))
+        return last_used is None or time.monotonic() - last_used > self.pre_ping_seconds
+
+    def _ping(self, conn):
+        if conn.closed:
+            return False
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1;")
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    # ------------------ Flask integration ------------------
+
+    def get_connection(self):
+        # Outside a request (startup code, background jobs) there is no
+        # teardown to return the connection, so hand out a plain one.
+        if not has_app_context():
+            return psycopg2.connect(self.dsn)
+
+        if "db_conn" not in g:
+            g.db_conn = _PooledConnection(self._checkout())
+        return g.db_conn
+
+    def _teardown(self, exc):
+        conn = g.pop("db_conn", None)
+        if conn is not None:
+            self._checkin(conn._conn)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "max_size": self.maxconn,
+                "in_use": self.in_use,
+                "idle": len(self._idle),
+                "checkouts": self.checkouts,
+                "avg_wait_ms": round(self.wait_ms_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.wait_ms_max, 3),
+                "pre_ping_failures": self.pre_ping_failures,
+                "timeouts": self.timeouts,
+            }
@@ -0,0 +1,346 @@
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from flask import Response, g, has_request_context, jsonify, request
+
+# ============================================================
+# Per-request profiling
+# ============================================================
+# For a sample of requests, records where the time went:
+#
+#   acquire    getting the pooled connection (get_db_connection)
+#   db         every cursor.execute() and fetch, per statement, with
+#              the number of rows
+#   serialize  JSON encoding: jsonify() and, for streamed responses,
+#              producing the body (minus the fetches inside it)
+#   python     everything else: route code, Flask, Werkzeug
+#   total      before_request until the response body is closed
+#
+# Sampled requests feed per-endpoint histograms served at /_metrics in
+# Prometheus text format; the last few profiles, statement by
+# statement, are at /_debug/last (?n=10 for more).
+#
+# Only sampled requests are instrumented; for the rest the cost is one
+# random() call and a flask.g lookup per connection. PROFILE_SAMPLE_RATE
+# sets the share (default 0.05). A request with the header
+# X-Profile: 1 is always sampled.
+#
+# Shared by the team apps (Project/common); each passes its own
+# metric prefix.
+#
+# Settings: PROFILE_SAMPLE_RATE, PROFILE_KEEP_LAST.
+
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.05"))
+KEEP_LAST = int(os.getenv("PROFILE_KEEP_LAST", "50"))
+
+# Upper bounds (ms) of the histogram buckets; +Inf is implied.
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RequestProfile:
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.endpoint = None
+        self.status = None
+        self.started = time.perf_counter()
+        self.acquire_ms = 0.0
+        self.serialize_ms = 0.0
+        self.total_ms = None
+        self.queries = []
+
+    def db_ms(self):
+        return sum(q["execute_ms"] + q["fetch_ms"] for q in self.queries)
+
+    def as_dict(self):
+        db_ms = self.db_ms()
+        return {
+            "method": self.method,
+            "path": self.path,
+            "endpoint": self.endpoint,
+            "status": self.status,
+            "total_ms": round(self.total_ms, 3),
+            "acquire_ms": round(self.acquire_ms, 3),
+            "db_ms": round(db_ms, 3),
+            "serialize_ms": round(self.serialize_ms, 3),
+            "python_ms": round(self._python_ms(db_ms), 3),
+            "queries": [dict(q, execute_ms=round(q["execute_ms"], 3),
+                             fetch_ms=round(q["fetch_ms"], 3)) for q in self.queries],
+        }
+
+    def _python_ms(self, db_ms):
+        return max(self.total_ms - self.acquire_ms - db_ms - self.serialize_ms, 0.0)
+
+    def phases(self):
+        db_ms = self.db_ms()
+        return {
+            "acquire": self.acquire_ms,
+            "db": db_ms,
+            "serialize": self.serialize_ms,
+            "python": self._python_ms(db_ms),
+            "total": self.total_ms,
+        }
+
+
+class _ProfiledCursor:
+    """Times execute() and the fetches after it; the rest passes through."""
+
+    def __init__(self, cur, profile):
+        self._cur = cur
+        self._profile = profile
+        self._query = None
+
+    def _start_query(self, query):
+        if isinstance(query, bytes):
+            text = query.decode()
+        elif hasattr(query, "as_string"):   # psycopg2.sql objects
+            text = query.as_string(self._cur)
+        else:
+            text = str(query)
+        self._query = {"sql": _WHITESPACE.sub(" ", text).strip()[:300],
+                       "execute_ms": 0.0, "fetch_ms": 0.0, "rows": 0}
+        self._profile.queries.append(self._query)
+
+    def execute(self, query, vars=None):
+        self._start_query(query)
+
+        start = time.perf_counter()
+        try:
+            return self._cur.execute(query, vars)
+        finally:
+            self._query["execute_ms"] = (time.perf_counter() - start) * 1000
+            if self._cur.rowcount and self._cur.rowcount > 0 and self._cur.description is None:
+                # INSERT / UPDATE / DELETE without RETURNING.
+                self._query["rows"] = self._cur.rowcount
+
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        if self._query is not None:
+            self._query["fetch_ms"] += (time.perf_counter() - start) * 1000
+            if isinstance(result, list):
+                self._query["rows"] += len(result)
+            elif result is not None:
+                self._query["rows"] += 1
+        return result
+
+    def fetchone(self):
+        return self._fetch(self._cur.fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(self._cur.fetchmany, size if size is not None else self._cur.arraysize)
+
+    def fetchall(self):
+        return self._fetch(self._cur.fetchall)
+
+    def __iter__(self):
+        # Iterate the real cursor so a named cursor still fetches
+        # itersize rows per round trip.
+        rows = iter(self._cur)
+        while True:
+            start = time.perf_counter()
+            row = next(rows, None)
+            if self._query is not None:
+                self._query["fetch_ms"] += (time.perf_counter() - start) * 1000
+            if row is None:
+                return
+            if self._query is not None:
+                self._query["rows"] += 1
+            yield row
+
+    def copy_expert(self, sql, file, *args):
+        self._start_query(sql)
+        start = time.perf_counter()
+        try:
+            return self._cur.copy_expert(sql, file, *args)
+        finally:
+            self._query["execute_ms"] = (time.perf_counter() - start) * 1000
+            self._query["rows"] = max(self._cur.rowcount, 0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cur.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+class _ProfiledConnection:
+    def __init__(self, conn, profile):
+        self._conn = conn
+        self._profile = profile
+
+    def cursor(self, *args, **kwargs):
+        return _ProfiledCursor(self._conn.cursor(*args, **kwargs), self._profile)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class _Histogram:
+    def __init__(self):
+        self.bucket_counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, duration_ms):
+        index = len(BUCKETS_MS)
+        for i, bound in enumerate(BUCKETS_MS):
+            if duration_ms <= bound:
+                index = i
+                break
+        self.bucket_counts[index] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RequestProfiler:
+    def __init__(self, metric_prefix="flask_request", sample_rate=SAMPLE_RATE, keep_last=KEEP_LAST):
+        self.metric_prefix = metric_prefix
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._last = deque(maxlen=keep_last)
+        self._histograms = {}   # (endpoint, phase) -> _Histogram
+        self._counters = {}     # endpoint -> {"requests", "queries", "rows", "errors"}
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule("/_metrics", "profiling_metrics", self._metrics_view)
+        app.add_url_rule("/_debug/last", "profiling_last", self._last_view)
+
+        # jsonify() goes through app.json.dumps; time it for the
+        # "serialize" phase.
+        dumps = app.json.dumps
+
+        def timed_dumps(obj, **kwargs):
+            profile = g.get("profile") if has_request_context() else None
+            if profile is None:
+                return dumps(obj, **kwargs)
+            start = time.perf_counter()
+            try:
+                return dumps(obj, **kwargs)
+            finally:
+                profile.serialize_ms += (time.perf_counter() - start) * 1000
+
+        app.json.dumps = timed_dumps
+
+    def connection(self, get_connection):
+        """Call get_connection(), timed and instrumented when sampled."""
+        profile = g.get("profile") if has_request_context() else None
+        if profile is None:
+            return get_connection()
+        start = time.perf_counter()
+        conn = get_connection()
+        profile.acquire_ms += (time.perf_counter() - start) * 1000
+        return _ProfiledConnection(conn, profile)
+
+    # ------------------ Flask hooks ------------------
+
+    def _before_request(self):
+        if request.path in ("/_metrics", "/_debug/last"):
+            return
+        if request.headers.get("X-Profile") == "1" or random.random() < self.sample_rate:
+            g.profile = RequestProfile(request.method, request.path)
+
+    def _after_request(self, response):
+        profile = g.get("profile")
+        if profile is None:
+            return response
+        profile.endpoint = request.endpoint or "<unmatched>"
+        profile.status = response.status_code
+
+        body_started = time.perf_counter()
+        db_ms_before_body = profile.db_ms()
+        streamed = response.is_streamed
+
+        def finish():
+            now = time.perf_counter()
+            if streamed:
+                # Producing a streamed body is fetching plus encoding;
+                # the fetches are already counted under "db".
+                body_ms = (now - body_started) * 1000
+                profile.serialize_ms += max(body_ms - (profile.db_ms() - db_ms_before_body), 0.0)
+            profile.total_ms = (now - profile.started) * 1000
+            self._record(profile)
+
+        response.call_on_close(finish)
+        return response
+
+    def _record(self, profile):
+        rows = sum(q["rows"] for q in profile.queries)
+        with self._lock:
+            self._last.append(profile)
+            for phase, duration_ms in profile.phases().items():
+                key = (profile.endpoint, phase)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = _Histogram()
+                histogram.observe(duration_ms)
+
+            counters = self._counters.setdefault(
+                profile.endpoint, {"requests": 0, "queries": 0, "rows": 0, "errors": 0})
+            counters["requests"] += 1
+            counters["queries"] += len(profile.queries)
+            counters["rows"] += rows
+            if profile.status >= 500:
+                counters["errors"] += 1
+
+    # ------------------ Views ------------------
+
+    def _last_view(self):
+        n = request.args.get("n", default=1, type=int)
+        with self._lock:
+            profiles = list(self._last)[-max(n, 1):]
+        return jsonify([p.as_dict() for p in reversed(profiles)])
+
+    def _metrics_view(self):
+        return Response(self.prometheus_text(), mimetype="text/plain; version=0.0.4")
+
+    def prometheus_text(self):
+        prefix = self.metric_prefix
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted((e, dict(c)) for e, c in self._counters.items())
+
+        lines = [
+            f"# HELP {prefix}_phase_ms Time per request phase in milliseconds (sampled requests).",
+            f"# TYPE {prefix}_phase_ms histogram",
+        ]
+        for (endpoint, phase), histogram in histograms:
+            labels = f'endpoint="{_escape(endpoint)}",phase="{phase}"'
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS_MS, histogram.bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'{prefix}_phase_ms_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_phase_ms_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{prefix}_phase_ms_sum{{{labels}}} {histogram.total_ms:.3f}")
+            lines.append(f"{prefix}_phase_ms_count{{{labels}}} {histogram.count}")
+
+        for name, help_text in (
+            ("requests", "Sampled requests."),
+            ("queries", "Statements run by sampled requests."),
+            ("rows", "Rows fetched or changed by sampled requests."),
+            ("errors", "Sampled requests that returned a 5xx status."),
+        ):
+            lines.append(f"# HELP {prefix}_sampled_{name}_total {help_text}")
+            lines.append(f"# TYPE {prefix}_sampled_{name}_total counter")
+            for endpoint, c in counters:
+                lines.append(f'{prefix}_sampled_{name}_total{{endpoint="{_escape(endpoint)}"}} {c[name]}')
+
+        lines.append(f"# HELP {prefix}_sample_rate Share of requests that are profiled.")
+        lines.append(f"# TYPE {prefix}_sample_rate gauge")
+        lines.append(f"{prefix}_sample_rate {self.sample_rate}")
+        return "\n".join(lines) + "\n"
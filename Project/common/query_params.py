@@ -0,0 +1,7 @@
+import re
+
+
+def parse_within(value):
+    # ?within=3d or ?within=3 -> 3 days; None when it is not a day count.
+    match = re.fullmatch(r"\s*(\d+)\s*d?\s*", value or "")
+    return int(match.group(1)) if match else None